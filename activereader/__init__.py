@@ -1,8 +1,47 @@
-from .tcx import Tcx
-from .gpx import Gpx
+"""Garmin TCX, GPX and FIT file readers for running activities.
+
+Submodules, and the readers below, are imported the first time they are
+used rather than with the package, so ``import activereader`` stays cheap
+for short-lived processes (see ``benchmarks/import_time.py``).
+"""
+import importlib
 
 __version__ = '0.0.3'
 __all__ = [
   'Tcx',
-  'Gpx'
-]
\ No newline at end of file
+  'Gpx',
+  'Fit',
+  'convert'
+]
+
+# Maps a public name to the submodule that defines it.
+_LAZY_ATTRIBUTES = {
+  'Tcx': 'tcx',
+  'Gpx': 'gpx',
+  'Fit': 'fit',
+  'convert': 'converter',
+}
+
+_SUBMODULES = frozenset([
+  'base', 'bouts', 'cache', 'compact', 'converter', 'course', 'dataset',
+  'efforts', 'fingerprint', 'fit', 'geo', 'gpx', 'merge', 'polyline',
+  'query', 'resample', 'shared', 'simplify', 'spatial', 'splits', 'tcx',
+  'timeindex', 'util', 'validation', 'writer',
+])
+
+
+def __getattr__(name):
+  if name in _LAZY_ATTRIBUTES:
+    module = importlib.import_module(f'.{_LAZY_ATTRIBUTES[name]}', __name__)
+    value = getattr(module, name)
+  elif name in _SUBMODULES:
+    value = importlib.import_module(f'.{name}', __name__)
+  else:
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+  # Later lookups find it directly, without coming back here.
+  globals()[name] = value
+  return value
+
+
+def __dir__():
+  return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | _SUBMODULES)
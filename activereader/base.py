@@ -2,12 +2,58 @@
 in GPX and TCX files.
 """
 
+import collections
+import functools
 import io
 import os
+import re
+import threading
 
+import numpy as np
 from lxml import etree
 
-from . import util
+
+class DataProperty(property):
+  """A property that reads subelement text, and remembers where it reads from.
+
+  Returned by :func:`create_data_prop`. Keeping the path and type around
+  lets bulk readers like :meth:`ActivityElement.columns` read the same data
+  without going through the property one element at a time.
+  """
+  def __init__(self, path, conv_type=int, doc=None):
+    super().__init__(
+      lambda obj: obj.get_data(path, conv_type=conv_type),
+      doc=doc
+    )
+    self.path = path
+    self.conv_type = conv_type
+
+
+class AttrProperty(property):
+  """A property that reads an element attribute, and remembers which one.
+
+  Returned by :func:`create_attr_prop`.
+  """
+  def __init__(self, key, conv_type=int, doc=None):
+    super().__init__(
+      lambda obj: obj.get_attr(key, conv_type=conv_type),
+      doc=doc
+    )
+    self.key = key
+    self.conv_type = conv_type
+
+
+class DescendentProperty(property):
+  """A property that lists descendent elements, and remembers their class.
+
+  Returned by :func:`create_descendent_prop`.
+  """
+  def __init__(self, descendent_class, doc=None):
+    super().__init__(
+      lambda obj: obj._descendents(descendent_class),
+      doc=doc
+    )
+    self.descendent_class = descendent_class
 
 
 def create_data_prop(path, conv_type=int):
@@ -32,8 +78,9 @@ def create_data_prop(path, conv_type=int):
     ...   [...]
 
   """
-  return property(
-    lambda self: self.get_data(path, conv_type=conv_type), 
+  return DataProperty(
+    path,
+    conv_type=conv_type,
     # doc=f':obj:`{conv_type.__name__}`'
   )
 
@@ -58,8 +105,9 @@ def create_attr_prop(key, conv_type=int):
     ...   [...]
 
   """
-  return property(
-    lambda self: self.get_attr(key, conv_type=conv_type),
+  return AttrProperty(
+    key,
+    conv_type=conv_type,
     # doc=f':obj:`{conv_type.__name__}`'
   )
 
@@ -84,11 +132,8 @@ def create_descendent_prop(descendent_class):
     ...   [...]
 
   """
-  return property(
-    lambda self: [
-      descendent_class(e) 
-      for e in self.elem.xpath(f'.//{descendent_class.TAG}')
-    ],
+  return DescendentProperty(
+    descendent_class,
     doc=f':obj:`list` of :class:`{descendent_class.__name__}`: '
     # f'All descendents of the contained lxml element with tag name '
     f'All element descendents with tag name "{descendent_class.TAG}".',
@@ -117,6 +162,17 @@ class ActivityElement(object):
   be raised.
   """
 
+  CONTAINERS = {}
+  """Maps column names to the tag names of ancestor elements.
+
+  Used by :meth:`columns` when this class describes the trackpoints being
+  read: each named column numbers the ancestor with the given tag that
+  contains each trackpoint (eg. ``{'bout': 'Track', 'lap': 'Lap'}``).
+  """
+
+  _compact = None
+  _position = None
+
   def __init__(self, lxml_elem):
     if not isinstance(lxml_elem, etree._Element):
       raise TypeError(
@@ -130,6 +186,98 @@ class ActivityElement(object):
 
     self.elem = lxml_elem
 
+  @classmethod
+  def _from_compact(cls, store, position):
+    """Create an element that is served from a compact store."""
+    obj = cls.__new__(cls)
+    obj.elem = None
+    obj._compact = store
+    obj._position = position
+    return obj
+
+  @property
+  def is_compact(self):
+    """bool: Whether data is served from arrays rather than an XML tree.
+
+    See also:
+      :meth:`compact`
+    """
+    return self._compact is not None
+
+  def compact(self):
+    """Move this element's data into arrays and release its XML tree.
+
+    Declared trackpoint data is kept in one typed array per field, and
+    other elements keep their attributes and subelement text. Afterwards
+    the same properties, descendent lists, :meth:`columns` and
+    :meth:`column` (for declared fields) are served from those arrays, and
+    :attr:`elem` is None. The tree itself is freed once nothing else refers
+    to it; elements created from it before compacting still hold on to 
+    their part of it.
+
+    Trackpoint data that the trackpoint class does not declare, like
+    extension fields, is not kept. Timestamps come back in UTC.
+
+    Elements are always pickled in this form, so they can be sent to other
+    processes without reserializing XML. With pickle protocol 5 the arrays
+    can travel out-of-band; see also :mod:`activereader.shared`.
+
+    Returns:
+      ActivityElement: This element, for chaining.
+
+    Examples:
+
+      >>> tcx_obj = Tcx.from_file('activity.tcx').compact()
+      >>> tcx_obj.laps[0].trackpoints[0].hr
+      71
+
+    """
+    if self.is_compact:
+      return self
+
+    from .compact import CompactStore
+
+    self._compact = CompactStore(self)
+    self._position = 0
+    self.elem = None
+    return self
+
+  def __getstate__(self):
+    # Elements are pickled in their compact form, never as XML. A tree-backed
+    # element is compacted on the way out, and is left unchanged itself.
+    if self.is_compact:
+      return {'store': self._compact, 'position': self._position}
+
+    from .compact import CompactStore
+
+    return {'store': CompactStore(self), 'position': 0}
+
+  def __setstate__(self, state):
+    self.elem = None
+    self._compact = state['store']
+    self._position = state['position']
+
+  def _require_tree(self, method_name):
+    if self.elem is None:
+      raise ValueError(
+        f'{method_name} needs the XML tree, which was released by compact().'
+      )
+
+  def _descendents(self, descendent_class):
+    """All element descendents that are instances of descendent_class."""
+    if self.is_compact:
+      return [
+        descendent_class._from_compact(self._compact, position)
+        for position in self._compact.descendent_positions(
+          type(self), self._position, descendent_class
+        )
+      ]
+
+    return [
+      descendent_class(e) 
+      for e in self.elem.xpath(f'.//{descendent_class.TAG}')
+    ]
+
   @classmethod
   def _add_data_properties(cls, **property_paths_types):
     """Add properties to cls that access specific paths using :meth:`get_data`.
@@ -207,6 +355,31 @@ class ActivityElement(object):
       setattr(cls, prop_name, f)
       # cls.add_descendent_list_property(prop_name, descendent_class)    
 
+  @classmethod
+  def _fields(cls):
+    """Collect the data and attribute properties declared on cls.
+
+    Returns:
+      dict: Maps property name to its :class:`DataProperty` or
+      :class:`AttrProperty`, in the order the properties were declared.
+    """
+    fields = {}
+    for klass in reversed(cls.__mro__):
+      for name, prop in vars(klass).items():
+        if isinstance(prop, (DataProperty, AttrProperty)):
+          fields[name] = prop
+    return fields
+
+  @classmethod
+  def _descendent_class(cls, prop_name):
+    """Look up the class behind one of cls's descendent properties."""
+    prop = getattr(cls, prop_name, None)
+    if not isinstance(prop, DescendentProperty):
+      raise AttributeError(
+        f'{cls.__name__} has no descendent property "{prop_name}"'
+      )
+    return prop.descendent_class
+
   def get_data(self, path, conv_type=str):
     """Retrieve data using the contained lxml element's 
     :meth:`~lxml.etree._Element.findtext` and convert its type.
@@ -245,6 +418,11 @@ class ActivityElement(object):
       datetime.datetime(2021, 2, 26, 19, 51, 8, tzinfo=tzutc())
 
     """
+    from . import util
+
+    if self.is_compact:
+      return self._compact.get_data(type(self), self._position, path, conv_type)
+
     data = self.elem.findtext(path)
 
     if data is None:
@@ -277,6 +455,11 @@ class ActivityElement(object):
       datetime.datetime(2021, 2, 26, 19, 51, 7, tzinfo=tzutc())
 
     """
+    from . import util
+
+    if self.is_compact:
+      return self._compact.get_attr(type(self), self._position, key, conv_type)
+
     attr = self.elem.get(key)
 
     if attr is None:
@@ -286,6 +469,565 @@ class ActivityElement(object):
 
     return conv_func(attr)
 
+  @classmethod
+  def get_data_many(cls, elements, path, conv_type=str):
+    """Retrieve data from many elements at once, converting it in bulk.
+
+    The batch counterpart of :meth:`get_data`: text is found the same way,
+    but converted one whole column at a time by :func:`~activereader.util.to_array`.
+
+    Args:
+      elements (list): :class:`ActivityElement` instances or lxml elements.
+      path (str): The tag name or path of the desired subelement of each
+        element, as in :meth:`get_data`.
+      conv_type (data type): Data type that the element text will
+        be converted to. Python type, or datetime.datetime to read a time.
+        Defaults to ``str``.
+
+    Returns:
+      numpy.ndarray: One entry per element, with missing values marked as
+      described in :func:`~activereader.util.to_array`.
+
+    Examples:
+
+      >>> Trackpoint.get_data_many(lap.trackpoints, 'HeartRateBpm/Value', int)
+      masked_array(data=[71, 73, 76, ...], ...)
+
+    """
+    from . import util
+
+    texts = [
+      (e.elem if isinstance(e, ActivityElement) else e).findtext(path)
+      for e in elements
+    ]
+    return util.to_array(texts, conv_type)
+
+  def columns(self, fields=None):
+    """Read the data of all descendent trackpoints into one array per field.
+
+    Each trackpoint's text is collected straight from the contained lxml
+    elements and converted a whole column at a time, so no per-point
+    :class:`ActivityElement` wrappers are created.
+
+    Args:
+      fields (list of str): Names of the trackpoint properties to read. 
+        Defaults to every data and attribute property declared on the
+        trackpoint class.
+
+    Returns:
+      dict: Maps field name to a :class:`numpy.ndarray` with one entry per
+      trackpoint, converted by :func:`~activereader.util.to_array`. The
+      trackpoint class's
+      :attr:`CONTAINERS` each add an integer column numbering the
+      containing ancestor elements, with -1 for trackpoints outside any.
+
+    Examples:
+
+      >>> cols = Tcx.from_file('activity.tcx').columns(['time', 'hr'])
+      >>> cols['hr'].mean()
+      132.5
+
+    """
+    from . import util
+
+    tp_class = self._descendent_class('trackpoints')
+    props = tp_class._fields()
+    if fields is not None:
+      unknown = [name for name in fields if name not in props]
+      if unknown:
+        raise KeyError(
+          f'{tp_class.__name__} has no data or attribute properties {unknown}'
+        )
+      props = {name: props[name] for name in fields}
+
+    if self.is_compact:
+      return self._compact.columns(type(self), self._position, tp_class, props)
+
+    elems = self.elem.xpath(f'.//{tp_class.TAG}')
+    index = _element_index(elems)
+
+    columns = {}
+    for name, prop in props.items():
+      path = prop.path if isinstance(prop, DataProperty) else f'@{prop.key}'
+      texts = _column_texts(self.elem, tp_class.TAG, path, index)
+      columns[name] = util.to_array(texts, prop.conv_type)
+
+    for name, tag in tp_class.CONTAINERS.items():
+      columns[name] = _container_ids(elems, tag)
+
+    return columns
+
+  def column(self, path, conv_type=float):
+    """Read data at any path below each descendent trackpoint into an array.
+
+    This is the bulk counterpart of calling :meth:`get_data` on every
+    trackpoint, and reaches data that the trackpoint class does not declare,
+    like extension fields. The path is compiled once and evaluated over the
+    whole element, rather than once per trackpoint.
+
+    Args:
+      path (str): The tag name or path of the desired subelement of each
+        trackpoint, as in :meth:`get_data`. A final ``@name`` step reads an
+        attribute instead (eg. ``'@lat'``).
+      conv_type (data type): Data type that the text will be converted to.
+        Python type, or datetime.datetime to read a time. Defaults to
+        ``float``.
+
+    Returns:
+      numpy.ndarray: One entry per trackpoint, with missing values marked
+      as described in :func:`~activereader.util.to_array`.
+
+    Examples:
+
+      >>> tcx_obj.column('Extensions/TPX/Watts', int)
+      masked_array(data=[--, 210, 212, ...], ...)
+
+    See also:
+      :meth:`leaf_paths` to find out which paths are present.
+    """
+    from . import util
+
+    tp_class = self._descendent_class('trackpoints')
+    if self.is_compact:
+      return self._compact.column(
+        type(self), self._position, tp_class, path, conv_type
+      )
+
+    elems = self.elem.xpath(f'.//{tp_class.TAG}')
+    texts = _column_texts(self.elem, tp_class.TAG, path, _element_index(elems))
+    return util.to_array(texts, conv_type)
+
+  def _available_columns(self, *names):
+    """Read whichever of the named fields the trackpoint class declares."""
+    declared = self._descendent_class('trackpoints')._fields()
+    return self.columns([name for name in names if name in declared])
+
+  def leaf_paths(self, prefix=None):
+    """Count the data-holding subelements of the descendent trackpoints.
+
+    A discovery pass for :meth:`column`: it shows every path that holds data
+    in this element's trackpoints, declared by the trackpoint class or not.
+
+    Args:
+      prefix (str): Only count paths starting with this tag or path, eg.
+        ``'Extensions'`` for the extension fields of a TCX file.
+
+    Returns:
+      collections.Counter: Maps each leaf element's path, relative to its
+      trackpoint, to the number of times it appears. Paths are ordered by
+      first appearance.
+
+    Examples:
+
+      >>> gpx_obj.leaf_paths('extensions')
+      Counter({'extensions/TrackPointExtension/hr': 46,
+               'extensions/TrackPointExtension/cad': 46})
+
+    """
+    self._require_tree('leaf_paths')
+    tp_tag = self._descendent_class('trackpoints').TAG
+    counts = collections.Counter()
+    paths = {}  # leaf parent -> path of the parent below its trackpoint
+    for leaf in self.elem.xpath(f'.//{tp_tag}//*[not(*)]'):
+      parent = leaf.getparent()
+      parent_path = paths.get(parent)
+      if parent_path is None:
+        parent_path = _relative_path(parent, tp_tag)
+        paths[parent] = parent_path
+      path = f'{parent_path}/{leaf.tag}' if parent_path else leaf.tag
+      if prefix is None or path == prefix or path.startswith(f'{prefix}/'):
+        counts[path] += 1
+    return counts
+
+
+class TrackpointsMixin(object):
+  """Analysis methods for elements that contain trackpoints.
+
+  Mixed into the :class:`ActivityElement` subclasses with a
+  ``trackpoints`` descendent property, such as activities, laps, tracks
+  and courses, but not trackpoints themselves. Each method reads the
+  trackpoints' data with
+  :meth:`~ActivityElement.columns` and hands it to the module that
+  does the work.
+  """
+
+  def resample(self, freq_s=1.0, max_gap_s=None, gap='drop', fields=None):
+    """Resample the descendent trackpoints' data onto a regular time grid.
+
+    Data is read with :meth:`~ActivityElement.columns` and resampled with 
+    :func:`~activereader.resample.resample_columns`, which never 
+    interpolates across bouts (TCX ``Track``, GPX ``trkseg`` elements).
+
+    Args:
+      freq_s (float): Time between grid times, in seconds.
+      max_gap_s (float): The longest time between trackpoints that will be
+        interpolated across. Defaults to no limit (within a bout).
+      gap (str): ``'drop'`` to leave out grid times in gaps, or ``'nan'``
+        to keep them with missing data.
+      fields (list of str): Names of the trackpoint properties to read.
+        ``time`` is always read. Defaults to every declared property.
+
+    Returns:
+      dict: Resampled columns, as described in 
+      :func:`~activereader.resample.resample_columns`.
+
+    Examples:
+
+      >>> cols = tcx_obj.laps[0].resample(1, max_gap_s=10, fields=['hr'])
+      >>> cols['hr'][:3]
+      array([71., 73., 74.5])
+
+    """
+    from .resample import resample_columns
+
+    if fields is not None and 'time' not in fields:
+      fields = ['time'] + list(fields)
+    return resample_columns(
+      self.columns(fields), freq_s=freq_s, max_gap_s=max_gap_s, gap=gap
+    )
+
+  def derived_columns(self):
+    """Derive distance, speed, grade and bearing from trackpoint positions.
+
+    Useful for GPX files, whose trackpoints have no distance or speed, and
+    for TCX files without ``DistanceMeters``. Distance is not counted across
+    the jumps between bouts.
+
+    Returns:
+      dict: The ``time``, ``lat``, ``lon``, ``altitude_m`` and container
+      columns from :meth:`~ActivityElement.columns`, plus the derived ``distance_m``,
+      ``speed_ms``, ``grade`` and ``bearing_deg`` columns described in
+      :func:`~activereader.geo.derived_columns`.
+
+    Examples:
+
+      >>> gpx_obj.derived_columns()['distance_m'][-1]
+      1609.7
+
+    """
+    from . import geo
+
+    columns = self.columns(['time', 'lat', 'lon', 'altitude_m'])
+    columns.update(geo.derived_columns(columns))
+    return columns
+
+  def detect_bouts(self, max_gap_s=None, min_speed_ms=None):
+    """Find bouts of continuous movement among the descendent trackpoints.
+
+    Combines the bouts marked by the device (TCX ``Track``, GPX ``trkseg``)
+    with pauses found in the data. See :func:`activereader.bouts.detect_bouts`.
+
+    Args:
+      max_gap_s (float): The longest time between trackpoints of one bout.
+      min_speed_ms (float): The slowest speed that counts as moving.
+
+    Returns:
+      tuple(numpy.ndarray, numpy.ndarray): Offsets into :attr:`trackpoints`
+      of the first trackpoint of each bout, and of the one after the last.
+    """
+    from . import bouts
+
+    columns = self._available_columns(
+      'time', 'speed_ms', 'distance_m', 'lat', 'lon'
+    )
+    return bouts.detect_bouts(
+      columns, max_gap_s=max_gap_s, min_speed_ms=min_speed_ms
+    )
+
+  def moving_time_s(self, max_gap_s=None, min_speed_ms=None):
+    """Total time spent in the bouts found by :meth:`detect_bouts`.
+
+    Returns:
+      float: Moving time in seconds.
+    """
+    from . import bouts
+
+    columns = self._available_columns(
+      'time', 'speed_ms', 'distance_m', 'lat', 'lon'
+    )
+    return bouts.moving_time_s(
+      columns, max_gap_s=max_gap_s, min_speed_ms=min_speed_ms
+    )
+
+  def splits(self, distance_m=None, time_s=None):
+    """Split the descendent trackpoints every so many meters or seconds.
+
+    Positions are used for distance where the trackpoints have none, as
+    in GPX files. See :func:`activereader.splits.splits`.
+
+    Args:
+      distance_m (float): Split length in meters.
+      time_s (float): Split length in seconds. Give either this or
+        ``distance_m``.
+
+    Returns:
+      dict: Per-split time, distance, speed, pace, heart rate and
+      elevation arrays.
+
+    Examples:
+
+      >>> from activereader.splits import MILE_M
+      >>> tcx_obj.splits(distance_m=MILE_M)['time_s']
+      array([579.1, 578.8, 580.3, ...])
+
+    """
+    from .splits import splits
+
+    columns = self._available_columns(
+      'time', 'distance_m', 'lat', 'lon', 'altitude_m', 'hr'
+    )
+    return splits(columns, distance_m=distance_m, time_s=time_s)
+
+  def best_efforts(self, distances_m=None, durations_s=None):
+    """Find the fastest distances and farthest durations in this element.
+
+    See :func:`activereader.efforts.best_efforts`.
+
+    Args:
+      distances_m (iterable of float): Distances to find the fastest time
+        for, in meters. Defaults to
+        :data:`~activereader.efforts.DEFAULT_DISTANCES_M`.
+      durations_s (iterable of float): Durations to find the farthest
+        distance for, in seconds. Defaults to
+        :data:`~activereader.efforts.DEFAULT_DURATIONS_S`.
+
+    Returns:
+      list of activereader.efforts.Effort: Their ``start`` and ``stop``
+      offsets index into :attr:`trackpoints`.
+
+    Examples:
+
+      >>> tcx_obj.best_efforts(distances_m=[1000], durations_s=[])
+      [Effort(kind='distance', target=1000, start=1, stop=222, time_s=360.0, distance_m=1000.453)]
+
+    """
+    from . import efforts
+
+    if distances_m is None:
+      distances_m = efforts.DEFAULT_DISTANCES_M
+    if durations_s is None:
+      durations_s = efforts.DEFAULT_DURATIONS_S
+    columns = self._available_columns('time', 'distance_m', 'lat', 'lon')
+    return efforts.best_efforts(
+      columns, distances_m=distances_m, durations_s=durations_s
+    )
+
+  def to_polyline(self, precision=5, simplify=None):
+    """Encode the positions of the descendent trackpoints as a polyline.
+
+    Args:
+      precision (int): Number of decimal places kept. See
+        :func:`activereader.polyline.encode`.
+      simplify (callable): Takes trackpoint columns and returns a boolean
+        mask of the trackpoints to encode, like the functions in
+        :mod:`activereader.simplify`. Defaults to every trackpoint with a
+        position.
+
+    Returns:
+      str: The encoded polyline.
+
+    Examples:
+
+      >>> import functools
+      >>> from activereader.simplify import douglas_peucker
+      >>> gpx_obj.tracks[0].to_polyline(
+      ...   simplify=functools.partial(douglas_peucker, tolerance_m=5)
+      ... )
+      'ki{sFdl}_S...'
+
+    """
+    from . import polyline
+
+    if simplify is None:
+      columns = self.columns(['lat', 'lon'])
+    else:
+      columns = self._available_columns('time', 'lat', 'lon')
+      keep = simplify(columns)
+      columns = {name: columns[name][keep] for name in ('lat', 'lon')}
+    return polyline.encode(columns['lat'], columns['lon'], precision=precision)
+
+  def time_index(self, fields=None):
+    """Build an index for looking up descendent trackpoints by time.
+
+    Args:
+      fields (list of str): Names of the trackpoint properties to read
+        into the index's columns. ``time`` is always read. Defaults to 
+        every declared property.
+
+    Returns:
+      activereader.timeindex.TimeIndex: Answers ``between``, ``asof`` and
+      ``nearest`` queries with binary search. Offsets it returns index
+      into :attr:`trackpoints` as well as its columns.
+
+    Examples:
+
+      >>> index = tcx_obj.time_index()
+      >>> tcx_obj.trackpoints[index.nearest('2021-04-16T13:38:00Z')].hr
+      80
+
+    """
+    from .timeindex import TimeIndex
+
+    if fields is not None and 'time' not in fields:
+      fields = ['time'] + list(fields)
+    return TimeIndex(self.columns(fields))
+
+  def where(self, fields=None, offsets=False, **conditions):
+    """Select the descendent trackpoints whose data meets conditions.
+
+    Each condition is one comparison over a whole column (see
+    :mod:`activereader.query`), so no per-point wrappers are created. Only
+    the fields named in conditions are converted for every trackpoint;
+    the other requested fields are only converted for the trackpoints
+    that match.
+
+    Args:
+      fields (list of str): Names of the trackpoint properties to return.
+        Defaults to every declared property.
+      offsets (bool): Return the matching trackpoints' offsets into
+        :attr:`trackpoints` instead of their columns.
+      **conditions: Conditions such as ``hr__gt=160`` or
+        ``time__between=(t0, t1)``, on declared properties or container
+        columns (eg. ``lap=2``). Times may be given as datetimes, ISO 8601
+        strings or numpy datetime64 values.
+
+    Returns:
+      dict or numpy.ndarray: The matching trackpoints' columns, as in
+      :meth:`~ActivityElement.columns` (container ids are numbered within this element),
+      or their offsets.
+
+    Examples:
+
+      >>> cols = tcx_obj.where(['time', 'hr'], hr__gt=160)
+      >>> cols['hr'].min()
+      161
+      >>> tcx_obj.where(
+      ...   offsets=True,
+      ...   time__between=('2021-04-16T13:38:00Z', '2021-04-16T13:40:00Z'),
+      ...   cadence_rpm__isnull=False,
+      ... )
+      array([12, 13, 14, ...])
+
+    """
+    from . import query, util
+
+    tp_class = self._descendent_class('trackpoints')
+    props = tp_class._fields()
+    parsed = query.parse_conditions(
+      conditions, list(props) + list(tp_class.CONTAINERS)
+    )
+    tested = [
+      name for name in dict.fromkeys(cond[0] for cond in parsed)
+      if name in props
+    ]
+    columns = self.columns(tested)
+    selected = np.flatnonzero(query.mask(columns, parsed))
+    if offsets:
+      return selected
+
+    if fields is None:
+      fields = list(props)
+    unknown = [name for name in fields if name not in props]
+    if unknown:
+      raise KeyError(
+        f'{tp_class.__name__} has no data or attribute properties {unknown}'
+      )
+
+    names = list(fields) + list(tp_class.CONTAINERS)
+    untested = [name for name in fields if name not in columns]
+    result = {}
+    if self.is_compact:
+      columns.update(self.columns(untested))
+    elif untested:
+      # Convert only the matching trackpoints' text.
+      index = _element_index(self.elem.xpath(f'.//{tp_class.TAG}'))
+      for name in untested:
+        prop = props[name]
+        path = prop.path if isinstance(prop, DataProperty) else f'@{prop.key}'
+        texts = _column_texts(self.elem, tp_class.TAG, path, index)
+        result[name] = util.to_array(
+          [texts[i] for i in selected], prop.conv_type
+        )
+
+    return {
+      name: result[name] if name in result else columns[name][selected]
+      for name in names
+    }
+
+
+_SIMPLE_PATH = re.compile(r'^([\w-][\w.-]*/)*@?[\w-][\w.-]*$')
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_column_path(tag, path):
+  return etree.XPath(f'.//{tag}/{path}')
+
+
+def _element_index(elems):
+  """Map each of a list of lxml elements to its position in the list."""
+  return {elem: i for i, elem in enumerate(elems)}
+
+
+def _relative_path(elem, ancestor_tag):
+  """Path of elem below its nearest ancestor with the given tag."""
+  tags = []
+  while elem is not None and elem.tag != ancestor_tag:
+    tags.append(elem.tag)
+    elem = elem.getparent()
+  return '/'.join(reversed(tags))
+
+
+def _column_texts(root, tag, path, index):
+  """Find text at path below every element in index (all of root's tags).
+
+  Rather than searching below each element in turn, one compiled XPath
+  finds every match below root, and each match is traced back up to the
+  element it belongs to.
+
+  Returns:
+    list: Text of the first match below each element, or None.
+  """
+  texts = [None] * len(index)
+
+  if not _SIMPLE_PATH.match(path):
+    # Paths with predicates, wildcards etc. can't be traced back by depth.
+    for elem, i in index.items():
+      texts[i] = elem.findtext(path)
+    return texts
+
+  depth = path.count('/') + 1
+  for match in _compile_column_path(tag, path)(root):
+    if isinstance(match, str):
+      # Attribute value. getparent() is the element that holds it.
+      text, elem, depth_left = str(match), match.getparent(), depth - 1
+    else:
+      text, elem, depth_left = match.text or '', match, depth
+    for _ in range(depth_left):
+      elem = elem.getparent()
+    i = index[elem]
+    if texts[i] is None:
+      texts[i] = text
+
+  return texts
+
+
+def _container_ids(elems, tag):
+  """Number the ancestors with a given tag that contain each element."""
+  ids = np.full(len(elems), -1, dtype=np.int64)
+  seen = {}
+  prev_parent, prev_id = None, -1
+  for i, elem in enumerate(elems):
+    parent = elem.getparent()
+    if parent is not prev_parent:
+      prev_parent = parent
+      ancestor = next(elem.iterancestors(tag), None)
+      if ancestor is None:
+        prev_id = -1
+      else:
+        prev_id = seen.setdefault(ancestor, len(seen))
+    ids[i] = prev_id
+  return ids
+
 
 def add_xml_data(**property_paths_types):
   """Add properties to a class that access data using :meth:`get_data`.
@@ -386,8 +1128,46 @@ def add_xml_descendents(**descendent_classes):
   return add_descendent_properties
 
 
+DEFAULT_PARSER_OPTIONS = {
+  'remove_blank_text': True,
+  'remove_comments': True,
+  'remove_pis': True,
+  'huge_tree': True,
+  'resolve_entities': False,
+  'no_network': True,
+}
+"""Options for the :class:`lxml.etree.XMLParser` used by :class:`XmlReader`.
+
+Whitespace-only text, comments and processing instructions are dropped,
+since no activity data lives there and each would cost a node in the tree.
+``huge_tree`` lifts libxml2's limits on very large files, and entities and
+network access are turned off.
+"""
+
+
 class XmlReader:
-  """XmlReader provides an interface for reading in a XML file (eg GPX, TCX)."""
+  """XmlReader provides an interface for reading in a XML file (eg GPX, TCX).
+
+  Files are parsed with an :class:`lxml.etree.XMLParser` configured for the
+  file's format (see :meth:`configure_parser`). Each thread keeps its own
+  parser for each format, since lxml parsers cannot be shared between
+  threads, and reuses it from file to file. Parsers that validate against
+  the format's schema (see :mod:`activereader.validation`) are kept
+  separately.
+  """
+
+  parser_options = {}
+  """dict: Maps a format (eg. ``'tcx'``) to options that override
+  :data:`DEFAULT_PARSER_OPTIONS` for that format. Change it with
+  :meth:`configure_parser`."""
+
+  element_class_lookups = {}
+  """dict: Maps a format to the :class:`lxml.etree.ElementClassLookup` its
+  parser uses. Change it with :meth:`configure_parser`."""
+
+  _parser_version = 0
+  _local = threading.local()
+
   def __init__(self, filepath_or_buffer, ext='XML'):
     self.ext = ext
     data = self._get_data_from_filepath(filepath_or_buffer)
@@ -437,9 +1217,180 @@ class XmlReader:
     # data = data.read()
     return data
 
-  def read(self):
-    """Read the whole input into a :class:`lxml.etree._Element`"""
-    tree = etree.parse(self.data)
-    root = tree.getroot()
+  @classmethod
+  def configure_parser(cls, ext, lookup=None, **options):
+    """Tune the parser used for one format.
+
+    Args:
+      ext (str): The format, eg. ``'tcx'`` or ``'gpx'``.
+      lookup (lxml.etree.ElementClassLookup): Hook that picks the Python
+        class of each parsed element. Defaults to lxml's own.
+      **options: :class:`lxml.etree.XMLParser` options, which override
+        :data:`DEFAULT_PARSER_OPTIONS` (and earlier calls) for this format.
+
+    Examples:
+
+      >>> XmlReader.configure_parser('gpx', remove_blank_text=False)
+
+    """
+    ext = ext.lower()
+    cls.parser_options = {
+      **cls.parser_options,
+      ext: {**cls.parser_options.get(ext, {}), **options},
+    }
+    if lookup is not None:
+      cls.element_class_lookups = {**cls.element_class_lookups, ext: lookup}
+    # Parsers that threads already made are rebuilt on their next use.
+    cls._parser_version += 1
+
+  @classmethod
+  def reset_parsers(cls):
+    """Return every format to the default parser configuration."""
+    cls.parser_options = {}
+    cls.element_class_lookups = {}
+    cls._parser_version += 1
+
+  @classmethod
+  def get_parser_options(cls, ext):
+    """The XMLParser options used for a format.
+
+    Returns:
+      dict: :data:`DEFAULT_PARSER_OPTIONS` with the format's overrides.
+    """
+    return {**DEFAULT_PARSER_OPTIONS, **cls.parser_options.get(ext.lower(), {})}
+
+  @classmethod
+  def get_parser(cls, ext, validate=False):
+    """This thread's parser for a format, created on first use.
+
+    Args:
+      ext (str): The format, eg. ``'tcx'`` or ``'gpx'``.
+      validate (bool): Whether the parser checks documents against the
+        format's schema as it parses them.
+
+    Returns:
+      lxml.etree.XMLParser
+    """
+    ext = ext.lower()
+    parsers = getattr(cls._local, 'parsers', None)
+    if parsers is None:
+      parsers = cls._local.parsers = {}
+
+    key = (ext, validate)
+    version, parser = parsers.get(key, (None, None))
+    if version != cls._parser_version:
+      options = cls.get_parser_options(ext)
+      if validate:
+        from . import validation
+
+        options['schema'] = validation.get_schema(ext)
+      parser = etree.XMLParser(**options)
+      lookup = cls.element_class_lookups.get(ext)
+      if lookup is not None:
+        parser.set_element_class_lookup(lookup)
+      parsers[key] = (cls._parser_version, parser)
+    return parser
+
+  def read(self, simplify=None, point_class=None, validate=False):
+    """Read the whole input into a :class:`lxml.etree._Element`
+
+    Args:
+      simplify (callable): Takes trackpoint columns and returns a boolean
+        mask of the trackpoints to keep, like the functions in
+        :mod:`activereader.simplify`. If given, trackpoints are dropped from
+        the tree while it is parsed.
+      point_class (type): The trackpoint class, whose ``TAG`` and fields
+        are used by ``simplify``. Required with ``simplify``.
+      validate (bool): Check the input against the format's schema while
+        parsing it.
+
+    Raises:
+      activereader.validation.ValidationError: If ``validate`` is True and
+        the input does not match the schema.
+    """
+    from . import util
+
+    if simplify is None:
+      parser = self.get_parser(self.ext, validate=validate)
+      try:
+        tree = etree.parse(self.data, parser=parser)
+      except etree.XMLSyntaxError as e:
+        if validate:
+          raise self._validation_error(parser.error_log) from e
+        raise
+      root = tree.getroot()
+    else:
+      from .simplify import StreamSimplifier
+
+      options = self.get_parser_options(self.ext)
+      if validate:
+        from . import validation
+
+        options['schema'] = validation.get_schema(self.ext)
+      stream = StreamSimplifier(simplify, point_class)
+      events = etree.iterparse(
+        self.data,
+        events=('end',),
+        tag=f'{{*}}{point_class.TAG}',
+        **options
+      )
+      lookup = self.element_class_lookups.get(self.ext.lower())
+      if lookup is not None:
+        events.set_element_class_lookup(lookup)
+      try:
+        for _, elem in events:
+          stream.add(elem)
+      except etree.XMLSyntaxError as e:
+        if validate:
+          raise self._validation_error(events.error_log) from e
+        raise
+      stream.flush()
+      root = events.root
     util.strip_namespaces(root)
     return root
+
+  def _validation_error(self, error_log):
+    """Describe why the input failed validation while it was parsed.
+
+    libxml2 stops parsing at the first schema error, and does not know
+    its line. Rejected inputs are parsed once more, without the schema,
+    and the tree is checked so that every error is listed with its line.
+    Valid inputs never pay for this.
+    """
+    from . import validation
+
+    source = self._source_name()
+    schema_errors = [
+      entry for entry in error_log
+      if entry.domain == etree.ErrorDomains.SCHEMASV
+    ]
+    if not schema_errors:
+      # The input is not well-formed XML; the parser knows where.
+      return validation.ValidationError.from_error_log(
+        error_log, self.ext, source=source
+      )
+    if hasattr(self.data, 'seek'):
+      self.data.seek(0)
+    parser = self.get_parser(self.ext)
+    try:
+      tree = etree.parse(self.data, parser=parser)
+    except etree.XMLSyntaxError:
+      # Also not well-formed, further on.
+      return validation.ValidationError.from_error_log(
+        parser.error_log, self.ext, source=source
+      )
+    try:
+      validation.validate(tree, self.ext)
+    except validation.ValidationError as e:
+      e.source = source
+      e.args = (e._summary(),)
+      return e
+    return validation.ValidationError.from_error_log(
+      schema_errors, self.ext, source=source
+    )
+
+  def _source_name(self):
+    """The input's file name, for error messages, if it has one."""
+    if isinstance(self.data, str):
+      return os.path.basename(self.data)
+    return None
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Detect bouts of activity, and the pauses between them.
+
+Devices mark some pauses themselves, by starting a new TCX ``Track`` or GPX
+``trkseg``. Others only show up in the data: a long wait between
+trackpoints (auto-pause, or smart recording while stopped), or trackpoints
+recorded while standing still. The functions here find both kinds with
+array arithmetic on the columns from
+:meth:`ActivityElement.columns<activereader.base.ActivityElement.columns>`.
+
+See also:
+  :ref:`data.tcx.start_stop_pause`
+"""
+import numpy as np
+
+from . import geo, util
+
+
+def point_speeds(columns):
+  """Speed at each trackpoint, from the best source in the columns.
+
+  The device's own ``speed_ms`` is used where present. Elsewhere, speed is
+  the change in ``distance_m`` over time since the previous trackpoint, or
+  failing that the speed derived from positions by
+  :func:`~activereader.geo.derived_columns`. Speeds are never taken
+  across a bout boundary.
+
+  Args:
+    columns (dict): Trackpoint columns. Must include ``time``.
+
+  Returns:
+    numpy.ndarray: Speeds in meters per second, NaN where unknown.
+  """
+  n = len(columns['time'])
+  speed = np.full(n, np.nan)
+  if 'speed_ms' in columns:
+    speed = np.array(columns['speed_ms'], dtype=np.float64)
+  if not np.isnan(speed).any():
+    return speed
+
+  if 'distance_m' in columns and not np.isnan(columns['distance_m']).all():
+    seconds = util.to_seconds(columns['time'])
+    bouts = columns.get('bout', np.zeros(n, dtype=np.int64))
+    derived = np.full(n, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+      derived[1:] = np.diff(columns['distance_m']) / np.diff(seconds)
+    derived[1:][np.diff(bouts) != 0] = np.nan
+    derived[~np.isfinite(derived)] = np.nan
+  elif 'lat' in columns and 'lon' in columns:
+    derived = geo.derived_columns(columns)['speed_ms']
+  else:
+    return speed
+
+  missing = np.isnan(speed)
+  speed[missing] = derived[missing]
+  return speed
+
+
+def detect_bouts(columns, max_gap_s=None, min_speed_ms=None):
+  """Find the bouts of continuous movement in trackpoint columns.
+
+  A bout ends where the device started a new one (a change in ``bout``),
+  where the time to the next trackpoint is more than ``max_gap_s``, and
+  where trackpoints are slower than ``min_speed_ms``, which are left out
+  of any bout. Trackpoints of unknown speed count as moving.
+
+  Args:
+    columns (dict): Trackpoint columns, as returned by
+      :meth:`~activereader.base.ActivityElement.columns`. Must include
+      ``time``; speed comes from :func:`point_speeds`.
+    max_gap_s (float): The longest time between trackpoints of one bout.
+      Defaults to no limit.
+    min_speed_ms (float): The slowest speed that counts as moving, in
+      meters per second. Defaults to no limit.
+
+  Returns:
+    tuple(numpy.ndarray, numpy.ndarray): Offsets of the first trackpoint of
+    each bout, and of the trackpoint after the last (like a slice's stop).
+
+  Examples:
+
+    >>> starts, stops = detect_bouts(tcx_obj.columns(), max_gap_s=10)
+    >>> [tcx_obj.trackpoints[start].time for start in starts]
+
+  """
+  times = columns['time']
+  n = len(times)
+
+  breaks = np.zeros(n, dtype=bool)  # a bout can't continue into point i
+  if n:
+    breaks[0] = True
+  if 'bout' in columns:
+    breaks[1:] |= np.diff(columns['bout']) != 0
+  seconds = util.to_seconds(times)
+  if max_gap_s is not None:
+    with np.errstate(invalid='ignore'):
+      breaks[1:] |= np.diff(seconds) > max_gap_s
+
+  moving = ~np.isnat(times)
+  if min_speed_ms is not None:
+    with np.errstate(invalid='ignore'):
+      moving &= ~(point_speeds(columns) < min_speed_ms)
+
+  previous_moving = np.concatenate([[False], moving[:-1]])
+  starts = np.flatnonzero(moving & (breaks | ~previous_moving))
+
+  next_breaks = np.concatenate([breaks[1:], [True]])
+  next_moving = np.concatenate([moving[1:], [False]])
+  stops = np.flatnonzero(moving & (next_breaks | ~next_moving)) + 1
+
+  return starts, stops
+
+
+def moving_time_s(columns, max_gap_s=None, min_speed_ms=None):
+  """Total time spent in the bouts found by :func:`detect_bouts`.
+
+  Each bout lasts from its first trackpoint's time to its last's.
+
+  Returns:
+    float: Moving time in seconds.
+  """
+  starts, stops = detect_bouts(
+    columns, max_gap_s=max_gap_s, min_speed_ms=min_speed_ms
+  )
+  seconds = util.to_seconds(columns['time'])
+  return float(np.sum(seconds[stops - 1] - seconds[starts]))
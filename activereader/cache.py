@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""Keep parsed activities in memory for long-running processes.
+
+An :class:`ActivityCache` maps file paths to compacted activity elements
+(see :meth:`ActivityElement.compact<activereader.base.ActivityElement.compact>`).
+An entry is only used while the file's modification time and size are
+unchanged. Memory is limited by the size of the cached data rather than a
+number of entries, and the least recently used activities are evicted
+first.
+
+The cache can be shared by any number of threads. Threads asking for a
+file that is already being read wait for that read rather than starting
+their own. Compacted elements are only read from, never changed, so the
+same element can be handed to every thread.
+
+Examples:
+
+  >>> from activereader import cache
+  >>> tcx_obj = cache.read('activity.tcx')  # Parses the file.
+  >>> tcx_obj = cache.read('activity.tcx')  # Served from memory.
+  >>> cache.default_cache.info()
+  CacheInfo(hits=1, misses=1, evictions=0, entries=1, nbytes=27734, max_bytes=268435456)
+
+"""
+import collections
+import os
+import threading
+
+from . import fit, gpx, tcx
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+"""Memory budget of :data:`default_cache`, in bytes."""
+
+READERS = {'.tcx': tcx.Tcx, '.gpx': gpx.Gpx, '.fit': fit.Fit}
+"""Maps file extensions to the class that reads them."""
+
+CacheInfo = collections.namedtuple(
+  'CacheInfo',
+  ['hits', 'misses', 'evictions', 'entries', 'nbytes', 'max_bytes']
+)
+CacheInfo.__doc__ = """Counters and size of an :class:`ActivityCache`."""
+
+
+class _Loading(object):
+  """A read in progress, which other threads can wait for."""
+  def __init__(self):
+    self.done = threading.Event()
+    self.element = None
+    self.error = None
+
+
+class ActivityCache(object):
+  """Thread-safe LRU cache of parsed activity files.
+
+  Args:
+    max_bytes (int): Most memory the cached activities may take up,
+      as given by :attr:`CompactStore.nbytes<activereader.compact.CompactStore.nbytes>`.
+      An activity bigger than this on its own is returned but not kept.
+  """
+  def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+    self.max_bytes = max_bytes
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self._entries = collections.OrderedDict()  # path: (stamp, element, nbytes)
+    self._loading = {}  # (path, stamp): _Loading
+    self._nbytes = 0
+    self._lock = threading.Lock()
+
+  def get(self, path, reader=None):
+    """Get the compacted activity element read from a file.
+
+    Args:
+      path (str or os.PathLike): Path of the activity file.
+      reader (type): Class whose ``from_file`` reads the file. Defaults
+        to the one for the file's extension in :data:`READERS`.
+
+    Returns:
+      ActivityElement: The compacted element. Callers share it, so it
+      should not be changed.
+
+    Raises:
+      ValueError: If no reader is given and the extension is unknown.
+
+    Examples:
+
+      >>> activity_cache = ActivityCache(max_bytes=64 * 1024 ** 2)
+      >>> activity_cache.get('activity.tcx').laps[0].trackpoints[0].hr
+      71
+
+    """
+    path = os.path.abspath(os.fspath(path))
+    if reader is None:
+      ext = os.path.splitext(path)[1].lower()
+      if ext not in READERS:
+        raise ValueError(f'No reader for "{ext}" files: {path}')
+      reader = READERS[ext]
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    with self._lock:
+      entry = self._entries.get(path)
+      if entry is not None and entry[0] == stamp:
+        self._entries.move_to_end(path)
+        self.hits += 1
+        return entry[1]
+
+      loading = self._loading.get((path, stamp))
+      owner = loading is None
+      if owner:
+        self.misses += 1
+        loading = self._loading[path, stamp] = _Loading()
+      else:
+        # Another thread is already reading this file.
+        self.hits += 1
+
+    if not owner:
+      loading.done.wait()
+      if loading.error is not None:
+        raise loading.error
+      return loading.element
+
+    try:
+      element = reader.from_file(path).compact()
+    except BaseException as error:
+      loading.error = error
+      raise
+    else:
+      loading.element = element
+      with self._lock:
+        self._store(path, stamp, element)
+      return element
+    finally:
+      with self._lock:
+        del self._loading[path, stamp]
+      loading.done.set()
+
+  def _store(self, path, stamp, element):
+    """Add an entry and evict down to the budget. Call with the lock held."""
+    self._remove(path)
+    nbytes = element._compact.nbytes
+    if nbytes > self.max_bytes:
+      return
+    self._entries[path] = (stamp, element, nbytes)
+    self._nbytes += nbytes
+    while self._nbytes > self.max_bytes:
+      evicted = next(iter(self._entries))
+      self._remove(evicted)
+      self.evictions += 1
+
+  def _remove(self, path):
+    entry = self._entries.pop(path, None)
+    if entry is not None:
+      self._nbytes -= entry[2]
+
+  def discard(self, path):
+    """Drop a file's activity from the cache, if it is there."""
+    with self._lock:
+      self._remove(os.path.abspath(os.fspath(path)))
+
+  def clear(self):
+    """Drop every cached activity and reset the counters."""
+    with self._lock:
+      self._entries.clear()
+      self._nbytes = 0
+      self.hits = self.misses = self.evictions = 0
+
+  def info(self):
+    """Get the cache's counters and size.
+
+    A request that waits for another thread's read of the same file
+    counts as a hit, since it does not read the file itself.
+
+    Returns:
+      CacheInfo
+    """
+    with self._lock:
+      return CacheInfo(
+        self.hits, self.misses, self.evictions, len(self._entries),
+        self._nbytes, self.max_bytes
+      )
+
+  def __len__(self):
+    return len(self._entries)
+
+
+default_cache = ActivityCache()
+"""Process-wide cache used by :func:`read`."""
+
+
+def read(path, reader=None):
+  """Read an activity file through :data:`default_cache`.
+
+  See :meth:`ActivityCache.get`.
+  """
+  return default_cache.get(path, reader=reader)
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""Array-based storage that stands in for a released lxml tree.
+
+See :meth:`ActivityElement.compact<activereader.base.ActivityElement.compact>`.
+
+Trackpoint-like elements (those whose class declares
+:attr:`~activereader.base.ActivityElement.CONTAINERS`) keep only the data
+their class declares, one typed array per field. All other elements are few
+in number, so they keep their attributes and the text of all their
+subelements, which lets :meth:`~activereader.base.ActivityElement.get_data`
+work with any path.
+"""
+import datetime
+import sys
+
+import numpy as np
+
+from . import base, util
+
+
+def _field_path(prop):
+  """Path that reads a data or attribute property's value, as in column()."""
+  if isinstance(prop, base.DataProperty):
+    return prop.path
+  return f'@{prop.key}'
+
+
+def _direct_descendent_classes(cls):
+  """Classes behind cls's descendent properties."""
+  classes = []
+  for name in dir(cls):
+    prop = getattr(cls, name, None)
+    if isinstance(prop, base.DescendentProperty):
+      if prop.descendent_class not in classes:
+        classes.append(prop.descendent_class)
+  return classes
+
+
+def _descendent_classes(cls):
+  """All classes reachable through descendent properties, cls first."""
+  classes = [cls]
+  for klass in classes:
+    for desc_class in _direct_descendent_classes(klass):
+      if desc_class not in classes:
+        classes.append(desc_class)
+  return classes
+
+
+def _ancestor_positions(elems, tag, index):
+  """Position (in index) of the nearest ancestor with tag, for each elem."""
+  positions = np.full(len(elems), -1, dtype=np.int64)
+  prev_parent, prev_position = None, -1
+  for i, elem in enumerate(elems):
+    parent = elem.getparent()
+    if parent is not prev_parent:
+      prev_parent = parent
+      ancestor = next(elem.iterancestors(tag), None)
+      prev_position = -1 if ancestor is None else index.get(ancestor, -1)
+    positions[i] = prev_position
+  return positions
+
+
+def _leaf_texts(elem, stop_tags, prefix=''):
+  """Map the path of each subelement with text to its text.
+
+  Subtrees of elements with any of stop_tags are left out, since those
+  elements are stored in their own right. Only the first subelement at each
+  path counts, like :meth:`~lxml.etree._Element.findtext`.
+  """
+  texts = {}
+  for child in elem:
+    if not isinstance(child.tag, str) or child.tag in stop_tags:
+      continue
+    path = f'{prefix}{child.tag}'
+    if len(child):
+      for sub_path, text in _leaf_texts(child, stop_tags, f'{path}/').items():
+        texts.setdefault(sub_path, text)
+    else:
+      texts.setdefault(path, child.text or '')
+  return texts
+
+
+def _to_scalar(value, stored_type):
+  """Turn an array item back into what get_data would return, or None."""
+  if value is np.ma.masked or value is None:
+    return None
+  if stored_type == float:
+    return None if np.isnan(value) else float(value)
+  if stored_type == int:
+    return int(value)
+  if stored_type == datetime.datetime:
+    if np.isnat(value):
+      return None
+    from dateutil import tz
+
+    return value.astype('datetime64[us]').item().replace(tzinfo=tz.UTC)
+  return value
+
+
+def _object_nbytes(obj):
+  """Approximate memory held by nested dicts, lists, tuples and strings."""
+  total = sys.getsizeof(obj)
+  if isinstance(obj, dict):
+    total += sum(_object_nbytes(k) + _object_nbytes(v) for k, v in obj.items())
+  elif isinstance(obj, (list, tuple)):
+    total += sum(_object_nbytes(item) for item in obj)
+  return total
+
+
+def _split_array(array):
+  """Turn an array into plain arrays that pickle protocol 5 can send out-of-band.
+
+  Masked arrays pickle their data as bytes, and datetime arrays are always
+  pickled in-band, so they are stored as (kind, plain arrays...) tuples.
+  """
+  if isinstance(array, np.ma.MaskedArray):
+    return ('masked', np.ma.getdata(array), np.ma.getmaskarray(array))
+  if array.dtype.kind == 'M':
+    return ('datetime', array.view(np.int64), array.dtype.str)
+  return array
+
+
+def _join_array(array):
+  if not isinstance(array, tuple):
+    return array
+  if array[0] == 'masked':
+    return np.ma.MaskedArray(array[1], mask=array[2], copy=False)
+  return array[1].view(array[2])
+
+
+class CompactStore(object):
+  """Holds the data of an element and its descendents in arrays.
+
+  Elements served from the store are identified by their class and their
+  position among the store's elements of that class, in document order.
+
+  Args:
+    root (ActivityElement): The element to take data from. Its lxml
+      element is only read, not changed.
+  """
+  def __init__(self, root):
+    self.root_class = type(root)
+    self.classes = _descendent_classes(self.root_class)
+
+    elems = {self.root_class: [root.elem]}
+    for cls in self.classes[1:]:
+      elems[cls] = root.elem.xpath(f'.//{cls.TAG}')
+    stop_tags = {cls.TAG for cls in self.classes}
+
+    self.counts = {cls: len(elems[cls]) for cls in self.classes}
+    self.ancestors = {}
+    self.fields = {}
+    self.field_types = {}
+    self.containers = {}
+    self.records = {}
+
+    for cls in self.classes:
+      index = base._element_index(elems[cls])
+
+      if cls is not self.root_class:
+        for desc_class in _direct_descendent_classes(cls):
+          if desc_class in self.counts:
+            self.ancestors[desc_class, cls] = _ancestor_positions(
+              elems[desc_class], cls.TAG, index
+            )
+
+      if cls.CONTAINERS:
+        self.fields[cls], self.field_types[cls] = {}, {}
+        for prop in cls._fields().values():
+          path = _field_path(prop)
+          if cls is self.root_class:
+            # The search below root would never match root itself.
+            texts = [util.field_text(root.elem, prop)]
+          else:
+            texts = base._column_texts(root.elem, cls.TAG, path, index)
+          self.fields[cls][path] = util.to_array(texts, prop.conv_type)
+          self.field_types[cls][path] = prop.conv_type
+        self.containers[cls] = {
+          name: base._container_ids(elems[cls], tag)
+          for name, tag in cls.CONTAINERS.items()
+        }
+      else:
+        self.records[cls] = [
+          (dict(elem.attrib), _leaf_texts(elem, stop_tags))
+          for elem in elems[cls]
+        ]
+
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    state['fields'] = {
+      cls: {path: _split_array(array) for path, array in arrays.items()}
+      for cls, arrays in self.fields.items()
+    }
+    return state
+
+  def __setstate__(self, state):
+    state['fields'] = {
+      cls: {path: _join_array(array) for path, array in arrays.items()}
+      for cls, arrays in state['fields'].items()
+    }
+    self.__dict__.update(state)
+
+  @property
+  def nbytes(self):
+    """int: Approximate memory held by the store, in bytes.
+
+    Counts every array (with masks, and the strings in object arrays),
+    the ancestor positions, and the records of non-trackpoint elements.
+    """
+    arrays = [
+      array for arrays in list(self.fields.values()) + list(self.containers.values())
+      for array in arrays.values()
+    ]
+    arrays.extend(self.ancestors.values())
+    total = 0
+    for array in arrays:
+      total += array.nbytes
+      if isinstance(array, np.ma.MaskedArray):
+        total += np.ma.getmaskarray(array).nbytes
+      if array.dtype == object:
+        total += sum(sys.getsizeof(value) for value in array if value is not None)
+    return total + sum(_object_nbytes(records) for records in self.records.values())
+
+  def descendent_positions(self, cls, position, descendent_class):
+    """Positions of the elements of descendent_class inside an element."""
+    if descendent_class not in self.counts:
+      return np.empty(0, dtype=np.int64)
+    if cls is self.root_class:
+      return np.arange(self.counts[descendent_class])
+    ancestors = self.ancestors.get((descendent_class, cls))
+    if ancestors is None:
+      return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(ancestors == position)
+
+  def _point_value(self, cls, position, path, conv_type):
+    if path not in self.fields[cls]:
+      raise KeyError(
+        f'"{path}" is not a declared field of {cls.__name__}, so it was '
+        f'not kept when the element was compacted.'
+      )
+    stored_type = self.field_types[cls][path]
+    value = _to_scalar(self.fields[cls][path][position], stored_type)
+    if value is None or conv_type == stored_type:
+      return value
+    return util.get_conv_func(conv_type)(str(value))
+
+  def get_data(self, cls, position, path, conv_type):
+    if cls in self.fields:
+      return self._point_value(cls, position, path, conv_type)
+    data = self.records[cls][position][1].get(path)
+    return None if data is None else util.get_conv_func(conv_type)(data)
+
+  def get_attr(self, cls, position, key, conv_type):
+    if cls in self.fields:
+      return self._point_value(cls, position, f'@{key}', conv_type)
+    attr = self.records[cls][position][0].get(key)
+    return None if attr is None else util.get_conv_func(conv_type)(attr)
+
+  def column(self, cls, position, tp_class, path, conv_type):
+    positions = self.descendent_positions(cls, position, tp_class)
+    fields = self.fields.get(tp_class, {})
+    if path not in fields:
+      raise KeyError(
+        f'"{path}" is not a declared field of {tp_class.__name__}, so it '
+        f'was not kept when the element was compacted.'
+      )
+    values = fields[path][positions]
+    stored_type = self.field_types[tp_class][path]
+    if conv_type == stored_type:
+      return values
+    if stored_type == int and conv_type == float:
+      return np.ma.filled(values.astype(np.float64), np.nan)
+    raise TypeError(
+      f'"{path}" was kept as {stored_type.__name__}, '
+      f'not {conv_type.__name__}.'
+    )
+
+  def columns(self, cls, position, tp_class, props):
+    positions = self.descendent_positions(cls, position, tp_class)
+    columns = {
+      name: self.fields[tp_class][_field_path(prop)][positions]
+      for name, prop in props.items()
+    }
+    for name, ids in self.containers[tp_class].items():
+      # Renumber containers from 0 within this element.
+      ids = ids[positions]
+      valid = ids >= 0
+      relative = np.full(len(ids), -1, dtype=np.int64)
+      relative[valid] = np.unique(ids[valid], return_inverse=True)[1]
+      columns[name] = relative
+    return columns
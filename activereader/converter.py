@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""Convert between TCX and GPX files in one streaming pass.
+
+Trackpoints are read with :func:`lxml.etree.iterparse` and removed from the
+source tree as soon as their data is taken, then handed to a writer from
+:mod:`activereader.writer` a chunk at a time. Neither file is ever held in
+memory as a whole.
+
+Each TCX ``Track`` becomes a GPX ``trkseg``, so pauses between tracks are
+kept, and each GPX ``trkseg`` becomes a TCX ``Lap``. The trackpoint fields
+both formats declare (time, position, elevation, heart rate and cadence)
+are carried over. Trackpoints the target format cannot hold are left out,
+like GPX trackpoints without a position; see :mod:`activereader.writer`.
+"""
+import io
+import os
+import re
+
+import numpy as np
+from lxml import etree
+
+from . import gpx, tcx, util, writer
+from .base import XmlReader
+
+
+CHUNK_SIZE = 4096
+"""Number of trackpoints passed to the writer at a time."""
+
+FORMATS = {
+  'tcx': ('TrainingCenterDatabase', tcx.Trackpoint, 'Lap'),
+  'gpx': ('gpx', gpx.Trackpoint, 'trkseg'),
+}
+"""Maps each format to its root tag, trackpoint class and grouping tag."""
+
+SEGMENT_TAGS = {'tcx': 'Track', 'gpx': 'trkseg'}
+"""Maps each format to the tag of an unbroken run of trackpoints."""
+
+
+def _source_format(src):
+  """Guess a source's format before parsing it, to pick its parser options.
+
+  Paths and named file objects go by their extension (ignoring ``.gz``),
+  and contents by their root tag. Anything else gets the ``'xml'`` options.
+  """
+  name = src if isinstance(src, str) else getattr(src, 'name', None)
+  if isinstance(name, str):
+    if name.lower().endswith('.gz'):
+      name = name[:-3]
+    ext = os.path.splitext(name)[1][1:].lower()
+    if ext in FORMATS:
+      return ext
+  if isinstance(src, bytes):
+    for ext, (root, _, _) in FORMATS.items():
+      if re.search(rb'<(\w+:)?' + root.encode() + rb'[\s>/]', src[:4096]):
+        return ext
+  return 'xml'
+
+
+class _Groups(object):
+  """Collect trackpoint text by group, and pass it on in column chunks.
+
+  Segments (unbroken runs of trackpoints) become GPX segments, or TCX
+  tracks within the group's lap.
+  """
+  def __init__(self, fields, to, out):
+    self.fields = fields
+    self.to = to
+    self.out = out
+    self._texts = {name: [] for name in fields}
+    self._bouts = []
+    self._bout = 0
+    self._chunks = []
+    self._open = False
+
+  def add(self, elem):
+    for name, prop in self.fields.items():
+      self._texts[name].append(util.field_text(elem, prop))
+    self._bouts.append(self._bout)
+    if len(self._bouts) >= CHUNK_SIZE:
+      self._flush()
+
+  def _flush(self):
+    if not self._bouts:
+      return
+    columns = {
+      name: util.to_array(texts, self.fields[name].conv_type)
+      for name, texts in self._texts.items()
+    }
+    columns['bout'] = np.array(self._bouts, dtype=np.int64)
+    self._texts = {name: [] for name in self.fields}
+    self._bouts = []
+
+    if self.to == 'gpx':
+      if not self._open:
+        self.out.start_segment()
+        self._open = True
+      self.out.write_trackpoints(columns)
+    else:
+      # A TCX lap's totals come first, so the lap's columns are held.
+      self._chunks.append(columns)
+
+  def end_segment(self):
+    """Finish the current segment."""
+    self._flush()
+    if self._open:
+      self.out.end_segment()
+      self._open = False
+    self._bout += 1
+
+  def end(self):
+    """Finish the current group."""
+    self.end_segment()
+    if self._chunks:
+      self.out.write_lap({
+        name: np.ma.concatenate([chunk[name] for chunk in self._chunks])
+        if isinstance(self._chunks[0][name], np.ma.MaskedArray)
+        else np.concatenate([chunk[name] for chunk in self._chunks])
+        for name in self._chunks[0]
+      })
+      self._chunks = []
+
+
+def convert(src, dst, to='gpx', **kwargs):
+  """Convert a TCX or GPX file to either format.
+
+  Args:
+    src (str, bytes or file-like): Source file path, contents or binary
+      file object. Its format is read from the root element. It is
+      parsed with the options set for its format by
+      :meth:`XmlReader.configure_parser<activereader.base.XmlReader.configure_parser>`.
+    dst (str or file-like): Destination path or binary file object, like
+      one from :func:`gzip.open`.
+    to (str): Format to write: ``'gpx'`` or ``'tcx'``.
+    **kwargs: Passed to :class:`~activereader.writer.GpxWriter` or
+      :class:`~activereader.writer.TcxWriter`, eg. ``name`` or ``sport``.
+
+  Examples:
+
+    >>> import activereader
+    >>> activereader.convert('activity.tcx', 'activity.gpx', to='gpx')
+
+  """
+  if to not in FORMATS:
+    raise ValueError(f'to must be one of {list(FORMATS)}, not "{to}"')
+  parser_options = XmlReader.get_parser_options(_source_format(src))
+  if isinstance(src, bytes):
+    src = io.BytesIO(src)
+
+  target_fields = FORMATS[to][1]._fields()
+  writer_class = writer.GpxWriter if to == 'gpx' else writer.TcxWriter
+
+  groups = None
+  with writer_class(dst, **kwargs) as out:
+    tags = [
+      f'{{*}}{tag}' for name, (root, point_class, group_tag) in FORMATS.items()
+      for tag in (root, point_class.TAG, group_tag, SEGMENT_TAGS[name])
+    ]
+    events = etree.iterparse(
+      src, events=('start', 'end'), tag=tags,
+      **parser_options
+    )
+    for event, elem in events:
+      tag = etree.QName(elem).localname
+
+      if groups is None:
+        formats = {root: name for name, (root, _, _) in FORMATS.items()}
+        if tag not in formats:
+          raise ValueError(f'Expected a TCX or GPX file, not one with a "{tag}" root')
+        _, point_class, group_tag = FORMATS[formats[tag]]
+        segment_tag = SEGMENT_TAGS[formats[tag]]
+        fields = {
+          name: prop for name, prop in point_class._fields().items()
+          if name in target_fields
+        }
+        groups = _Groups(fields, to, out)
+
+      elif event == 'end' and tag == point_class.TAG:
+        groups.add(elem)
+        # Free the trackpoint, and any already-read siblings before it.
+        elem.clear()
+        parent = elem.getparent()
+        while elem.getprevious() is not None:
+          del parent[0]
+
+      elif event == 'end' and tag == group_tag:
+        groups.end()
+        elem.clear()
+
+      elif event == 'end' and tag == segment_tag:
+        groups.end_segment()
+
+    if groups is None:
+      raise ValueError('Expected a TCX or GPX file')
+    groups.end()
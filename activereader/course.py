@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""Match an activity against a planned course.
+
+:class:`CourseMatcher` projects every trackpoint of an activity onto a
+course's polyline, giving how far along the course each trackpoint is and
+how far off it. The course is read once, from a TCX
+:class:`~activereader.tcx.Course`, a GPX :class:`~activereader.gpx.Route`,
+or any element or columns with positions (eg. an earlier activity).
+
+The course's segments are registered in a grid of square cells. Each
+trackpoint is only compared with the segments in its own and the eight
+surrounding cells, all trackpoints at once, so matching costs about
+O(n + m) array work for n trackpoints and m course points, rather than
+O(n·m). The few trackpoints with no segment nearby, which are more than a
+cell off course, are compared with every segment.
+
+Positions are projected onto a plane tangent to the course's middle, so
+distances are within about 0.5% for courses up to a few hundred
+kilometers across.
+
+Examples:
+
+  >>> matcher = CourseMatcher(Tcx.from_file('course.tcx').courses[0])
+  >>> matched = matcher.match_activity(Gpx.from_file('race.gpx'))
+  >>> matched['course_distance_m'][-1], np.nanmax(matched['deviation_m'])
+  (25241.3, 38.2)
+
+"""
+import numpy as np
+
+from . import geo
+from .spatial import _expand
+
+
+DEFAULT_CELL_M = 100.0
+"""Default size of the grid cells, in meters."""
+
+DEFAULT_AMBIGUITY_M = 25.0
+"""Default margin for treating two course passes as equally near."""
+
+_BRUTE_FORCE_PAIRS = 1 << 20
+
+_MAX_PIECES = 1 << 20
+
+
+class CourseMatcher(object):
+  """Project trackpoints onto a course.
+
+  Args:
+    course (ActivityElement or dict): A course element, like a TCX
+      :class:`~activereader.tcx.Course` or GPX
+      :class:`~activereader.gpx.Route`, or columns with ``lat`` and
+      ``lon``. The course's own ``distance_m`` gives the distance along
+      it where present; otherwise distance is measured between its
+      points.
+    cell_m (float): Size of the grid cells, in meters. Trackpoints within
+      a cell of the course are matched by the grid; farther ones by
+      comparing with every segment. Courses more than about a million
+      cells long get proportionally larger cells.
+
+  Raises:
+    ValueError: If the course has fewer than two positions, or
+      ``cell_m`` is not positive.
+  """
+  def __init__(self, course, cell_m=DEFAULT_CELL_M):
+    if not cell_m > 0:
+      raise ValueError(f'cell_m must be positive, not {cell_m}')
+    if not isinstance(course, dict):
+      course = course._available_columns('lat', 'lon', 'distance_m')
+
+    lat = np.asarray(course['lat'], dtype=np.float64)
+    lon = np.asarray(course['lon'], dtype=np.float64)
+    positioned = ~(np.isnan(lat) | np.isnan(lon))
+    if positioned.sum() < 2:
+      raise ValueError('A course needs at least two points with a position')
+    lat, lon = lat[positioned], lon[positioned]
+
+    self.cell_m = float(cell_m)
+    self._lat0 = (lat.min() + lat.max()) / 2
+    self._lon0 = lon[0]
+    self.x, self.y = self._project(lat, lon)
+
+    distance = course.get('distance_m')
+    if distance is not None:
+      distance = np.ma.filled(
+        np.ma.asarray(distance).astype(np.float64), np.nan
+      )[positioned]
+    if distance is None or np.isnan(distance).any():
+      distance = geo.derived_columns({'lat': lat, 'lon': lon})['distance_m']
+    self.distance_m = np.maximum.accumulate(distance)
+    """numpy.ndarray: Distance along the course at each of its points."""
+
+    self._build_grid()
+
+  @property
+  def length_m(self):
+    """float: Distance along the course from its first point to its last."""
+    return float(self.distance_m[-1] - self.distance_m[0])
+
+  def _project(self, lat, lon):
+    """Meters east and north of the course's middle, on a tangent plane."""
+    dlon = (np.asarray(lon, dtype=np.float64) - self._lon0 + 180) % 360 - 180
+    dlat = np.asarray(lat, dtype=np.float64) - self._lat0
+    scale = np.radians(1) * geo.EARTH_RADIUS_M
+    return dlon * scale * np.cos(np.radians(self._lat0)), dlat * scale
+
+  def _cells(self, x, y):
+    """Grid column and row of each point, counted from the course's corner."""
+    return (
+      np.floor((x - self._x_min) / self.cell_m).astype(np.int64),
+      np.floor((y - self._y_min) / self.cell_m).astype(np.int64),
+    )
+
+  def _build_grid(self):
+    """Register every segment in the cells it passes through.
+
+    Each segment is cut into pieces no longer than a cell, and each piece
+    is registered in the (at most 2 x 2) cells of its bounding box, so the
+    grid grows with the course's length rather than the area its segments
+    span.
+    """
+    self._dx, self._dy = np.diff(self.x), np.diff(self.y)
+    self._dd = np.diff(self.distance_m)
+    length2 = self._dx ** 2 + self._dy ** 2
+    # Zero-length segments project every point onto their start.
+    self._inv_length2 = np.divide(
+      1, length2, out=np.zeros_like(length2), where=length2 > 0
+    )
+    lengths = np.sqrt(length2)
+    # Very long courses get larger cells, to bound the grid's size.
+    self.cell_m = max(self.cell_m, lengths.sum() / _MAX_PIECES)
+    self._x_min, self._y_min = self.x.min(), self.y.min()
+    cols, rows = self._cells(self.x, self.y)
+    self._num_cols = int(cols.max()) + 1
+    self._num_rows = int(rows.max()) + 1
+
+    pieces = np.maximum(np.ceil(lengths / self.cell_m).astype(np.int64), 1)
+    segments = np.repeat(np.arange(len(pieces), dtype=np.int64), pieces)
+    steps = _expand(np.zeros(len(pieces), dtype=np.int64), pieces)
+    t0 = steps / pieces[segments]
+    t1 = (steps + 1) / pieces[segments]
+    col0, row0 = self._cells(
+      self.x[segments] + t0 * self._dx[segments],
+      self.y[segments] + t0 * self._dy[segments],
+    )
+    col1, row1 = self._cells(
+      self.x[segments] + t1 * self._dx[segments],
+      self.y[segments] + t1 * self._dy[segments],
+    )
+    # The piece ends may round just outside the course's own extent.
+    col0, col1 = (np.clip(c, 0, self._num_cols - 1) for c in (col0, col1))
+    row0, row1 = (np.clip(r, 0, self._num_rows - 1) for r in (row0, row1))
+
+    # One entry per (segment, cell) pair, from the corners of each piece's
+    # bounding box; a piece spans at most two cells each way.
+    keys = np.concatenate([
+      rows_ * self._num_cols + cols_
+      for rows_ in (np.minimum(row0, row1), np.maximum(row0, row1))
+      for cols_ in (np.minimum(col0, col1), np.maximum(col0, col1))
+    ])
+    entries = np.unique(
+      keys * len(pieces) + np.tile(segments, 4)
+    )
+    self._keys, self._segments = np.divmod(entries, len(pieces))
+
+  def _candidates(self, x, y):
+    """Pairs of point offset and nearby segment, from the 3 x 3 cells
+    around each point."""
+    cols, rows = self._cells(x, y)
+    offsets = np.array([-1, 0, 1])
+    cols = (cols[:, None] + offsets[None, :]).repeat(3, axis=1)
+    rows = np.tile(rows[:, None] + offsets[None, :], (1, 3))
+    inside = (
+      (cols >= 0) & (cols < self._num_cols) & (rows >= 0) & (rows < self._num_rows)
+    )
+    keys = np.where(inside, rows * self._num_cols + cols, -1).ravel()
+
+    lo = np.searchsorted(self._keys, keys, side='left')
+    hi = np.searchsorted(self._keys, keys, side='right')
+    hi[keys < 0] = lo[keys < 0]
+    points = np.repeat(np.arange(len(x), dtype=np.int64), 9)
+    return np.repeat(points, hi - lo), self._segments[_expand(lo, hi)]
+
+  def _project_onto(self, x, y, points, segments):
+    """Nearest point on each segment to each point, for pairs of them.
+
+    Returns:
+      tuple(numpy.ndarray, numpy.ndarray): Distance between them, and
+      distance along the course of the nearest point.
+    """
+    px, py = x[points] - self.x[segments], y[points] - self.y[segments]
+    dx, dy = self._dx[segments], self._dy[segments]
+    t = np.clip((px * dx + py * dy) * self._inv_length2[segments], 0, 1)
+    deviation = np.hypot(px - t * dx, py - t * dy)
+    along = self.distance_m[segments] + t * self._dd[segments]
+    return deviation, along
+
+  def _all_pairs(self, points):
+    """Pairs of each point with every segment, a chunk at a time."""
+    num_segments = len(self.x) - 1
+    chunk = max(1, _BRUTE_FORCE_PAIRS // num_segments)
+    for start in range(0, len(points), chunk):
+      block = points[start:start + chunk]
+      yield (
+        np.repeat(block, num_segments),
+        np.tile(np.arange(num_segments, dtype=np.int64), len(block)),
+      )
+
+  def match(self, lat, lon, distance_m=None, ambiguity_m=DEFAULT_AMBIGUITY_M):
+    """Project positions onto the course.
+
+    Where the course passes the same place more than once, as at the ends
+    of a loop or along an out-and-back, a trackpoint could belong to
+    either pass. Given the activity's own cumulative ``distance_m``, each
+    trackpoint goes to the pass, within ``ambiguity_m`` of the nearest,
+    whose distance along the course is closest to it. Otherwise it goes
+    to the nearest pass.
+
+    Args:
+      lat, lon (array-like): Trackpoint coordinates in degrees, NaN where
+        a trackpoint has no position.
+      distance_m (array-like): Cumulative distance of each trackpoint,
+        measured from the start of the course, to tell passes apart.
+      ambiguity_m (float): See above.
+
+    Returns:
+      dict: One entry per trackpoint:
+
+      - ``course_distance_m``: distance along the course of the nearest
+        point on it, in meters.
+      - ``deviation_m``: distance to that point, in meters.
+      - ``segment``: offset of the course point that starts the segment
+        it lies on, among the course points with a position.
+
+      Trackpoints without a position get NaN and -1.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    matched = {
+      'course_distance_m': np.full(len(lat), np.nan),
+      'deviation_m': np.full(len(lat), np.nan),
+      'segment': np.full(len(lat), -1, dtype=np.int64),
+    }
+    positioned = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+    if not len(positioned):
+      return matched
+    x, y = self._project(lat[positioned], lon[positioned])
+    hint = None
+    if distance_m is not None:
+      hint = np.ma.filled(
+        np.ma.asarray(distance_m).astype(np.float64), np.nan
+      )[positioned]
+
+    points, segments = self._candidates(x, y)
+    dist, along = self._project_onto(x, y, points, segments)
+    # The grid finds every segment within a cell of a point. Points with
+    # none that near, including a pass within ambiguity_m of the nearest,
+    # are compared with every segment instead.
+    reach = self.cell_m - (ambiguity_m if hint is not None else 0)
+    near = np.zeros(len(x), dtype=bool)
+    near[points[dist <= reach]] = True
+    keep = near[points]
+    found = [(points[keep], segments[keep], dist[keep], along[keep])]
+    for pair in self._all_pairs(np.flatnonzero(~near)):
+      found.append(pair + self._project_onto(x, y, *pair))
+    points, segments, dist, along = (
+      np.concatenate(column) for column in zip(*found)
+    )
+
+    # Candidates are grouped by point; the nearest of each group wins,
+    # unless the activity's distance says another near pass is the one.
+    order = np.argsort(points, kind='stable')
+    points, segments, dist, along = (
+      points[order], segments[order], dist[order], along[order]
+    )
+    starts = np.flatnonzero(np.diff(points, prepend=-1))
+    sizes = np.diff(np.append(starts, len(points)))
+    key = dist
+    if hint is not None:
+      nearest = np.repeat(np.minimum.reduceat(dist, starts), sizes)
+      gap = np.abs(along - hint[points])
+      key = np.where(dist <= nearest + ambiguity_m, gap, np.inf)
+      key = np.where(np.isnan(gap), dist, key)
+    best = np.flatnonzero(
+      key == np.repeat(np.minimum.reduceat(key, starts), sizes)
+    )
+    first = best[np.flatnonzero(np.diff(points[best], prepend=-1))]
+
+    offsets = positioned[points[first]]
+    matched['course_distance_m'][offsets] = along[first]
+    matched['deviation_m'][offsets] = dist[first]
+    matched['segment'][offsets] = segments[first]
+    return matched
+
+  def match_activity(self, element, ambiguity_m=DEFAULT_AMBIGUITY_M):
+    """Project the trackpoints of a parsed activity onto the course.
+
+    The activity's distance (its own ``distance_m``, or else derived from
+    its positions) tells apart passes of the course; see :meth:`match`.
+
+    Args:
+      element (ActivityElement): The activity, or any element whose
+        trackpoints have ``lat`` and ``lon``.
+      ambiguity_m (float): See :meth:`match`.
+
+    Returns:
+      dict: As returned by :meth:`match`, with one entry per trackpoint.
+    """
+    from .splits import _cumulative_distance
+
+    columns = element._available_columns('time', 'lat', 'lon', 'distance_m')
+    distance = _cumulative_distance(columns)
+    # Measured from the start of the course, not of the recording.
+    if np.isnan(distance).all():
+      distance = None
+    else:
+      distance = distance - np.nanmin(distance)
+    return self.match(
+      columns['lat'], columns['lon'], distance_m=distance,
+      ambiguity_m=ambiguity_m
+    )
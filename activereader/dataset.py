@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""Export activities to a columnar Arrow/Parquet dataset.
+
+Trackpoint data goes straight from :meth:`ActivityElement.columns
+<activereader.base.ActivityElement.columns>` into Arrow record batches,
+which are streamed into a Hive-partitioned dataset one activity at a time.
+
+Requires the optional dependency `pyarrow <https://arrow.apache.org/docs/python/>`_.
+
+See also:
+
+  `Writing partitioned datasets <https://arrow.apache.org/docs/python/dataset.html#writing-partitioned-data>`_
+    How pyarrow lays out partitioned data on disk.
+"""
+import datetime
+import os
+
+import numpy as np
+
+from . import fit, gpx, tcx, util
+
+
+CATEGORY_COLUMNS = ('sport', 'device', 'trigger_method')
+"""Activity-level text columns that are written dictionary-encoded."""
+
+DEFAULT_ROW_GROUP_SIZE = 128 * 1024
+"""Number of rows per Parquet row group written by :func:`write_dataset`."""
+
+
+def _import_pyarrow():
+  return util.import_optional_dependency(
+    'pyarrow',
+    extra='pyarrow is required for Arrow/Parquet export.'
+  )
+
+
+def _read(source):
+  """Read a .tcx, .gpx or .fit file, or pass along an already-read one."""
+  if isinstance(source, (tcx.Tcx, gpx.Gpx, fit.Fit)):
+    return source
+
+  ext = os.path.splitext(source)[1].lower()
+  if ext == '.tcx':
+    return tcx.Tcx.from_file(source)
+  if ext == '.gpx':
+    return gpx.Gpx.from_file(source)
+  if ext == '.fit':
+    return fit.Fit.from_file(source)
+  raise ValueError(f'Expected a .tcx, .gpx or .fit file, not {source}')
+
+
+def _arrow_type(pa, conv_type):
+  if conv_type == float:
+    return pa.float64()
+  if conv_type == int:
+    return pa.int64()
+  if conv_type == datetime.datetime:
+    return pa.timestamp('ns', tz='UTC')
+  return pa.string()
+
+
+def get_schema(fields=None):
+  """Arrow schema of the record batches made by :func:`to_record_batch`.
+
+  The schema covers the trackpoint fields of every supported file format,
+  so activities of different formats can share one dataset. Fields that a
+  format does not have are written as nulls.
+
+  Args:
+    fields (list of str): Names of the trackpoint fields to include.
+      Defaults to every field of every format.
+
+  Returns:
+    pyarrow.Schema: Identifying columns (``activity``, ``date``), the
+    dictionary-encoded :data:`CATEGORY_COLUMNS`, the trackpoint container
+    ids (``bout``, ``lap``, ``track``), then the trackpoint fields.
+  """
+  pa = _import_pyarrow()
+
+  category = pa.dictionary(pa.int32(), pa.string())
+  schema_fields = [
+    pa.field('activity', pa.string()),
+    pa.field('date', pa.string()),
+  ] + [pa.field(name, category) for name in CATEGORY_COLUMNS]
+
+  containers, point_fields = {}, {}
+  for tp_class in (tcx.Trackpoint, gpx.Trackpoint, fit.Trackpoint):
+    for name in tp_class.CONTAINERS:
+      containers.setdefault(name, pa.int32())
+    for name, prop in tp_class._fields().items():
+      point_fields.setdefault(name, _arrow_type(pa, prop.conv_type))
+
+  if fields is not None:
+    unknown = [name for name in fields if name not in point_fields]
+    if unknown:
+      raise KeyError(f'Unknown trackpoint fields {unknown}')
+    point_fields = {name: point_fields[name] for name in fields}
+
+  schema_fields += [pa.field(name, t) for name, t in containers.items()]
+  schema_fields += [pa.field(name, t) for name, t in point_fields.items()]
+
+  return pa.schema(schema_fields)
+
+
+def _categories(activity, cols):
+  """Get the sport, device and per-trackpoint trigger method of an activity.
+
+  The trigger method is returned as a tuple of per-trackpoint lap indices
+  and each lap's trigger method, ready for dictionary encoding.
+  """
+  if isinstance(activity, tcx.Tcx):
+    activities = activity.activities
+    sport = activities[0].sport if activities else None
+    device = activities[0].device if activities else None
+    trigger_methods = [lap.trigger_method for lap in activity.laps]
+    return sport, device, (cols['lap'], trigger_methods)
+
+  if isinstance(activity, fit.Fit):
+    sessions = activity.sessions
+    sport = sessions[0].sport if sessions else None
+    trigger_methods = [lap.trigger_method for lap in activity.laps]
+    return sport, activity.manufacturer, (cols['lap'], trigger_methods)
+
+  tracks = activity.tracks
+  sport = tracks[0].activity_type if tracks else None
+  return sport, activity.creator, None
+
+
+def _dictionary_array(pa, indices, values):
+  """Dictionary-encode values[indices], where index -1 or value None is null."""
+  uniques = sorted({v for v in values if v is not None})
+  codes = np.array(
+    [-1 if v is None else uniques.index(v) for v in values] + [-1],
+    dtype=np.int32
+  )
+  # Index -1 picks the trailing -1 code for trackpoints outside any parent.
+  point_codes = codes[indices]
+  return pa.DictionaryArray.from_arrays(
+    pa.array(point_codes, mask=point_codes < 0, type=pa.int32()),
+    pa.array(uniques, type=pa.string())
+  )
+
+
+def _constant_dictionary_array(pa, value, size):
+  return _dictionary_array(pa, np.zeros(size, dtype=np.int64), [value])
+
+
+def _arrow_array(pa, values, arrow_type):
+  if isinstance(values, np.ma.MaskedArray):
+    return pa.array(values.data, mask=np.ma.getmaskarray(values), type=arrow_type)
+  return pa.array(values, type=arrow_type, from_pandas=True)
+
+
+def to_record_batch(activity, fields=None, activity_id=None):
+  """Convert an activity's trackpoint data to an Arrow record batch.
+
+  Args:
+    activity (str, Tcx, Gpx or Fit): The activity, or the path of a
+      .tcx, .gpx or .fit file to read it from.
+    fields (list of str): Names of the trackpoint fields to include.
+      Defaults to every field of every format.
+    activity_id (str): Value for the ``activity`` column. Defaults to the
+      file name if ``activity`` is a path, and otherwise to the timestamp
+      of the first trackpoint.
+
+  Returns:
+    pyarrow.RecordBatch: One row per trackpoint, with the schema from
+    :func:`get_schema`.
+  """
+  pa = _import_pyarrow()
+  schema = get_schema(fields)
+
+  if activity_id is None and isinstance(activity, str):
+    activity_id = os.path.basename(activity)
+  activity = _read(activity)
+
+  tp_class = activity._descendent_class('trackpoints')
+  names = [name for name in tp_class._fields() if name in schema.names]
+  cols = activity.columns(names)
+  n = len(next(iter(cols.values())))
+
+  times = cols['time'] if 'time' in cols else activity.columns(['time'])['time']
+  times = times[~np.isnat(times)]
+  date = str(times[0].astype('datetime64[D]')) if len(times) else None
+  if activity_id is None and len(times):
+    activity_id = str(times[0])
+
+  sport, device, trigger_methods = _categories(activity, cols)
+
+  arrays = []
+  for field in schema:
+    name = field.name
+    if name == 'activity':
+      arrays.append(pa.repeat(pa.scalar(activity_id, pa.string()), n))
+    elif name == 'date':
+      arrays.append(pa.repeat(pa.scalar(date, pa.string()), n))
+    elif name == 'sport':
+      arrays.append(_constant_dictionary_array(pa, sport, n))
+    elif name == 'device':
+      arrays.append(_constant_dictionary_array(pa, device, n))
+    elif name == 'trigger_method' and trigger_methods is not None:
+      arrays.append(_dictionary_array(pa, *trigger_methods))
+    elif name in cols:
+      arrays.append(_arrow_array(pa, cols[name], field.type))
+    else:
+      arrays.append(pa.nulls(n, type=field.type))
+
+  return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_record_batches(sources, fields=None):
+  """Read activities one at a time, yielding one record batch per activity.
+
+  Args:
+    sources (iterable): Paths of .tcx/.gpx/.fit files, or
+      :class:`~activereader.Tcx`, :class:`~activereader.Gpx` and
+      :class:`~activereader.Fit` objects.
+    fields (list of str): Passed on to :func:`to_record_batch`.
+
+  Yields:
+    pyarrow.RecordBatch
+  """
+  for source in sources:
+    yield to_record_batch(source, fields=fields)
+
+
+def write_dataset(
+  sources,
+  base_dir,
+  fields=None,
+  partition_by=('date', 'sport'),
+  row_group_size=DEFAULT_ROW_GROUP_SIZE,
+  **kwargs
+):
+  """Write the trackpoints of many activities to a Parquet dataset.
+
+  Activities are read and converted one at a time as the writer consumes
+  them, so the whole library never has to fit in memory; at most about
+  one row group per open partition is buffered.
+
+  Args:
+    sources (iterable): Paths of .tcx/.gpx/.fit files, or
+      :class:`~activereader.Tcx`, :class:`~activereader.Gpx` and
+      :class:`~activereader.Fit` objects. May be a generator.
+    base_dir (str): Root directory of the dataset.
+    fields (list of str): Names of the trackpoint fields to include.
+      Defaults to every field of every format.
+    partition_by (tuple of str): Columns used for Hive-style partitioning
+      (eg. ``date=2021-04-16/sport=Running/``). Falsy for no partitioning.
+    row_group_size (int): Number of rows per Parquet row group.
+    **kwargs: Passed on to :func:`pyarrow.dataset.write_dataset`.
+
+  Examples:
+
+    >>> write_dataset(glob.glob('activities/*.tcx'), 'trackpoints/')
+
+  """
+  _import_pyarrow()
+  import pyarrow.dataset as ds
+
+  kwargs.setdefault('existing_data_behavior', 'overwrite_or_ignore')
+
+  ds.write_dataset(
+    iter_record_batches(sources, fields=fields),
+    base_dir,
+    schema=get_schema(fields),
+    format='parquet',
+    partitioning=list(partition_by) if partition_by else None,
+    partitioning_flavor='hive' if partition_by else None,
+    min_rows_per_group=row_group_size,
+    max_rows_per_group=row_group_size,
+    **kwargs
+  )
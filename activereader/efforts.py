@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Find an activity's best efforts: its fastest distances and farthest durations.
+
+A best effort over a distance is the shortest time between two trackpoints
+at least that far apart; over a duration, it is the longest distance
+between two trackpoints at most that far apart in time. Cumulative distance
+and time never go down, so the matching end of every candidate window
+moves forward with its start, like the second pointer of a two-pointer
+scan. All window ends for one target are found with a single
+:func:`numpy.searchsorted` call, so each target costs O(n log n) array
+work, with no Python loop over trackpoints.
+
+Windows run from trackpoint to trackpoint, so a distance effort covers at
+least its target distance, and a duration effort at most its target
+duration. Times are elapsed times, including any pauses.
+"""
+import collections
+
+import numpy as np
+
+from . import util
+from .splits import _cumulative_distance
+
+
+DEFAULT_DISTANCES_M = (400.0, 1000.0, 1609.344, 5000.0, 10000.0)
+"""Distances searched by default: 400 m, 1 km, 1 mile, 5 km and 10 km."""
+
+DEFAULT_DURATIONS_S = (60.0, 300.0, 1200.0, 3600.0)
+"""Durations searched by default: 1, 5, 20 and 60 minutes."""
+
+Effort = collections.namedtuple(
+  'Effort', ['kind', 'target', 'start', 'stop', 'time_s', 'distance_m']
+)
+Effort.__doc__ = """A best effort found by :func:`best_efforts`.
+
+``kind`` is ``'distance'`` or ``'duration'``, and ``target`` the distance
+(m) or duration (s) searched for. ``start`` and ``stop`` are trackpoint
+offsets, like a slice's: the effort runs from trackpoint ``start`` to
+trackpoint ``stop - 1``.
+"""
+
+
+def best_efforts(
+  columns,
+  distances_m=DEFAULT_DISTANCES_M,
+  durations_s=DEFAULT_DURATIONS_S
+):
+  """Find the best efforts over many distances and durations.
+
+  Args:
+    columns (dict): Trackpoint columns, as returned by
+      :meth:`~activereader.base.ActivityElement.columns`. Must include
+      ``time``. Distance comes from ``distance_m``, or failing that from
+      positions (``lat``, ``lon``).
+    distances_m (iterable of float): Distances to find the fastest time
+      for, in meters.
+    durations_s (iterable of float): Durations to find the farthest
+      distance for, in seconds.
+
+  Returns:
+    list of Effort: One per target the activity is long enough for,
+    distances first, in the order given.
+
+  Examples:
+
+    >>> for effort in best_efforts(tcx_obj.columns(), durations_s=()):
+    ...   print(effort.target, effort.time_s)
+    400.0 144.0
+    1000.0 360.0
+
+  """
+  seconds = util.to_seconds(columns['time'])
+  distance = _cumulative_distance(columns)
+  valid = np.flatnonzero(~np.isnan(seconds) & ~np.isnan(distance))
+  seconds, distance = np.fmax.accumulate(seconds[valid]), distance[valid]
+
+  efforts = []
+  searches = [('distance', target, _fastest) for target in distances_m]
+  searches += [('duration', target, _farthest) for target in durations_s]
+  for kind, target, search in searches:
+    window = search(seconds, distance, target)
+    if window is None:
+      continue
+    start, end = window
+    efforts.append(Effort(
+      kind, target, int(valid[start]), int(valid[end]) + 1,
+      float(seconds[end] - seconds[start]),
+      float(distance[end] - distance[start]),
+    ))
+  return efforts
+
+
+def _fastest(seconds, distance, target):
+  """Start and end of the quickest window covering target meters."""
+  # For each start, the first trackpoint at least target meters on.
+  ends = np.searchsorted(distance, distance + target, side='left')
+  starts = np.flatnonzero(ends < len(distance))
+  if not len(starts):
+    return None
+  ends = ends[starts]
+  best = np.argmin(seconds[ends] - seconds[starts])
+  return starts[best], ends[best]
+
+
+def _farthest(seconds, distance, target):
+  """Start and end of the longest window within target seconds."""
+  if not len(seconds) or seconds[-1] - seconds[0] < target:
+    return None
+  # Windows must fit before the end of the activity.
+  starts = np.flatnonzero(seconds + target <= seconds[-1])
+  # For each start, the last trackpoint at most target seconds on.
+  ends = np.searchsorted(seconds, seconds[starts] + target, side='right') - 1
+  best = np.argmax(distance[ends] - distance[starts])
+  return starts[best], ends[best]
+
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""Fingerprint activities to find the same one saved more than once.
+
+One run can end up in a library several times: from the device, from
+Garmin Connect and from Strava, as TCX, GPX or FIT. The copies differ in
+format, sampling, precision and trimming, but agree on when and where the
+run happened. A :class:`Fingerprint` keeps just that:
+
+- start time and duration;
+- a sketch of the activity, one entry per clock minute (aligned to the
+  epoch, so copies line up however they were trimmed): the grid cell of
+  the mean position, and the mean heart rate and elevation, all rounded
+  coarsely;
+- a hash of the sequence of grid cells that those per-minute mean
+  positions fall in, with repeats collapsed. Copies of one run share it,
+  but the same route covered at another pace may not, since where each
+  minute's mean lands depends on speed.
+
+TCX and GPX files are read as a stream: only the few fields above are
+taken from each trackpoint, which is then dropped, so no tree is built.
+:func:`start_time` stops at the first timestamp, which lets
+:func:`find_duplicates` skip the full read for every file that doesn't
+start near another one.
+
+Examples:
+
+  >>> find_duplicates(glob.glob('library/*'))
+  [['library/device.fit', 'library/connect.tcx', 'library/strava.gpx']]
+
+"""
+import collections
+import hashlib
+import itertools
+import os
+
+import numpy as np
+from lxml import etree
+
+from . import fit, gpx, tcx, util
+from .base import ActivityElement, XmlReader
+
+
+SKETCH_INTERVAL_S = 60
+"""Length of each sketch entry, in seconds."""
+
+GRID_DEG = 0.002
+"""Size of the position grid, in degrees (about 200 m of latitude)."""
+
+HR_STEP_BPM = 5
+"""Heart rate is rounded to multiples of this."""
+
+ELEVATION_STEP_M = 10
+"""Elevation is rounded to multiples of this."""
+
+DEFAULT_TIME_TOLERANCE_S = 120
+"""How far apart the starts (and ends) of two copies may be, in seconds."""
+
+MATCH_FRACTION = 0.8
+"""Share of sketch entries that must agree for copies to match."""
+
+MIN_SHARED = 3
+"""Fewest sketch entries two fingerprints must share to compare them."""
+
+FIELDS = ('time', 'lat', 'lon', 'hr', 'altitude_m')
+"""Trackpoint fields a fingerprint is made from."""
+
+_POINT_CLASSES = {'.tcx': tcx.Trackpoint, '.gpx': gpx.Trackpoint}
+
+Fingerprint = collections.namedtuple(
+  'Fingerprint',
+  ['start_time', 'duration_s', 'geometry_hash', 'first_minute', 'cells', 'hr',
+   'elevation']
+)
+Fingerprint.__doc__ = """The signature of an activity, from :func:`fingerprint`.
+
+``start_time`` is a ``datetime64[s]`` in UTC and ``duration_s`` the
+elapsed seconds to the last trackpoint. ``geometry_hash`` is a hex string,
+or None without positions. The sketch starts at clock minute
+``first_minute`` (minutes since the epoch): ``cells`` holds a
+``(lat, lon)`` grid cell per minute, and ``hr`` and ``elevation`` rounded
+values, each None where the minute has no data.
+"""
+
+
+def _localname(tag):
+  return tag[tag.find('}') + 1:]
+
+
+def _field_paths(point_class):
+  """How to find each fingerprint field below a trackpoint, in any namespace.
+
+  Returns:
+    tuple(dict, dict): Maps each attribute field to its key, and the last
+    tag of each other field's path to ``(name, tags)`` pairs.
+  """
+  attrs, leaves = {}, collections.defaultdict(list)
+  for name, prop in point_class._fields().items():
+    if name not in FIELDS:
+      continue
+    key = getattr(prop, 'key', None)
+    if key is not None:
+      attrs[name] = key
+    else:
+      tags = prop.path.split('/')
+      leaves[tags[-1]].append((name, tags))
+  return attrs, dict(leaves)
+
+
+def _point_texts(elem, attrs, leaves):
+  """Read fields from one namespaced trackpoint in a single pass.
+
+  Matching leaves by tag in one walk over the trackpoint is several times
+  quicker than a wildcard-namespace ``findtext`` per field.
+  """
+  texts = {name: elem.get(key) for name, key in attrs.items()}
+  for desc in elem.iterdescendants():
+    tag = desc.tag
+    found = leaves.get(tag[tag.find('}') + 1:])
+    if not found:
+      continue
+    for name, tags in found:
+      if name in texts:
+        continue
+      # Check the rest of the path back up to the trackpoint.
+      node = desc
+      for tag in reversed(tags[:-1]):
+        node = node.getparent()
+        if _localname(node.tag) != tag:
+          break
+      else:
+        if node.getparent() is elem:
+          texts[name] = desc.text
+  return texts
+
+
+def _stream_columns(path, point_class, first_only=False):
+  """Read the fingerprint fields of a TCX or GPX file without keeping a tree.
+
+  The file is parsed with the options set for its format, as in a normal
+  read (see :meth:`~activereader.base.XmlReader.configure_parser`).
+  """
+  ext = os.path.splitext(path)[1][1:]
+  attrs, leaves = _field_paths(point_class)
+  names = list(attrs) + [name for found in leaves.values() for name, _ in found]
+  texts = {name: [] for name in names}
+  with open(path, 'rb') as f:
+    events = etree.iterparse(
+      f, events=('end',), tag=f'{{*}}{point_class.TAG}',
+      **XmlReader.get_parser_options(ext)
+    )
+    for _, elem in events:
+      point = _point_texts(elem, attrs, leaves)
+      for name in names:
+        texts[name].append(point.get(name))
+      # Free the trackpoint, and any already-read siblings before it.
+      elem.clear()
+      parent = elem.getparent()
+      while elem.getprevious() is not None:
+        del parent[0]
+      if first_only and point.get('time') is not None:
+        break
+  fields = point_class._fields()
+  return {
+    name: util.to_array(texts[name], fields[name].conv_type) for name in names
+  }
+
+
+def _columns(source, first_only=False):
+  """The fingerprint fields of an element or file."""
+  if isinstance(source, ActivityElement):
+    return source._available_columns(*FIELDS)
+  ext = os.path.splitext(source)[1].lower()
+  if ext == '.fit':
+    # FIT records decode as arrays in one go; there is no tree to avoid.
+    return fit.Fit.from_file(source)._available_columns(*FIELDS)
+  if ext not in _POINT_CLASSES:
+    raise ValueError(f'Expected a .tcx, .gpx or .fit file, not {source}')
+  return _stream_columns(source, _POINT_CLASSES[ext], first_only=first_only)
+
+
+def start_time(source):
+  """The time of an activity's first timestamped trackpoint.
+
+  TCX and GPX files are read only up to that trackpoint.
+
+  Args:
+    source (str or ActivityElement): Path of a .tcx, .gpx or .fit file,
+      or an already-read activity.
+
+  Returns:
+    numpy.datetime64: In UTC, or NaT if no trackpoint has a time.
+  """
+  times = _columns(source, first_only=True)['time']
+  times = times[~np.isnat(times)]
+  return times[0] if len(times) else np.datetime64('NaT', 'ns')
+
+
+def _float_values(columns, name):
+  if name not in columns:
+    return np.full(len(columns['time']), np.nan)
+  return np.ma.filled(np.ma.asarray(columns[name]).astype(np.float64), np.nan)
+
+
+def _rounded(values, step):
+  """Round to multiples of step, as a tuple of ints with None for NaN."""
+  return tuple(
+    None if np.isnan(value) else int(np.floor(value / step + 0.5))
+    for value in values
+  )
+
+
+def _geometry_hash(cells):
+  """Hash the sketch's grid cells, in order, with repeats collapsed.
+
+  The cells are those of the per-minute mean positions, so the hash
+  follows the activity's timing as well as its route.
+  """
+  visited = [cell for cell, _ in itertools.groupby(c for c in cells if c is not None)]
+  if not visited:
+    return None
+  return hashlib.blake2b(repr(visited).encode(), digest_size=8).hexdigest()
+
+
+def fingerprint(source):
+  """Work out the signature of an activity.
+
+  Args:
+    source (str or ActivityElement): Path of a .tcx, .gpx or .fit file,
+      or an already-read activity.
+
+  Returns:
+    Fingerprint
+
+  Raises:
+    ValueError: If the file type is unknown, or no trackpoint has a time.
+
+  Examples:
+
+    >>> fingerprint('activity.tcx').geometry_hash
+    '5c3f0e7d1b2a9e44'
+
+  """
+  columns = _columns(source)
+  seconds = util.to_seconds(columns['time'])
+  valid = ~np.isnan(seconds)
+  if not valid.any():
+    raise ValueError(f'No trackpoint has a time: {source}')
+
+  seconds = seconds[valid]
+  minutes = np.floor(seconds / SKETCH_INTERVAL_S).astype(np.int64)
+  first_minute = int(minutes.min())
+  minute_ids = minutes - first_minute
+  num_minutes = int(minute_ids.max()) + 1
+
+  def sketch(name, step):
+    means = util.group_means(
+      _float_values(columns, name)[valid], minute_ids, num_minutes
+    )
+    return _rounded(means, step)
+
+  cells = tuple(
+    None if lat is None or lon is None else (lat, lon)
+    for lat, lon in zip(sketch('lat', GRID_DEG), sketch('lon', GRID_DEG))
+  )
+  start = seconds.min()
+  return Fingerprint(
+    start_time=np.datetime64(int(np.floor(start)), 's'),
+    duration_s=float(seconds.max() - start),
+    geometry_hash=_geometry_hash(cells),
+    first_minute=first_minute,
+    cells=cells,
+    hr=sketch('hr', HR_STEP_BPM),
+    elevation=sketch('altitude_m', ELEVATION_STEP_M),
+  )
+
+
+def _aligned(a, b, name):
+  """Two fingerprints' sketch values over the minutes both have data for.
+
+  Returns:
+    tuple(numpy.ndarray, numpy.ndarray): Arrays of shape (n, k), for n
+    shared minutes and k values per entry.
+  """
+  start = max(a.first_minute, b.first_minute)
+  stop = min(
+    a.first_minute + len(getattr(a, name)), b.first_minute + len(getattr(b, name))
+  )
+  if stop <= start:
+    return np.empty((0, 1)), np.empty((0, 1))
+
+  width = 2 if name == 'cells' else 1
+
+  def values(print_):
+    entries = getattr(print_, name)[start - print_.first_minute:stop - print_.first_minute]
+    return np.array(
+      [(np.nan,) * width if v is None else np.atleast_1d(v) for v in entries],
+      dtype=np.float64
+    ).reshape(len(entries), width)
+
+  a_values, b_values = values(a), values(b)
+  shared = ~np.isnan(a_values).any(axis=1) & ~np.isnan(b_values).any(axis=1)
+  return a_values[shared], b_values[shared]
+
+
+def same_activity(a, b, time_tolerance_s=DEFAULT_TIME_TOLERANCE_S):
+  """Whether two fingerprints look like copies of one activity.
+
+  Their starts and ends must be within ``time_tolerance_s`` of each other.
+  Then, for each of position, heart rate and elevation that both have in
+  at least :data:`MIN_SHARED` minutes, :data:`MATCH_FRACTION` of those
+  minutes must agree to within one rounding step. Elevations are compared
+  after removing their typical offset, since devices and services
+  correct elevation differently.
+
+  Args:
+    a, b (Fingerprint): Fingerprints from :func:`fingerprint`.
+    time_tolerance_s (float): See above.
+
+  Returns:
+    bool
+  """
+  a_start = a.start_time.astype(np.int64)
+  b_start = b.start_time.astype(np.int64)
+  if abs(a_start - b_start) > time_tolerance_s:
+    return False
+  if abs((a_start + a.duration_s) - (b_start + b.duration_s)) > time_tolerance_s:
+    return False
+
+  for name in ('cells', 'hr', 'elevation'):
+    a_values, b_values = _aligned(a, b, name)
+    if len(a_values) < MIN_SHARED:
+      continue
+    diffs = a_values - b_values
+    if name == 'elevation':
+      diffs -= np.median(diffs)
+    agree = (np.abs(diffs) <= 1).all(axis=1)
+    if agree.mean() < MATCH_FRACTION:
+      return False
+  return True
+
+
+def find_duplicates(sources, time_tolerance_s=DEFAULT_TIME_TOLERANCE_S):
+  """Group copies of the same activity among many files.
+
+  Start times are read first, stopping at each file's first timestamp.
+  Only files that start within ``time_tolerance_s`` of another are
+  fingerprinted and compared with :func:`same_activity`.
+
+  Args:
+    sources (iterable): Paths of .tcx, .gpx or .fit files, or
+      already-read activities.
+    time_tolerance_s (float): See :func:`same_activity`.
+
+  Returns:
+    list of list: Each group of two or more copies, in the order given.
+    Files without any timestamps are never grouped.
+  """
+  sources = list(sources)
+  starts = np.array(
+    [start_time(source) for source in sources], dtype='datetime64[ns]'
+  )
+  timed = np.flatnonzero(~np.isnat(starts))
+  order = timed[np.argsort(starts[timed], kind='stable')]
+  # Files whose starts chain together within the tolerance are the only
+  # candidates for being copies of one another.
+  gaps = np.diff(starts[order].view(np.int64)) / 1e9
+  chains = np.split(order, np.flatnonzero(gaps > time_tolerance_s) + 1)
+
+  groups = []
+  for chain in chains:
+    if len(chain) < 2:
+      continue
+    prints = {i: fingerprint(sources[i]) for i in chain}
+    group_of = {i: i for i in chain}
+
+    def root(i):
+      while group_of[i] != i:
+        i = group_of[i]
+      return i
+
+    for i, j in itertools.combinations(sorted(chain), 2):
+      if root(i) != root(j) and same_activity(
+        prints[i], prints[j], time_tolerance_s=time_tolerance_s
+      ):
+        group_of[max(root(i), root(j))] = min(root(i), root(j))
+
+    members = collections.defaultdict(list)
+    for i in sorted(chain):
+      members[root(i)].append(i)
+    groups += [found for found in members.values() if len(found) > 1]
+
+  groups.sort(key=lambda found: found[0])
+  return [[sources[i] for i in found] for found in groups]
@@ -0,0 +1,680 @@
+# -*- coding: utf-8 -*-
+""".fit file reader architecture.
+
+FIT is the compact binary format most Garmin (and many other) devices
+record activities in. A file is a stream of messages, each laid out by an
+earlier definition message. The reader walks the stream once to find where
+each message starts, then decodes every field of every message sharing a
+definition with a single numpy operation, rather than message by message.
+
+The decoded ``record``, ``lap`` and ``session`` messages are served by
+element classes with the same properties as their TCX counterparts
+(:class:`Trackpoint`, :class:`Lap`, and :class:`Session` for
+:class:`activereader.tcx.Activity`), backed by arrays in the same way as a
+compacted element (see
+:meth:`ActivityElement.compact<activereader.base.ActivityElement.compact>`).
+So :meth:`~activereader.base.ActivityElement.columns` and everything built
+on it work as they do for TCX and GPX files.
+
+Only the messages and fields listed in :data:`PROFILE` are decoded; the
+rest are skipped.
+
+See also:
+
+  `FIT protocol <https://developer.garmin.com/fit/protocol/>`_
+    Official description of the file structure.
+"""
+import collections
+import datetime
+import io
+import os
+import struct
+
+import numpy as np
+
+from .base import (
+  ActivityElement, TrackpointsMixin, create_data_prop, create_descendent_prop
+)
+from .compact import CompactStore
+
+
+FIT_EPOCH = np.datetime64('1989-12-31T00:00:00', 'ns')
+"""FIT timestamps count seconds from this time, in UTC."""
+
+SEMICIRCLES = 2 ** 31 / 180
+"""Semicircles (FIT's unit for positions) per degree."""
+
+# Base type number: (numpy type, invalid value)
+BASE_TYPES = {
+  0: ('u1', 0xFF),    # enum
+  1: ('i1', 0x7F),
+  2: ('u1', 0xFF),
+  3: ('i2', 0x7FFF),
+  4: ('u2', 0xFFFF),
+  5: ('i4', 0x7FFFFFFF),
+  6: ('u4', 0xFFFFFFFF),
+  7: (None, None),    # string
+  8: ('f4', None),
+  9: ('f8', None),
+  10: ('u1', 0),      # uint8z
+  11: ('u2', 0),      # uint16z
+  12: ('u4', 0),      # uint32z
+  13: ('u1', 0xFF),   # byte
+  14: ('i8', 0x7FFFFFFFFFFFFFFF),
+  15: ('u8', 0xFFFFFFFFFFFFFFFF),
+  16: ('u8', 0),      # uint64z
+}
+
+Field = collections.namedtuple('Field', ['number', 'scale', 'offset', 'kind'])
+Field.__new__.__defaults__ = (1, 0, 'number')
+Field.__doc__ = """How to read one field of a FIT message.
+
+A stored value ``v`` means ``v / scale - offset``. ``kind`` is
+``'number'``, ``'int'``, ``'time'`` or the name of an enum in :data:`ENUMS`.
+"""
+
+PROFILE = {
+  'file_id': (0, {
+    'manufacturer': Field(1, kind='manufacturer'),
+    'product': Field(2, kind='int'),
+    'serial_number': Field(3, kind='int'),
+    'time_created': Field(4, kind='time'),
+  }),
+  'session': (18, {
+    'timestamp': Field(253, kind='time'),
+    'start_time': Field(2, kind='time'),
+    'sport': Field(5, kind='sport'),
+    'total_elapsed_time': Field(7, 1000),
+    'total_timer_time': Field(8, 1000),
+    'total_distance': Field(9, 100),
+    'total_calories': Field(11, kind='int'),
+    'avg_speed': Field(14, 1000),
+    'max_speed': Field(15, 1000),
+    'avg_heart_rate': Field(16, kind='int'),
+    'max_heart_rate': Field(17, kind='int'),
+    'avg_cadence': Field(18, kind='int'),
+    'max_cadence': Field(19, kind='int'),
+    'enhanced_avg_speed': Field(124, 1000),
+    'enhanced_max_speed': Field(125, 1000),
+  }),
+  'lap': (19, {
+    'timestamp': Field(253, kind='time'),
+    'start_time': Field(2, kind='time'),
+    'total_elapsed_time': Field(7, 1000),
+    'total_timer_time': Field(8, 1000),
+    'total_distance': Field(9, 100),
+    'total_calories': Field(11, kind='int'),
+    'avg_speed': Field(13, 1000),
+    'max_speed': Field(14, 1000),
+    'avg_heart_rate': Field(15, kind='int'),
+    'max_heart_rate': Field(16, kind='int'),
+    'avg_cadence': Field(17, kind='int'),
+    'max_cadence': Field(18, kind='int'),
+    'intensity': Field(23, kind='intensity'),
+    'lap_trigger': Field(24, kind='lap_trigger'),
+    'enhanced_avg_speed': Field(110, 1000),
+    'enhanced_max_speed': Field(111, 1000),
+  }),
+  'record': (20, {
+    'timestamp': Field(253, kind='time'),
+    'position_lat': Field(0, SEMICIRCLES),
+    'position_long': Field(1, SEMICIRCLES),
+    'altitude': Field(2, 5, 500),
+    'heart_rate': Field(3, kind='int'),
+    'cadence': Field(4, kind='int'),
+    'distance': Field(5, 100),
+    'speed': Field(6, 1000),
+    'power': Field(7, kind='int'),
+    'enhanced_speed': Field(73, 1000),
+    'enhanced_altitude': Field(78, 5, 500),
+  }),
+  'event': (21, {
+    'timestamp': Field(253, kind='time'),
+    'event': Field(0, kind='int'),
+    'event_type': Field(1, kind='int'),
+  }),
+}
+"""Maps message names to their global message number and decoded fields."""
+
+ENUMS = {
+  'sport': {
+    0: 'generic', 1: 'running', 2: 'cycling', 3: 'transition',
+    4: 'fitness_equipment', 5: 'swimming', 6: 'basketball', 7: 'soccer',
+    8: 'tennis', 9: 'american_football', 10: 'training', 11: 'walking',
+    12: 'cross_country_skiing', 13: 'alpine_skiing', 14: 'snowboarding',
+    15: 'rowing', 16: 'mountaineering', 17: 'hiking', 18: 'multisport',
+    19: 'paddling',
+  },
+  'intensity': {0: 'active', 1: 'rest', 2: 'warmup', 3: 'cooldown'},
+  'lap_trigger': {
+    0: 'manual', 1: 'time', 2: 'distance', 3: 'position_start',
+    4: 'position_lap', 5: 'position_waypoint', 6: 'position_marked',
+    7: 'session_end', 8: 'fitness_equipment',
+  },
+  'manufacturer': {
+    1: 'garmin', 15: 'dynastream', 23: 'suunto', 32: 'wahoo_fitness',
+    69: 'stages_cycling', 89: 'tacx', 255: 'development', 263: 'polar',
+    265: 'strava', 267: 'bryton', 294: 'coros', 289: 'hammerhead',
+  },
+}
+"""Names for the enum values :data:`PROFILE` uses. Unlisted values are
+kept as numbers."""
+
+TIMER_EVENT = 0
+TIMER_START = 0
+
+
+class _Definition(object):
+  """Layout of the data messages that follow a definition message."""
+  def __init__(self, global_number, endian, fields, extra_size):
+    self.global_number = global_number
+    self.endian = endian
+    self.fields = []
+    position = 0
+    for number, size, base_type in fields:
+      self.fields.append((number, position, size, base_type & 0x1F))
+      position += size
+    self.size = position + extra_size
+    self.offsets = []
+    self.sequence = []
+    self.time_offsets = []
+
+
+def _scan(data):
+  """Find the definition and start of every data message in a FIT file."""
+  if len(data) < 12 or data[8:12] != b'.FIT':
+    raise ValueError('Not a FIT file')
+  header_size = data[0]
+  data_size = struct.unpack_from('<I', data, 4)[0]
+  end = header_size + data_size
+  if end > len(data):
+    raise ValueError('FIT file is truncated')
+
+  local = {}
+  definitions = []
+  sequence = 0
+  has_compressed = False
+  pos = header_size
+  try:
+    while pos < end:
+      header = data[pos]
+      pos += 1
+      if header & 0x80:
+        # Compressed timestamp header: 5-bit time offset, 2-bit local type.
+        definition = local[(header >> 5) & 0x03]
+        definition.time_offsets.append(header & 0x1F)
+        has_compressed = True
+      elif header & 0x40:
+        endian = '>' if data[pos + 1] else '<'
+        global_number = struct.unpack_from(f'{endian}H', data, pos + 2)[0]
+        num_fields = data[pos + 4]
+        pos += 5
+        fields = [
+          tuple(data[pos + 3 * i:pos + 3 * i + 3]) for i in range(num_fields)
+        ]
+        pos += 3 * num_fields
+        extra_size = 0
+        if header & 0x20:
+          num_developer_fields = data[pos]
+          pos += 1
+          extra_size = sum(
+            data[pos + 3 * i + 1] for i in range(num_developer_fields)
+          )
+          pos += 3 * num_developer_fields
+        definition = _Definition(global_number, endian, fields, extra_size)
+        definitions.append(definition)
+        local[header & 0x0F] = definition
+        continue
+      else:
+        definition = local[header & 0x0F]
+        definition.time_offsets.append(-1)
+      definition.offsets.append(pos)
+      definition.sequence.append(sequence)
+      sequence += 1
+      pos += definition.size
+  except KeyError:
+    raise ValueError('FIT data message without a definition') from None
+  except IndexError:
+    raise ValueError('FIT file is truncated') from None
+
+  if pos > end:
+    raise ValueError('FIT file is truncated')
+  return definitions, has_compressed
+
+
+def _decode_fields(buffer, definition, numbers):
+  """Decode the wanted fields of every message with one definition.
+
+  Returns:
+    dict: Maps field number to float64 values, NaN where invalid. Fields
+    holding arrays give their first value.
+  """
+  offsets = np.array(definition.offsets, dtype=np.int64)
+  rows = buffer[offsets[:, None] + np.arange(definition.size)]
+
+  values = {}
+  for number, position, size, base_type in definition.fields:
+    if number not in numbers:
+      continue
+    dtype, invalid = BASE_TYPES.get(base_type, (None, None))
+    if dtype is None or size < np.dtype(dtype).itemsize:
+      continue
+    itemsize = np.dtype(dtype).itemsize
+    raw = np.ascontiguousarray(rows[:, position:position + itemsize])
+    raw = raw.view(np.dtype(dtype).newbyteorder(definition.endian)).ravel()
+    decoded = raw.astype(np.float64)
+    if invalid is not None:
+      decoded[raw == invalid] = np.nan
+    values[number] = decoded
+  return values
+
+
+def decode(data, messages=None):
+  """Decode the messages of a FIT file into arrays.
+
+  Args:
+    data (bytes): Contents of the file.
+    messages (list of str): Names of the :data:`PROFILE` messages to
+      decode. Defaults to all of them.
+
+  Returns:
+    dict: Maps each message name to a dict of its :data:`PROFILE` fields'
+    raw values (before scale and offset), as ``float64`` arrays with NaN
+    where a message does not have a valid value. Messages appear in file
+    order.
+  """
+  if messages is None:
+    messages = list(PROFILE)
+  definitions, has_compressed = _scan(data)
+  buffer = np.frombuffer(data, dtype=np.uint8)
+  wanted = {PROFILE[name][0]: name for name in messages}
+
+  decoded = {name: [] for name in messages}
+  # Every message's full timestamp and compressed time offset, which are
+  # only needed when the file uses compressed timestamp headers.
+  timestamps = []
+  for definition in definitions:
+    name = wanted.get(definition.global_number)
+    if not definition.offsets or (name is None and not has_compressed):
+      continue
+    numbers = {253} if name is None else {
+      field.number for field in PROFILE[name][1].values()
+    }
+    sequence = np.array(definition.sequence, dtype=np.int64)
+    values = _decode_fields(buffer, definition, numbers)
+    if has_compressed:
+      timestamps.append((
+        sequence,
+        values.get(253, np.full(len(sequence), np.nan)),
+        np.array(definition.time_offsets, dtype=np.int64),
+      ))
+    if name is not None:
+      decoded[name].append((sequence, values))
+
+  if has_compressed:
+    times = _resolve_compressed_timestamps(timestamps)
+
+  result = {}
+  for name in messages:
+    parts = decoded[name] or [(np.empty(0, dtype=np.int64), {})]
+    sequence = np.concatenate([part[0] for part in parts])
+    order = np.argsort(sequence, kind='stable')
+    columns = {}
+    for field_name, field in PROFILE[name][1].items():
+      if field.number == 253 and has_compressed:
+        column = times[sequence]
+      else:
+        column = np.concatenate([
+          values.get(field.number, np.full(len(part_sequence), np.nan))
+          for part_sequence, values in parts
+        ])
+      columns[field_name] = column[order]
+    result[name] = columns
+  return result
+
+
+def _resolve_compressed_timestamps(parts):
+  """Work out the timestamp of every message, given compressed headers.
+
+  A compressed header holds only the low 5 bits of the time since the last
+  full timestamp, so this goes through the messages in order.
+  """
+  total = sum(len(part[0]) for part in parts)
+  full = np.full(total, np.nan)
+  offsets = np.full(total, -1, dtype=np.int64)
+  for sequence, timestamps, time_offsets in parts:
+    full[sequence] = timestamps
+    offsets[sequence] = time_offsets
+
+  times = full.copy()
+  last = np.nan
+  for i in np.flatnonzero(~np.isnan(full) | (offsets >= 0)):
+    if offsets[i] >= 0 and not np.isnan(last):
+      last = last + ((offsets[i] - last) % 32)
+      times[i] = last
+    elif not np.isnan(full[i]):
+      last = full[i]
+  return times
+
+
+def _convert(values, field):
+  """Apply a field's scale and offset, and turn it into its column type."""
+  if field.kind == 'time':
+    valid = ~np.isnan(values)
+    ns = np.zeros(len(values), dtype=np.int64)
+    ns[valid] = np.round(values[valid] * 1e9).astype(np.int64)
+    times = FIT_EPOCH + ns.astype('timedelta64[ns]')
+    times[~valid] = np.datetime64('NaT')
+    return times
+  if field.kind == 'number':
+    return values / field.scale - field.offset
+  missing = np.isnan(values)
+  return np.ma.MaskedArray(
+    np.nan_to_num(values).astype(np.int64), mask=missing
+  )
+
+
+def _text(value, field):
+  """Text of one converted value, as stored for lap and session records."""
+  if value is np.ma.masked:
+    return None
+  if field.kind == 'time':
+    return None if np.isnat(value) else f'{value.astype("datetime64[ms]")}Z'
+  if field.kind == 'number':
+    return None if np.isnan(value) else repr(float(value))
+  if field.kind in ENUMS:
+    return ENUMS[field.kind].get(int(value), str(int(value)))
+  return str(int(value))
+
+
+def _prefer(preferred, fallback):
+  """Take values from preferred, and from fallback where preferred is NaN."""
+  return np.where(np.isnan(preferred), fallback, preferred)
+
+
+def _positions_by_time(times, start_times):
+  """Index of the last start time at or before each time, -1 if none."""
+  positions = np.full(len(times), -1, dtype=np.int64)
+  valid = np.flatnonzero(~np.isnat(start_times))
+  if not len(valid):
+    return positions
+  starts = start_times[valid].view(np.int64)
+  order = np.argsort(starts, kind='stable')
+  found = np.searchsorted(starts[order], times.view(np.int64), side='right') - 1
+  matched = (found >= 0) & ~np.isnat(times)
+  positions[matched] = valid[order[found[matched]]]
+  return positions
+
+
+class Trackpoint(ActivityElement):
+  """Represents a single data sample corresponding to a point in time.
+
+  Made from a FIT ``record`` message.
+  """
+  TAG = 'record'
+  CONTAINERS = {'bout': 'event', 'lap': 'lap'}
+  """FIT messages are not nested: ``lap`` is worked out from lap start
+  times, and ``bout`` from timer start events."""
+
+  time = create_data_prop('timestamp', datetime.datetime)
+  """datetime.datetime: Timestamp when trackpoint was recorded.
+
+  See also:
+    :ref:`data.timestamp`
+  """
+
+  lat = create_data_prop('position_lat', float)
+  """float: Latitude in degrees N (-90 to 90)."""
+
+  lon = create_data_prop('position_long', float)
+  """float: Longitude in degrees E (-180 to 180)."""
+
+  altitude_m = create_data_prop('altitude', float)
+  """float: Elevation in meters above sea level (``enhanced_altitude``
+  where recorded)."""
+
+  distance_m = create_data_prop('distance', float)
+  """float: Cumulative distance from the start of the activity, in meters.
+
+  See also:
+    :ref:`data.distance`
+  """
+
+  hr = create_data_prop('heart_rate', int)
+  """int: Heart rate."""
+
+  speed_ms = create_data_prop('speed', float)
+  """float: Speed in meters per second (``enhanced_speed`` where recorded)."""
+
+  cadence_rpm = create_data_prop('cadence', int)
+  """int: Cadence in RPM.
+
+  See also:
+    :ref:`data.cadence`
+  """
+
+  power_w = create_data_prop('power', int)
+  """int: Power in watts."""
+
+
+class Lap(TrackpointsMixin, ActivityElement):
+  """Represents one lap, from a FIT ``lap`` message."""
+  TAG = 'lap'
+
+  start_time = create_data_prop('start_time', datetime.datetime)
+  """datetime.datetime: Timestamp of lap start."""
+
+  total_time_s = create_data_prop('total_timer_time', float)
+  """float: Total lap time, in seconds, not counting time paused."""
+
+  elapsed_time_s = create_data_prop('total_elapsed_time', float)
+  """float: Time from lap start to lap end, in seconds."""
+
+  distance_m = create_data_prop('total_distance', float)
+  """float: Total lap distance, in meters."""
+
+  max_speed_ms = create_data_prop('max_speed', float)
+  """float: Maximum speed during the lap, in meters per second."""
+
+  avg_speed_ms = create_data_prop('avg_speed', float)
+  """float: Average speed during the lap, in meters per second."""
+
+  hr_avg = create_data_prop('avg_heart_rate', int)
+  """int: Average heart rate during the lap."""
+
+  hr_max = create_data_prop('max_heart_rate', int)
+  """int: Maximum heart rate during the lap."""
+
+  cadence_avg = create_data_prop('avg_cadence', int)
+  """int: Average cadence during the lap, in RPM."""
+
+  cadence_max = create_data_prop('max_cadence', int)
+  """int: Maximum cadence during the lap, in RPM."""
+
+  calories = create_data_prop('total_calories', int)
+  """int: Calories burned during the lap."""
+
+  intensity = create_data_prop('intensity', str)
+  """str: eg. ``'active'`` or ``'rest'``."""
+
+  trigger_method = create_data_prop('lap_trigger', str)
+  """str: What ended the lap, eg. ``'manual'`` or ``'distance'``."""
+
+  trackpoints = create_descendent_prop(Trackpoint)
+
+
+class Session(TrackpointsMixin, ActivityElement):
+  """Represents one activity session, from a FIT ``session`` message.
+
+  The FIT counterpart of :class:`activereader.tcx.Activity`.
+  """
+  TAG = 'session'
+
+  start_time = create_data_prop('start_time', datetime.datetime)
+  """datetime.datetime: Timestamp for session start time."""
+
+  sport = create_data_prop('sport', str)
+  """str: Session sport, eg. ``'running'`` or ``'cycling'``."""
+
+  total_time_s = create_data_prop('total_timer_time', float)
+  """float: Total session time, in seconds, not counting time paused."""
+
+  distance_m = create_data_prop('total_distance', float)
+  """float: Total session distance, in meters."""
+
+  calories = create_data_prop('total_calories', int)
+  """int: Calories burned during the session."""
+
+  hr_avg = create_data_prop('avg_heart_rate', int)
+  """int: Average heart rate during the session."""
+
+  hr_max = create_data_prop('max_heart_rate', int)
+  """int: Maximum heart rate during the session."""
+
+  laps = create_descendent_prop(Lap)
+  trackpoints = create_descendent_prop(Trackpoint)
+
+
+class Fit(TrackpointsMixin, ActivityElement):
+  """Represents an entire .fit file object.
+
+  Fit elements have no XML tree: they are always served from arrays, like
+  a compacted TCX or GPX element.
+  """
+  TAG = 'fit'
+
+  manufacturer = create_data_prop('manufacturer', str)
+  """str: Maker of the recording device, eg. ``'garmin'``."""
+
+  product_id = create_data_prop('product', int)
+  """int: Product number of the recording device."""
+
+  device_id = create_data_prop('serial_number', int)
+  """int: Serial number of the recording device."""
+
+  time_created = create_data_prop('time_created', datetime.datetime)
+  """datetime.datetime: When the file was created."""
+
+  @classmethod
+  def from_file(cls, file_obj):
+    """Initialize a Fit element from a file.
+
+    Args:
+      file_obj (str, bytes, io.BytesIO): Path of a .fit file, the file's
+        contents, or a binary file object.
+
+    Returns:
+      Fit: An instance backed by arrays decoded from the file.
+
+    Examples:
+
+      >>> fit_obj = Fit.from_file('activity.fit')
+      >>> fit_obj.columns(['time', 'hr'])['hr'].mean()
+      132.5
+
+    """
+    if isinstance(file_obj, (str, os.PathLike)):
+      if not os.path.exists(file_obj):
+        raise FileNotFoundError(f'File {file_obj} does not exist')
+      with open(file_obj, 'rb') as f:
+        data = f.read()
+    elif isinstance(file_obj, bytes):
+      data = file_obj
+    elif isinstance(file_obj, io.IOBase) or hasattr(file_obj, 'read'):
+      data = file_obj.read()
+    else:
+      raise TypeError(f'file object type not accepted: {type(file_obj)}')
+
+    return cls._from_compact(_build_store(decode(data)), 0)
+
+  sessions = create_descendent_prop(Session)
+  laps = create_descendent_prop(Lap)
+  trackpoints = create_descendent_prop(Trackpoint)
+
+
+def _build_store(messages):
+  """Arrange decoded messages the way a compacted Fit element's store would."""
+  converted = {
+    name: {
+      field_name: _convert(values, PROFILE[name][1][field_name])
+      for field_name, values in fields.items()
+    }
+    for name, fields in messages.items()
+  }
+
+  record = converted['record']
+  point_fields = {
+    'timestamp': record['timestamp'],
+    'position_lat': record['position_lat'],
+    'position_long': record['position_long'],
+    'altitude': _prefer(record['enhanced_altitude'], record['altitude']),
+    'distance': record['distance'],
+    'heart_rate': record['heart_rate'],
+    'speed': _prefer(record['enhanced_speed'], record['speed']),
+    'cadence': record['cadence'],
+    'power': record['power'],
+  }
+  times = record['timestamp']
+
+  for name in ('lap', 'session'):
+    for field in ('avg_speed', 'max_speed'):
+      converted[name][field] = _prefer(
+        converted[name][f'enhanced_{field}'], converted[name][field]
+      )
+
+  events = converted['event']
+  starts = events['timestamp'][
+    (np.ma.filled(events['event'], -1) == TIMER_EVENT)
+    & (np.ma.filled(events['event_type'], -1) == TIMER_START)
+  ]
+  # Points before the first timer start (or in files without timer events)
+  # belong to the first bout.
+  bouts = np.maximum(_positions_by_time(times, starts), 0)
+  bouts[np.isnat(times)] = -1
+
+  lap_starts = converted['lap']['start_time']
+  session_starts = converted['session']['start_time']
+
+  store = CompactStore.__new__(CompactStore)
+  store.root_class = Fit
+  store.classes = [Fit, Session, Lap, Trackpoint]
+  store.counts = {
+    Fit: 1,
+    Session: len(session_starts),
+    Lap: len(lap_starts),
+    Trackpoint: len(times),
+  }
+  store.ancestors = {
+    (Trackpoint, Lap): _positions_by_time(times, lap_starts),
+    (Trackpoint, Session): _positions_by_time(times, session_starts),
+    (Lap, Session): _positions_by_time(lap_starts, session_starts),
+  }
+  store.fields = {
+    Trackpoint: {prop.path: point_fields[prop.path] for prop in Trackpoint._fields().values()}
+  }
+  store.field_types = {
+    Trackpoint: {prop.path: prop.conv_type for prop in Trackpoint._fields().values()}
+  }
+  store.containers = {
+    Trackpoint: {'bout': bouts, 'lap': store.ancestors[Trackpoint, Lap]}
+  }
+
+  def records(name, count):
+    fields = PROFILE[name][1]
+    return [
+      ({}, {
+        field_name: text
+        for field_name, values in converted[name].items()
+        for text in [_text(values[i], fields[field_name])]
+        if text is not None
+      })
+      for i in range(count)
+    ]
+
+  file_ids = records('file_id', len(converted['file_id']['time_created']))
+  store.records = {
+    Fit: file_ids[:1] or [({}, {})],
+    Session: records('session', store.counts[Session]),
+    Lap: records('lap', store.counts[Lap]),
+  }
+  return store
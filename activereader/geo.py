@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Vectorized geometry for trackpoint columns.
+
+GPX trackpoints have no distance or speed of their own, and some TCX files
+leave out ``DistanceMeters``. The functions here derive those channels from
+the position, elevation and time columns read by
+:meth:`ActivityElement.columns<activereader.base.ActivityElement.columns>`.
+
+Distances between points are great-circle distances on a spherical earth,
+which are within about 0.5% of the true (ellipsoidal) distance.
+
+See also:
+
+  `Calculate distance, bearing and more between Latitude/Longitude points <https://www.movable-type.co.uk/scripts/latlong.html>`_
+    The haversine and bearing formulas.
+"""
+import numpy as np
+
+
+EARTH_RADIUS_M = 6371008.8
+"""Mean radius of the earth, in meters."""
+
+
+def haversine(lat1, lon1, lat2, lon2):
+  """Great-circle distance between points, in meters.
+
+  Args:
+    lat1, lon1, lat2, lon2 (array-like): Coordinates in degrees. Arrays
+      are compared element by element.
+
+  Returns:
+    numpy.ndarray: Distances in meters.
+  """
+  lat1, lon1, lat2, lon2 = (
+    np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2)
+  )
+  a = (
+    np.sin((lat2 - lat1) / 2) ** 2
+    + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+  )
+  return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bearing(lat1, lon1, lat2, lon2):
+  """Initial bearing from the first points to the second, in degrees.
+
+  Returns:
+    numpy.ndarray: Bearings clockwise from north, from 0 up to 360.
+  """
+  lat1, lon1, lat2, lon2 = (
+    np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2)
+  )
+  dlon = lon2 - lon1
+  y = np.sin(dlon) * np.cos(lat2)
+  x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+  return np.degrees(np.arctan2(y, x)) % 360
+
+
+def step_distances(lat, lon, bouts=None):
+  """Distance from the previous trackpoint with a position, in meters.
+
+  Args:
+    lat, lon (numpy.ndarray): Coordinates in degrees, NaN where missing.
+    bouts (numpy.ndarray): Bout id of each trackpoint, as in
+      :meth:`~activereader.base.ActivityElement.columns`. The first
+      trackpoint of each bout gets a step of 0, so the jump between bouts
+      is never counted.
+
+  Returns:
+    numpy.ndarray: NaN for trackpoints without a position.
+  """
+  steps, _ = _steps(lat, lon, bouts)
+  return steps
+
+
+def _steps(lat, lon, bouts):
+  """Step distances, plus each point's previous positioned point (or -1)."""
+  lat = np.asarray(lat, dtype=np.float64)
+  lon = np.asarray(lon, dtype=np.float64)
+  n = len(lat)
+  if bouts is None:
+    bouts = np.zeros(n, dtype=np.int64)
+
+  positioned = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+  previous = np.full(n, -1, dtype=np.int64)
+  if len(positioned) > 1:
+    previous[positioned[1:]] = positioned[:-1]
+  # A bout's first positioned point starts afresh.
+  has_previous = previous >= 0
+  has_previous[has_previous] = bouts[previous[has_previous]] == bouts[has_previous]
+  previous[~has_previous] = -1
+
+  steps = np.full(n, np.nan)
+  steps[positioned] = 0.0
+  i = np.flatnonzero(has_previous)
+  steps[i] = haversine(lat[previous[i]], lon[previous[i]], lat[i], lon[i])
+  return steps, previous
+
+
+def derived_columns(columns):
+  """Derive distance, speed, grade and bearing from trackpoint columns.
+
+  Args:
+    columns (dict): Trackpoint columns with ``lat`` and ``lon``, and
+      optionally ``time``, ``altitude_m`` and ``bout``, as returned by
+      :meth:`~activereader.base.ActivityElement.columns`.
+
+  Returns:
+    dict: Each with one entry per trackpoint:
+
+    - ``distance_m``: cumulative distance along positioned trackpoints,
+      not counting the jumps between bouts. Trackpoints without a position
+      keep the previous distance.
+    - ``speed_ms``: step distance over the time since the previous
+      positioned trackpoint, in meters per second (needs ``time``).
+    - ``grade``: elevation change over step distance, as a fraction
+      (needs ``altitude_m``).
+    - ``bearing_deg``: direction of travel from the previous positioned
+      trackpoint, in degrees clockwise from north.
+
+    Values that can't be derived, like the speed at the start of each
+    bout, are NaN.
+
+  Examples:
+
+    >>> derived = derived_columns(gpx_obj.columns())
+    >>> derived['distance_m'][-1]
+    1609.7
+
+  """
+  lat = np.asarray(columns['lat'], dtype=np.float64)
+  lon = np.asarray(columns['lon'], dtype=np.float64)
+  bouts = columns.get('bout')
+  steps, previous = _steps(lat, lon, bouts)
+  has_previous = previous >= 0
+  i, prev = np.flatnonzero(has_previous), previous[has_previous]
+
+  # Carry the distance forward over trackpoints without a position.
+  distance = np.cumsum(np.nan_to_num(steps))
+
+  moved = np.full(len(lat), np.nan)
+  moved[i] = steps[i]
+  moved[moved == 0] = np.nan
+
+  derived = {'distance_m': distance}
+
+  speed = np.full(len(lat), np.nan)
+  if 'time' in columns:
+    seconds = columns['time'].astype('datetime64[ns]').view(np.int64) / 1e9
+    seconds[np.isnat(columns['time'])] = np.nan
+    elapsed = seconds[i] - seconds[prev]
+    with np.errstate(divide='ignore', invalid='ignore'):
+      speed[i] = np.where(elapsed > 0, steps[i] / elapsed, np.nan)
+  derived['speed_ms'] = speed
+
+  grade = np.full(len(lat), np.nan)
+  if 'altitude_m' in columns:
+    altitude = np.ma.filled(np.ma.asarray(columns['altitude_m'], dtype=np.float64), np.nan)
+    grade[i] = (altitude[i] - altitude[prev]) / moved[i]
+  derived['grade'] = grade
+
+  heading = np.full(len(lat), np.nan)
+  heading[i] = bearing(lat[prev], lon[prev], lat[i], lon[i])
+  heading[np.isnan(moved)] = np.nan
+  derived['bearing_deg'] = heading
+
+  return derived
@@ -13,6 +13,7 @@ import datetime
 
 from .base import (
   ActivityElement,
+  TrackpointsMixin,
   XmlReader,
   add_xml_data, add_xml_attr, add_xml_descendents, 
   create_data_prop, create_attr_prop, create_descendent_prop
@@ -25,6 +26,7 @@ class Trackpoint(ActivityElement):
   The most granular of data contained in the file.
   """
   TAG = 'trkpt'
+  CONTAINERS = {'bout': 'trkseg', 'track': 'trk'}
 
   time = create_data_prop('time', datetime.datetime)
   """datetime.datetime: Timestamp when trackpoint was recorded.
@@ -55,9 +57,10 @@ class Trackpoint(ActivityElement):
 
 class Routepoint(Trackpoint):
   TAG = 'rtept'
+  CONTAINERS = {'route': 'rte'}
 
 
-class Segment(ActivityElement):
+class Segment(TrackpointsMixin, ActivityElement):
   """Holds a list of trackpoints which are logically connected in order.
   
   To represent a single GPS track where GPS reception was lost, or the 
@@ -73,7 +76,7 @@ class Segment(ActivityElement):
   name=('name', str),
   activity_type=('type', str),
 )
-class Track(ActivityElement):
+class Track(TrackpointsMixin, ActivityElement):
   """An ordered list of trackpoints describing a path."""
   TAG = 'trk'
 
@@ -81,18 +84,38 @@ class Track(ActivityElement):
   trackpoints = create_descendent_prop(Trackpoint)
 
 
+@add_xml_data(
+  name=('name', str),
+  activity_type=('type', str),
+)
+class Route(TrackpointsMixin, ActivityElement):
+  """An ordered list of routepoints leading to a destination, eg. a course.
+
+  Its routepoints are read in bulk like an activity's trackpoints, eg.
+  with :meth:`~activereader.base.ActivityElement.columns`. See
+  :mod:`activereader.course` to match an activity against one.
+  """
+  TAG = 'rte'
+
+  trackpoints = create_descendent_prop(Routepoint)
+  """:obj:`list` of :class:`Routepoint`: The route's points, under the name
+  bulk readers like :meth:`~activereader.base.ActivityElement.columns` use."""
+
+  routepoints = trackpoints
+
+
 @add_xml_data(name=('metadata/name', str))
 @add_xml_attr(
   creator=('creator', str),
   version=('version', str),
 )
-class Gpx(ActivityElement):
+class Gpx(TrackpointsMixin, ActivityElement):
   """Represents an entire .gpx file object."""
 
   TAG = 'gpx'
 
   @classmethod
-  def from_file(cls, file_obj):
+  def from_file(cls, file_obj, keep_tree=True, simplify=None, validate=False):
     """Initialize a Gpx element from a file-like object.
 
     Args:
@@ -100,17 +123,35 @@ class Gpx(ActivityElement):
         If str, either filename or a string representation of XML 
         object. If str or StringIO, the encoding should not be declared
         within the string.
+      keep_tree (bool): If False, the data is moved into arrays and the
+        XML tree is released right away. See :meth:`~activereader.base.ActivityElement.compact`.
+        Defaults to True.
+      simplify (callable): Drops trackpoints while the file is read, so only
+        the kept ones are held in the tree. Takes trackpoint columns and
+        returns a boolean mask of the trackpoints to keep; see
+        :mod:`activereader.simplify`. Defaults to keeping every trackpoint.
+      validate (bool): Check the file against the GPX schema while it is
+        read. See :mod:`activereader.validation`. Defaults to False.
 
     Returns:
       Gpx: An instance initialized with the :class:`~lxml.etree._Element`
       that was read in.
 
+    Raises:
+      activereader.validation.ValidationError: If ``validate`` is True and
+        the file does not match the schema.
+
     See also:
       https://lxml.de/tutorial.html#the-parse-function
 
     """
     xml_reader = XmlReader(file_obj, ext='gpx')
-    xml_obj = xml_reader.read()
+    xml_obj = xml_reader.read(
+      simplify=simplify, point_class=Trackpoint, validate=validate
+    )
+
+    if not keep_tree:
+      return cls(xml_obj).compact()
 
     return cls(xml_obj)
 
@@ -130,5 +171,5 @@ class Gpx(ActivityElement):
   tracks = create_descendent_prop(Track)
   segments = create_descendent_prop(Segment)
   trackpoints = create_descendent_prop(Trackpoint)
-  # routes = create_descendent_prop(Route)
+  routes = create_descendent_prop(Route)
   routepoints = create_descendent_prop(Routepoint)
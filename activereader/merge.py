@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Merge activities recorded at the same time on different devices.
+
+A watch might record heart rate while a bike computer records position and
+power. :func:`merge` puts their trackpoint columns on one timeline: each
+source's trackpoints are matched to the timeline's times by binary search
+on the sorted time arrays (see :class:`~activereader.timeindex.TimeIndex`),
+and kept only where they are within a tolerance. Each source's columns
+are renamed with its name as a prefix, eg. ``watch_hr`` and ``bike_lat``.
+"""
+import numpy as np
+
+from .base import ActivityElement
+from .timeindex import TimeIndex
+
+
+def _columns(source, fields):
+  """Read a source's columns, if it is an element rather than columns."""
+  if not isinstance(source, ActivityElement):
+    if fields is None:
+      return source
+    return {
+      name: column for name, column in source.items()
+      if name in fields or name == 'time'
+    }
+  if fields is None:
+    return source.columns()
+  declared = source._descendent_class('trackpoints')._fields()
+  return source.columns(
+    ['time'] + [name for name in fields if name in declared and name != 'time']
+  )
+
+
+def _take(column, offsets):
+  """Select column entries at offsets, with -1 giving a missing value."""
+  # Index -1 picks a trailing missing value.
+  kind = column.dtype.kind
+  if isinstance(column, np.ma.MaskedArray):
+    padded = np.ma.concatenate([column, np.ma.masked_all(1, column.dtype)])
+  elif kind == 'M':
+    padded = np.concatenate([column, np.array(['NaT'], dtype=column.dtype)])
+  elif kind == 'f':
+    padded = np.concatenate([column, [np.nan]])
+  elif kind in 'iu':
+    # Container ids.
+    padded = np.concatenate([column, [-1]])
+  else:
+    padded = np.concatenate([column.astype(object), [None]])
+  return padded[offsets]
+
+
+def merge(sources, tolerance_s=1.0, how='first', direction='nearest', fields=None):
+  """Align the trackpoint data of several activities on one timeline.
+
+  Args:
+    sources (dict): Maps a name for each source, used as its columns'
+      prefix, to an activity element or to columns as returned by
+      :meth:`~activereader.base.ActivityElement.columns`. Each needs a
+      ``time`` column.
+    tolerance_s (float): The furthest a source's trackpoint may be from a
+      timeline time to be matched to it, in seconds.
+    how (str): ``'first'`` to use the first source's trackpoint times as
+      the timeline, keeping all of its data, or ``'outer'`` to use every
+      time any source recorded.
+    direction (str): ``'nearest'`` to match the nearest trackpoint (ties
+      go to the earlier one), or ``'backward'`` to match the last
+      trackpoint at or before each time.
+    fields (list of str): Names of the fields to keep from each source
+      that has them. Defaults to all of them.
+
+  Returns:
+    dict: ``time``, the timeline, followed by every source's columns
+    (including container ids) named ``<name>_<field>``. Where a source has
+    no trackpoint within the tolerance, its values are missing: NaN, NaT,
+    masked, -1 for container ids, or None for text.
+
+  Raises:
+    ValueError: If ``how`` or ``direction`` is not one of the above.
+
+  Examples:
+
+    >>> merged = merge({'watch': watch_tcx, 'bike': bike_gpx}, tolerance_s=2)
+    >>> merged['watch_hr'][:3], merged['bike_lat'][:3]
+    (masked_array(data=[121, 123, 124]), array([40.01, 40.01, 40.02]))
+
+  """
+  if how not in ('first', 'outer'):
+    raise ValueError(f'how must be "first" or "outer", not "{how}"')
+  if direction not in ('nearest', 'backward'):
+    raise ValueError(
+      f'direction must be "nearest" or "backward", not "{direction}"'
+    )
+
+  columns = {name: _columns(source, fields) for name, source in sources.items()}
+  times = {
+    name: cols['time'].astype('datetime64[ns]') for name, cols in columns.items()
+  }
+
+  if how == 'first':
+    timeline = next(iter(times.values()))
+  else:
+    all_times = np.concatenate(list(times.values()))
+    timeline = np.unique(all_times[~np.isnat(all_times)])
+
+  tolerance_ns = int(round(tolerance_s * 1e9))
+  valid = ~np.isnat(timeline)
+  merged = {'time': timeline}
+  for i, (name, cols) in enumerate(columns.items()):
+    if how == 'first' and i == 0:
+      offsets = np.arange(len(timeline))
+    else:
+      offsets = np.full(len(timeline), -1, dtype=np.int64)
+      index = TimeIndex({'time': times[name]})
+      if len(index) and valid.any():
+        if direction == 'nearest':
+          found = index.nearest(timeline[valid])
+        else:
+          found = index.asof(timeline[valid])
+        matched = found >= 0
+        gap = np.abs(
+          times[name][np.maximum(found, 0)].view(np.int64)
+          - timeline[valid].view(np.int64)
+        )
+        found[~matched | (gap > tolerance_ns)] = -1
+        offsets[valid] = found
+
+    for field, column in cols.items():
+      if field != 'time':
+        merged[f'{name}_{field}'] = _take(column, offsets)
+  return merged
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Encode and decode positions in Google's encoded polyline format.
+
+An encoded polyline stores each position as the change in latitude and
+longitude from the one before, rounded to ``precision`` decimal places,
+in printable ASCII. Both directions work on whole arrays at once, with no
+loop over positions.
+
+See also:
+
+  `Encoded Polyline Algorithm Format <https://developers.google.com/maps/documentation/utilities/polylinealgorithm>`_
+"""
+import numpy as np
+
+
+def encode(lat, lon, precision=5):
+  """Encode positions as a polyline.
+
+  Args:
+    lat, lon (array-like): Coordinates in degrees. Positions where either is
+      NaN are left out.
+    precision (int): Number of decimal places kept. Google Maps uses 5;
+      some routing services use 6.
+
+  Returns:
+    str: The encoded polyline.
+
+  Examples:
+
+    >>> encode([38.5, 40.7, 43.252], [-120.2, -120.95, -126.453])
+    '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+  """
+  lat = np.asarray(lat, dtype=np.float64)
+  lon = np.asarray(lon, dtype=np.float64)
+  positioned = ~(np.isnan(lat) | np.isnan(lon))
+  factor = 10 ** precision
+  points = np.column_stack([lat[positioned], lon[positioned]])
+  values = np.round(points * factor).astype(np.int64).ravel()
+  if not len(values):
+    return ''
+
+  # Pairs of deltas, zigzag-encoded so small negatives stay small.
+  deltas = np.diff(values.reshape(-1, 2), axis=0, prepend=0).ravel()
+  zigzag = ((deltas << 1) ^ (deltas >> 63)).astype(np.uint64)
+
+  # Split each value into 5-bit chunks, least significant first.
+  max_chunks = max(1, -(-int(zigzag.max()).bit_length() // 5))
+  shifts = np.arange(max_chunks, dtype=np.uint64) * np.uint64(5)
+  chunks = (zigzag[:, None] >> shifts) & np.uint64(31)
+  num_chunks = 1 + ((zigzag[:, None] >> shifts[1:]) > 0).sum(axis=1)
+  used = np.arange(max_chunks) < num_chunks[:, None]
+  more = np.arange(max_chunks) < (num_chunks - 1)[:, None]
+  chunks |= more.astype(np.uint64) << np.uint64(5)
+
+  return (chunks[used] + 63).astype(np.uint8).tobytes().decode('ascii')
+
+
+def decode(polyline, precision=5):
+  """Decode a polyline made by :func:`encode` (or any other encoder).
+
+  Args:
+    polyline (str): The encoded polyline.
+    precision (int): Number of decimal places it was encoded with.
+
+  Returns:
+    tuple(numpy.ndarray, numpy.ndarray): Latitudes and longitudes in
+    degrees.
+
+  Raises:
+    ValueError: If the polyline is cut off or has an odd number of values.
+  """
+  data = np.frombuffer(polyline.encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+  if not len(data):
+    return np.empty(0), np.empty(0)
+  if np.any((data < 0) | (data > 63)):
+    raise ValueError('Polyline contains characters outside the encoding')
+
+  ends = (data & 0x20) == 0
+  if not ends[-1]:
+    raise ValueError('Polyline ends in the middle of a value')
+  starts = np.flatnonzero(np.concatenate([[True], ends[:-1]]))
+  value_ids = np.cumsum(np.concatenate([[0], ends[:-1]]))
+  chunk_positions = np.arange(len(data)) - starts[value_ids]
+
+  zigzag = np.add.reduceat((data & 31) << (5 * chunk_positions), starts)
+  if len(zigzag) % 2:
+    raise ValueError('Polyline has an odd number of values')
+  deltas = (zigzag >> 1) ^ -(zigzag & 1)
+
+  points = np.cumsum(deltas.reshape(-1, 2), axis=0) / 10 ** precision
+  return points[:, 0], points[:, 1]
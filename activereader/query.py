@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Select trackpoints by conditions on their data.
+
+Conditions are keyword arguments in the form ``<field>__<operator>=value``,
+as in ``hr__gt=160`` or ``time__between=(t0, t1)``. A bare field name
+(``hr=150``) tests for equality. Each condition is evaluated as one
+comparison over a whole column, and the resulting boolean masks are
+combined with "and".
+
+Missing data (NaN, NaT or masked entries) never satisfies a comparison;
+select it with ``<field>__isnull=True``, or require data to be present
+with ``<field>__isnull=False``.
+
+See also:
+
+  :meth:`TrackpointsMixin.where<activereader.base.TrackpointsMixin.where>`
+"""
+import numpy as np
+
+from .timeindex import _to_ns
+
+
+def _between(column, bounds):
+  low, high = bounds
+  return (column >= low) & (column <= high)
+
+
+OPERATORS = {
+  'eq': lambda column, value: column == value,
+  'ne': lambda column, value: column != value,
+  'lt': lambda column, value: column < value,
+  'le': lambda column, value: column <= value,
+  'gt': lambda column, value: column > value,
+  'ge': lambda column, value: column >= value,
+  'between': _between,
+  'in': lambda column, values: np.isin(column, values),
+}
+"""Maps operator names to functions of a column and a condition value."""
+
+
+def _missing(column):
+  """Boolean mask of the missing entries of a column."""
+  if isinstance(column, np.ma.MaskedArray):
+    return np.ma.getmaskarray(column)
+  if column.dtype.kind == 'M':
+    return np.isnat(column)
+  if column.dtype.kind == 'f':
+    return np.isnan(column)
+  if column.dtype.kind == 'O':
+    return np.array([value is None for value in column], dtype=bool)
+  return np.zeros(len(column), dtype=bool)
+
+
+def _to_column_type(column, value):
+  """Convert a condition value (or tuple/list of them) to match a column."""
+  if column.dtype.kind != 'M':
+    return value
+  if isinstance(value, tuple):
+    return tuple(_to_column_type(column, item) for item in value)
+  return np.asarray(_to_ns(value)).view('datetime64[ns]')
+
+
+def parse_conditions(conditions, names):
+  """Split condition keywords into (field, operator, value) triples.
+
+  Args:
+    conditions (dict): Condition keywords, as described above.
+    names (iterable of str): The field names that may be tested.
+
+  Returns:
+    list of tuple
+
+  Raises:
+    KeyError: If a condition names an unknown field.
+    ValueError: If a condition names an unknown operator.
+  """
+  parsed = []
+  for key, value in conditions.items():
+    name, _, op = key.partition('__')
+    op = op or 'eq'
+    if name not in names:
+      raise KeyError(f'Cannot filter on unknown field "{name}"')
+    if op != 'isnull' and op not in OPERATORS:
+      raise ValueError(
+        f'Unknown operator "{op}" in "{key}"; expected one of '
+        f'{sorted(OPERATORS) + ["isnull"]}'
+      )
+    parsed.append((name, op, value))
+  return parsed
+
+
+def mask(columns, conditions):
+  """Evaluate conditions over trackpoint columns.
+
+  Args:
+    columns (dict): Trackpoint columns, as returned by
+      :meth:`~activereader.base.ActivityElement.columns`, including every
+      field the conditions name.
+    conditions (list of tuple): (field, operator, value) triples, as
+      returned by :func:`parse_conditions`.
+
+  Returns:
+    numpy.ndarray: Boolean mask of the trackpoints meeting every condition.
+
+  Examples:
+
+    >>> cols = tcx_obj.columns(['hr', 'cadence_rpm'])
+    >>> mask(cols, [('hr', 'gt', 160), ('cadence_rpm', 'isnull', False)]).sum()
+    12
+
+  """
+  size = len(next(iter(columns.values()))) if columns else 0
+  result = np.ones(size, dtype=bool)
+  for name, op, value in conditions:
+    column = columns[name]
+    missing = _missing(column)
+    if op == 'isnull':
+      result &= missing if value else ~missing
+      continue
+    data = np.ma.getdata(column)
+    with np.errstate(invalid='ignore'):
+      matches = np.asarray(OPERATORS[op](data, _to_column_type(data, value)))
+    result &= matches & ~missing
+  return result
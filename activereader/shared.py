@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Hand parsed activities to other processes through shared memory.
+
+Activity elements pickle in their compact, array-based form (see
+:meth:`ActivityElement.compact<activereader.base.ActivityElement.compact>`).
+:class:`SharedElement` pickles an element with protocol 5 and places its
+arrays in one :class:`multiprocessing.shared_memory.SharedMemory` block,
+so sending it to a worker only sends a small handle, and the worker's
+arrays are views on the shared block rather than copies.
+
+Examples:
+
+  >>> from concurrent.futures import ProcessPoolExecutor
+  >>> def num_records(handle):
+  ...   return handle.load().num_records
+  >>> with SharedElement(Tcx.from_file('activity.tcx')) as handle:
+  ...   with ProcessPoolExecutor() as pool:
+  ...     pool.submit(num_records, handle).result()
+  98
+
+See also:
+
+  `PEP 574 <https://peps.python.org/pep-0574/>`_
+    Pickle protocol 5 with out-of-band data.
+"""
+import pickle
+import sys
+import threading
+from multiprocessing import resource_tracker, shared_memory
+
+
+_ALIGNMENT = 64
+
+_attach_lock = threading.Lock()
+
+
+def _align(offset):
+  return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _attach(name):
+  """Open an existing shared memory block without taking ownership of it."""
+  if sys.version_info >= (3, 13):
+    return shared_memory.SharedMemory(name=name, track=False)
+
+  # Before 3.13, attaching registers the block with the resource tracker,
+  # which would unlink it when the attaching process exits.
+  with _attach_lock:
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+      return shared_memory.SharedMemory(name=name)
+    finally:
+      resource_tracker.register = register
+
+
+def _rebuild(name, meta, layout):
+  handle = SharedElement.__new__(SharedElement)
+  handle.name = name
+  handle._meta = meta
+  handle._layout = layout
+  handle._shm = _attach(name)
+  handle._owner = False
+  return handle
+
+
+class SharedElement(object):
+  """A handle on an activity element whose arrays live in shared memory.
+
+  The process that creates the handle owns the shared memory block, and
+  should :meth:`unlink` it once every process is done (or use the handle
+  as a context manager). Pickling the handle only pickles the block's name
+  and the element's small in-band data.
+
+  Args:
+    element (ActivityElement): The element to share. Tree-backed elements
+      are compacted on the way, without changing the element itself.
+  """
+  def __init__(self, element):
+    buffers = []
+    self._meta = pickle.dumps(
+      element, protocol=5, buffer_callback=buffers.append
+    )
+
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    self._layout = []
+    size = 0
+    for raw in raw_buffers:
+      offset = _align(size)
+      self._layout.append((offset, raw.nbytes))
+      size = offset + raw.nbytes
+
+    self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    self._owner = True
+    self.name = self._shm.name
+    for raw, (offset, nbytes) in zip(raw_buffers, self._layout):
+      self._shm.buf[offset:offset + nbytes] = raw
+
+  def __reduce__(self):
+    return (_rebuild, (self.name, self._meta, self._layout))
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+    if self._owner:
+      self.unlink()
+
+  @property
+  def nbytes(self):
+    """int: Size of the shared memory block."""
+    return self._shm.size
+
+  def load(self):
+    """Rebuild the element, with its arrays viewing the shared memory.
+
+    The arrays stay valid for as long as this handle is open. Drop every
+    element loaded from the handle before calling :meth:`close`.
+
+    Returns:
+      ActivityElement: A compact element.
+    """
+    buffers = [
+      self._shm.buf[offset:offset + nbytes]
+      for offset, nbytes in self._layout
+    ]
+    return pickle.loads(self._meta, buffers=buffers)
+
+  def close(self):
+    """Close this process's access to the shared memory block."""
+    self._shm.close()
+
+  def unlink(self):
+    """Free the shared memory block. Only the owning process should."""
+    self._shm.unlink()
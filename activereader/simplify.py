@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""Reduce activities to fewer trackpoints, for map previews and thumbnails.
+
+Each function takes trackpoint columns, as returned by
+:meth:`ActivityElement.columns<activereader.base.ActivityElement.columns>`,
+and returns a boolean mask of the trackpoints to keep. Every bout (TCX
+``Track`` or GPX ``trkseg``) is reduced separately, and keeps its first and
+last trackpoint.
+
+The same functions can be applied while a file is read, by passing one as
+``simplify`` to ``from_file``. The reader then drops trackpoints from the
+XML tree as it goes, so the dropped ones are never held in memory all at
+once:
+
+  >>> import functools
+  >>> gpx_obj = Gpx.from_file(
+  ...   'activity.gpx',
+  ...   simplify=functools.partial(douglas_peucker, tolerance_m=5)
+  ... )
+
+See also:
+
+  `Ramer-Douglas-Peucker algorithm <https://en.wikipedia.org/wiki/Ramer%E2%80%93Douglas%E2%80%93Peucker_algorithm>`_
+"""
+import numpy as np
+
+from . import geo, util
+
+
+STREAM_CHUNK_SIZE = 4096
+"""Number of trackpoints simplified at a time while reading a file.
+
+The last trackpoint of each chunk is always kept, so a file simplified
+while reading can keep a few more trackpoints than the same data simplified
+all at once.
+"""
+
+
+def _bout_ends(columns, valid):
+  """Whether each valid trackpoint is the first or last valid one of its bout."""
+  n = len(valid)
+  bouts = columns.get('bout', np.zeros(n, dtype=np.int64))
+  offsets = np.flatnonzero(valid)
+  first = np.zeros(n, dtype=bool)
+  last = np.zeros(n, dtype=bool)
+  if len(offsets):
+    changes = np.flatnonzero(np.diff(bouts[offsets])) + 1
+    first[offsets[np.concatenate([[0], changes])]] = True
+    last[offsets[np.concatenate([changes - 1, [len(offsets) - 1]])]] = True
+  return first, last
+
+
+def _project(lat, lon):
+  """Project coordinates onto a local plane, in meters."""
+  lat0 = np.radians(np.nanmean(lat)) if len(lat) else 0.0
+  x = geo.EARTH_RADIUS_M * np.radians(lon) * np.cos(lat0)
+  y = geo.EARTH_RADIUS_M * np.radians(lat)
+  return x, y
+
+
+def _segment_distances(x, y, x0, y0, x1, y1):
+  """Distance from each point to the line segment from (x0, y0) to (x1, y1)."""
+  dx, dy = x1 - x0, y1 - y0
+  length_sq = dx * dx + dy * dy
+  if length_sq == 0:
+    return np.hypot(x - x0, y - y0)
+  t = np.clip(((x - x0) * dx + (y - y0) * dy) / length_sq, 0, 1)
+  return np.hypot(x - (x0 + t * dx), y - (y0 + t * dy))
+
+
+def douglas_peucker(columns, tolerance_m):
+  """Keep the trackpoints needed to trace the route within a tolerance.
+
+  Trackpoints without a position are dropped. Every dropped trackpoint with
+  a position is within ``tolerance_m`` of the line through the kept ones.
+
+  Args:
+    columns (dict): Trackpoint columns. Must include ``lat`` and ``lon``.
+    tolerance_m (float): The farthest a dropped trackpoint may be from the
+      simplified line, in meters.
+
+  Returns:
+    numpy.ndarray: Boolean mask of the trackpoints to keep.
+  """
+  lat = np.asarray(columns['lat'], dtype=np.float64)
+  lon = np.asarray(columns['lon'], dtype=np.float64)
+  positioned = ~(np.isnan(lat) | np.isnan(lon))
+  first, last = _bout_ends(columns, positioned)
+  keep = first | last
+
+  offsets = np.flatnonzero(positioned)
+  x, y = _project(lat[offsets], lon[offsets])
+  firsts = np.flatnonzero(first[offsets])
+  lasts = np.flatnonzero(last[offsets])
+
+  # Positions (in offsets) of segments still to be checked.
+  stack = [(start, stop) for start, stop in zip(firsts, lasts) if stop - start > 1]
+  while stack:
+    start, stop = stack.pop()
+    distances = _segment_distances(
+      x[start + 1:stop], y[start + 1:stop],
+      x[start], y[start], x[stop], y[stop]
+    )
+    farthest = int(np.argmax(distances))
+    if distances[farthest] > tolerance_m:
+      split = start + 1 + farthest
+      keep[offsets[split]] = True
+      if split - start > 1:
+        stack.append((start, split))
+      if stop - split > 1:
+        stack.append((split, stop))
+
+  return keep
+
+
+def decimate(columns, interval_s=None, distance_m=None):
+  """Keep the first trackpoint in each time or distance bucket.
+
+  Buckets are whole multiples of ``interval_s`` seconds since the epoch,
+  and of ``distance_m`` meters along the bout (measured between
+  trackpoint positions). With both, a trackpoint starting either kind of
+  bucket is kept. Trackpoints without the time or position needed are
+  dropped.
+
+  Args:
+    columns (dict): Trackpoint columns. ``interval_s`` needs ``time``, and
+      ``distance_m`` needs ``lat`` and ``lon``.
+    interval_s (float): Bucket length in seconds.
+    distance_m (float): Bucket length in meters.
+
+  Returns:
+    numpy.ndarray: Boolean mask of the trackpoints to keep.
+  """
+  if interval_s is None and distance_m is None:
+    raise ValueError('At least one of interval_s and distance_m is required')
+
+  n = len(next(iter(columns.values()))) if columns else 0
+  bouts = columns.get('bout', np.zeros(n, dtype=np.int64))
+  buckets = []
+  valid = np.ones(n, dtype=bool)
+  if interval_s is not None:
+    times = columns['time'].astype('datetime64[ns]')
+    valid &= ~np.isnat(times)
+    buckets.append(np.floor(times.view(np.int64) / (interval_s * 1e9)))
+  if distance_m is not None:
+    steps = geo.step_distances(columns['lat'], columns['lon'], bouts)
+    valid &= ~np.isnan(steps)
+    buckets.append(np.floor(np.cumsum(np.nan_to_num(steps)) / distance_m))
+
+  first, last = _bout_ends(columns, valid)
+  offsets = np.flatnonzero(valid)
+  new_bucket = np.zeros(len(offsets), dtype=bool)
+  for bucket in buckets:
+    new_bucket[1:] |= np.diff(bucket[offsets]) != 0
+
+  keep = first | last
+  keep[offsets[new_bucket]] = True
+  return keep
+
+
+class StreamSimplifier(object):
+  """Drop trackpoint elements from a tree while it is being parsed.
+
+  Trackpoints are fed in document order, and simplified a chunk at a time
+  within each parent element (one bout). Elements that are dropped are
+  removed from the tree straight away.
+
+  Args:
+    simplify (callable): Takes trackpoint columns, and returns a boolean
+      mask of the trackpoints to keep, like :func:`douglas_peucker`.
+    point_class (type): The :class:`~activereader.base.ActivityElement`
+      subclass of the trackpoints; its ``time``, ``lat`` and ``lon``
+      properties say where to find the columns.
+    chunk_size (int): See :data:`STREAM_CHUNK_SIZE`.
+  """
+  def __init__(self, simplify, point_class, chunk_size=STREAM_CHUNK_SIZE):
+    self.simplify = simplify
+    self.fields = {
+      name: prop for name, prop in point_class._fields().items()
+      if name in ('time', 'lat', 'lon')
+    }
+    self.chunk_size = chunk_size
+    self._buffer = []
+    self._parent = None
+
+  def add(self, elem):
+    """Take the next trackpoint element, once it has been fully parsed."""
+    parent = elem.getparent()
+    if self._buffer and parent is not self._parent:
+      self.flush()
+    self._parent = parent
+    self._buffer.append(elem)
+    # The first element of the buffer was already kept by the last chunk.
+    if len(self._buffer) > self.chunk_size:
+      self._simplify(keep_last=True)
+      self._buffer = self._buffer[-1:]
+
+  def flush(self):
+    """Simplify the trackpoints waiting in the current bout."""
+    if self._buffer:
+      self._simplify(keep_last=False)
+    self._buffer = []
+    self._parent = None
+
+  def _simplify(self, keep_last):
+    columns = {
+      name: util.to_array(
+        [util.field_text(elem, prop) for elem in self._buffer], prop.conv_type
+      )
+      for name, prop in self.fields.items()
+    }
+    keep = np.asarray(self.simplify(columns), dtype=bool)
+    keep[0] = True
+    if keep_last:
+      keep[-1] = True
+    for elem, kept in zip(self._buffer, keep):
+      if not kept:
+        self._parent.remove(elem)
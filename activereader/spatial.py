@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""Find the activities that pass through an area.
+
+:class:`GridIndex` divides the globe into cells of equal size in degrees,
+and records which ranges of each activity's trackpoints fall in which
+cells. A query only looks at the cells that overlap the area, so finding
+the activities that passed through a box or near a point takes one binary
+search per row of cells, however many activities are indexed.
+
+Examples:
+
+  >>> index = GridIndex(cell_deg=0.01)
+  >>> for path in glob.glob('activities/*.gpx'):
+  ...   index.add_activity(path, Gpx.from_file(path))
+  >>> index.save('activities.npz')
+  >>> GridIndex.load('activities.npz').near(40.0, -105.25, radius_m=200)
+  [Hit(activity='activities/run.gpx', start=212, stop=260)]
+
+"""
+import collections
+
+import numpy as np
+
+from . import geo
+
+
+Hit = collections.namedtuple('Hit', ['activity', 'start', 'stop'])
+Hit.__doc__ = """A range of an activity's trackpoints, like a slice."""
+
+
+def _expand(starts, stops):
+  """Concatenate ``arange(start, stop)`` for each pair, without a loop."""
+  lengths = stops - starts
+  total = int(lengths.sum())
+  if not total:
+    return np.empty(0, dtype=np.int64)
+  ends = np.cumsum(lengths)
+  offsets = np.repeat(starts - (ends - lengths), lengths)
+  return np.arange(total, dtype=np.int64) + offsets
+
+
+class GridIndex(object):
+  """Index of activities by the grid cells their trackpoints fall in.
+
+  Hits are as precise as the grid: every trackpoint in a cell that
+  overlaps the queried area is part of a hit. Smaller cells give tighter
+  hits, at the cost of a larger index. Cells of 0.01 degrees (about 1 km)
+  suit most searches.
+
+  Args:
+    cell_deg (float): Height and width of the grid cells, in degrees.
+  """
+  def __init__(self, cell_deg=0.01):
+    if cell_deg <= 0:
+      raise ValueError('cell_deg must be positive')
+    self.cell_deg = float(cell_deg)
+    self._num_cols = int(np.ceil(360 / self.cell_deg))
+    self._num_rows = int(np.ceil(180 / self.cell_deg))
+
+    self.activities = []
+    self._positions = {}
+
+    # Runs of consecutive trackpoints in the same cell, sorted by cell.
+    self._cells = np.empty(0, dtype=np.int64)
+    self._activity = np.empty(0, dtype=np.int64)
+    self._starts = np.empty(0, dtype=np.int64)
+    self._stops = np.empty(0, dtype=np.int64)
+    self._pending = []
+
+  def __len__(self):
+    return len(self.activities)
+
+  def __contains__(self, activity):
+    return activity in self._positions
+
+  def _rows_cols(self, lat, lon):
+    rows = np.floor((np.asarray(lat, dtype=np.float64) + 90) / self.cell_deg)
+    cols = np.floor((np.asarray(lon, dtype=np.float64) + 180) / self.cell_deg)
+    return (
+      np.clip(rows, 0, self._num_rows - 1).astype(np.int64),
+      np.clip(cols, 0, self._num_cols - 1).astype(np.int64),
+    )
+
+  def add(self, activity, lat, lon):
+    """Index one activity's trackpoint positions.
+
+    Args:
+      activity (str): Name for the activity, such as its file path, which
+        is returned in query hits.
+      lat, lon (array-like): Trackpoint coordinates in degrees, NaN where
+        a trackpoint has no position. Hits are offsets into these arrays.
+    """
+    if activity in self._positions:
+      raise ValueError(f'Activity "{activity}" is already indexed')
+    position = len(self.activities)
+    self.activities.append(activity)
+    self._positions[activity] = position
+
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    positioned = ~(np.isnan(lat) | np.isnan(lon))
+    rows, cols = self._rows_cols(np.nan_to_num(lat), np.nan_to_num(lon))
+    cells = np.where(positioned, rows * self._num_cols + cols, -1)
+
+    # A new run starts wherever the cell changes.
+    if len(cells):
+      changes = np.flatnonzero(np.diff(cells)) + 1
+      starts = np.concatenate([[0], changes])
+      stops = np.concatenate([changes, [len(cells)]])
+      keep = cells[starts] >= 0
+      starts, stops = starts[keep], stops[keep]
+    else:
+      starts = stops = np.empty(0, dtype=np.int64)
+
+    self._pending.append((
+      cells[starts],
+      np.full(len(starts), position, dtype=np.int64),
+      starts.astype(np.int64),
+      stops.astype(np.int64),
+    ))
+
+  def add_activity(self, activity, element):
+    """Index the trackpoints of a parsed activity.
+
+    Args:
+      activity (str): Name for the activity, returned in query hits.
+      element (ActivityElement): The activity, or any element whose
+        trackpoints have ``lat`` and ``lon``. Hits are offsets into its
+        ``trackpoints``.
+    """
+    columns = element.columns(['lat', 'lon'])
+    self.add(activity, columns['lat'], columns['lon'])
+
+  def _build(self):
+    """Merge runs added since the last query into the sorted arrays."""
+    if not self._pending:
+      return
+    arrays = [
+      np.concatenate([current] + [chunk[i] for chunk in self._pending])
+      for i, current in enumerate(
+        (self._cells, self._activity, self._starts, self._stops)
+      )
+    ]
+    order = np.argsort(arrays[0], kind='stable')
+    self._cells, self._activity, self._starts, self._stops = (
+      array[order] for array in arrays
+    )
+    self._pending = []
+
+  def _runs_in(self, min_lat, min_lon, max_lat, max_lon):
+    """Offsets of the runs in cells overlapping a box (no antimeridian)."""
+    (row0, row1), (col0, col1) = self._rows_cols(
+      [min_lat, max_lat], [min_lon, max_lon]
+    )
+    rows = np.arange(row0, row1 + 1, dtype=np.int64) * self._num_cols
+    lo = np.searchsorted(self._cells, rows + col0, side='left')
+    hi = np.searchsorted(self._cells, rows + col1, side='right')
+    return _expand(lo, hi)
+
+  def _hits(self, runs):
+    """Turn run offsets into hits, merging adjacent ranges."""
+    if not len(runs):
+      return []
+    activity, starts, stops = (
+      self._activity[runs], self._starts[runs], self._stops[runs]
+    )
+    order = np.lexsort((starts, activity))
+    activity, starts, stops = activity[order], starts[order], stops[order]
+
+    continues = np.zeros(len(runs), dtype=bool)
+    continues[1:] = (activity[1:] == activity[:-1]) & (starts[1:] == stops[:-1])
+    first = np.flatnonzero(~continues)
+    last = np.concatenate([first[1:], [len(runs)]]) - 1
+    return [
+      Hit(self.activities[a], int(start), int(stop))
+      for a, start, stop in zip(activity[first], starts[first], stops[last])
+    ]
+
+  def within(self, min_lat, min_lon, max_lat, max_lon):
+    """Find the trackpoints inside a bounding box.
+
+    Args:
+      min_lat, min_lon, max_lat, max_lon (float): Corners of the box, in
+        degrees. A box with ``min_lon > max_lon`` crosses the antimeridian.
+
+    Returns:
+      list(Hit): Ranges of trackpoints in cells that overlap the box,
+      ordered by activity (in the order they were added) then offset.
+    """
+    self._build()
+    if min_lon > max_lon:
+      runs = np.concatenate([
+        self._runs_in(min_lat, min_lon, max_lat, 180.0),
+        self._runs_in(min_lat, -180.0, max_lat, max_lon),
+      ])
+    else:
+      runs = self._runs_in(min_lat, min_lon, max_lat, max_lon)
+    return self._hits(np.unique(runs))
+
+  def near(self, lat, lon, radius_m):
+    """Find the trackpoints within a distance of a point.
+
+    Args:
+      lat, lon (float): The point, in degrees.
+      radius_m (float): Distance from the point, in meters.
+
+    Returns:
+      list(Hit): Ranges of trackpoints in cells that come within
+      ``radius_m`` of the point, ordered as in :meth:`within`.
+    """
+    self._build()
+    dlat = np.degrees(radius_m / geo.EARTH_RADIUS_M)
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    if min_lat == -90.0 or max_lat == 90.0:
+      runs = self._runs_in(min_lat, -180.0, max_lat, 180.0)
+    else:
+      dlon = dlat / np.cos(np.radians(max(abs(min_lat), abs(max_lat))))
+      if dlon >= 180:
+        runs = self._runs_in(min_lat, -180.0, max_lat, 180.0)
+      else:
+        min_lon = (lon - dlon + 180) % 360 - 180
+        max_lon = (lon + dlon + 180) % 360 - 180
+        if min_lon > max_lon:
+          runs = np.concatenate([
+            self._runs_in(min_lat, min_lon, max_lat, 180.0),
+            self._runs_in(min_lat, -180.0, max_lat, max_lon),
+          ])
+        else:
+          runs = self._runs_in(min_lat, min_lon, max_lat, max_lon)
+
+    # Keep the runs whose cell's nearest point to (lat, lon) is in range.
+    rows, cols = np.divmod(self._cells[runs], self._num_cols)
+    cell_lat = rows * self.cell_deg - 90
+    cell_lon = cols * self.cell_deg - 180
+    nearest_lat = np.clip(lat, cell_lat, cell_lat + self.cell_deg)
+    offset_lon = (lon - cell_lon + 180) % 360 - 180
+    nearest_lon = cell_lon + np.clip(offset_lon, 0, self.cell_deg)
+    distance = geo.haversine(lat, lon, nearest_lat, nearest_lon)
+    return self._hits(np.unique(runs[distance <= radius_m]))
+
+  def save(self, file):
+    """Write the index to a NumPy ``.npz`` file.
+
+    Args:
+      file (str or file-like): Destination path or open binary file.
+    """
+    self._build()
+    np.savez_compressed(
+      file,
+      cell_deg=np.float64(self.cell_deg),
+      activities=np.array(self.activities, dtype=str),
+      cells=self._cells,
+      activity=self._activity,
+      starts=self._starts,
+      stops=self._stops,
+    )
+
+  @classmethod
+  def load(cls, file):
+    """Read an index written by :meth:`save`.
+
+    More activities can be added to the loaded index.
+
+    Args:
+      file (str or file-like): Source path or open binary file.
+
+    Returns:
+      GridIndex
+    """
+    with np.load(file, allow_pickle=False) as data:
+      index = cls(float(data['cell_deg']))
+      index.activities = data['activities'].tolist()
+      index._positions = {a: i for i, a in enumerate(index.activities)}
+      index._cells = data['cells']
+      index._activity = data['activity']
+      index._starts = data['starts']
+      index._stops = data['stops']
+    return index
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Split an activity into equal lengths of distance or time.
+
+Device laps follow button presses. Splits instead cut an activity every
+``distance_m`` meters (or ``time_s`` seconds), like a watch's auto-lap.
+Split boundaries are found with binary search on the cumulative distance
+(or time) column, and the time and distance at each boundary are
+interpolated between the trackpoints either side of it. Per-split
+aggregates are then computed for all splits at once.
+
+Elapsed time includes any pauses within a split.
+"""
+import numpy as np
+
+from . import geo, util
+
+
+KM_M = 1000.0
+"""Meters in a kilometer."""
+
+MILE_M = 1609.344
+"""Meters in a mile."""
+
+
+def _cumulative_distance(columns):
+  """Cumulative distance at each trackpoint, NaN where unknown."""
+  n = len(columns['time'])
+  if 'distance_m' in columns and not np.isnan(columns['distance_m']).all():
+    distance = np.array(columns['distance_m'], dtype=np.float64)
+  elif 'lat' in columns and 'lon' in columns:
+    distance = geo.derived_columns(columns)['distance_m']
+  else:
+    return np.full(n, np.nan)
+  # Distance never goes down. Trackpoints without one are left out, so
+  # boundaries are interpolated between the trackpoints that have one.
+  missing = np.isnan(distance)
+  distance = np.fmax.accumulate(distance)
+  distance[missing] = np.nan
+  return distance
+
+
+def _crossings(x, edges):
+  """Where each edge falls between trackpoints, for interpolation.
+
+  Returns:
+    tuple(numpy.ndarray, numpy.ndarray): For each edge, the offset of the
+    first trackpoint with ``x >= edge``, and the fraction of the way from
+    the trackpoint before it.
+  """
+  after = np.clip(np.searchsorted(x, edges, side='left'), 1, len(x) - 1)
+  before = after - 1
+  with np.errstate(divide='ignore', invalid='ignore'):
+    frac = (edges - x[before]) / (x[after] - x[before])
+  frac = np.clip(np.nan_to_num(frac, nan=1.0, posinf=1.0, neginf=0.0), 0, 1)
+  return after, frac
+
+
+def _at(values, crossings):
+  """Interpolate values at split edges found by :func:`_crossings`."""
+  after, frac = crossings
+  before = after - 1
+  return values[before] + frac * (values[after] - values[before])
+
+
+def _max(values, split_ids, num_splits):
+  """Largest of each split's non-NaN values."""
+  present = ~np.isnan(values)
+  result = np.full(num_splits, -np.inf)
+  np.maximum.at(result, split_ids[present], values[present])
+  result[np.isinf(result)] = np.nan
+  return result
+
+
+def splits(columns, distance_m=None, time_s=None):
+  """Split trackpoint columns every so many meters or seconds.
+
+  The last split is whatever remains, and may be shorter.
+
+  Args:
+    columns (dict): Trackpoint columns, as returned by
+      :meth:`~activereader.base.ActivityElement.columns`. Must include
+      ``time``. Distance comes from ``distance_m``, or failing that from
+      positions (``lat``, ``lon``); ``hr`` and ``altitude_m`` are used
+      if present.
+    distance_m (float): Split length in meters, eg. :data:`KM_M` or
+      :data:`MILE_M`.
+    time_s (float): Split length in seconds. Give either this or
+      ``distance_m``.
+
+  Returns:
+    dict: One entry per split:
+
+    - ``start_time``: time the split starts (``datetime64[ns]``).
+    - ``time_s``: elapsed time, in seconds.
+    - ``distance_m``: distance covered, in meters.
+    - ``speed_ms``: average speed, in meters per second.
+    - ``pace_s_per_km``: average pace, in seconds per kilometer.
+    - ``hr_avg``, ``hr_max``: heart rate of the split's trackpoints.
+    - ``elevation_gain_m``, ``elevation_loss_m``: total climb and descent
+      between trackpoints. A step across a split edge counts towards the
+      later split.
+
+    Values that can't be worked out are NaN.
+
+  Raises:
+    ValueError: Unless exactly one of ``distance_m`` and ``time_s`` is
+      given as a positive number.
+
+  Examples:
+
+    >>> table = splits(tcx_obj.columns(), distance_m=KM_M)
+    >>> table['time_s'][:3].round(1)
+    array([359.8, 359.9, 359.6])
+
+  """
+  if (distance_m is None) == (time_s is None):
+    raise ValueError('Give exactly one of distance_m and time_s')
+  length = distance_m if time_s is None else time_s
+  if not length > 0:
+    raise ValueError(f'Split length must be positive, not {length}')
+
+  seconds = util.to_seconds(columns['time'])
+  distance = _cumulative_distance(columns)
+  by_distance = time_s is None
+  x = distance if by_distance else seconds
+
+  valid = ~np.isnan(seconds) & ~np.isnan(x)
+  if valid.sum() < 2:
+    empty = np.empty(0)
+    table = {name: empty for name in (
+      'time_s', 'distance_m', 'speed_ms', 'pace_s_per_km', 'hr_avg',
+      'hr_max', 'elevation_gain_m', 'elevation_loss_m'
+    )}
+    table['start_time'] = np.empty(0, dtype='datetime64[ns]')
+    return table
+
+  seconds, distance, x = seconds[valid], distance[valid], x[valid]
+  if not by_distance:
+    x = np.maximum.accumulate(x)
+  num_splits = max(1, int(np.ceil((x[-1] - x[0]) / length)))
+  edges = x[0] + length * np.arange(num_splits + 1, dtype=np.float64)
+  edges[-1] = x[-1]
+
+  crossings = _crossings(x, edges)
+  edge_seconds = _at(seconds, crossings)
+  edge_distance = _at(distance, crossings)
+  edge_seconds[0], edge_distance[0] = seconds[0], distance[0]
+
+  time_split = np.diff(edge_seconds)
+  distance_split = np.diff(edge_distance)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    speed = distance_split / time_split
+    pace = KM_M * time_split / distance_split
+  speed[~np.isfinite(speed)] = np.nan
+  pace[~np.isfinite(pace)] = np.nan
+
+  # Each trackpoint belongs to the split its x falls in; one exactly on an
+  # edge ends the earlier split.
+  split_ids = np.clip(
+    np.searchsorted(edges[1:-1], x, side='left'), 0, num_splits - 1
+  )
+
+  def point_values(name):
+    if name not in columns:
+      return np.full(len(x), np.nan)
+    return np.ma.filled(
+      np.ma.asarray(columns[name]).astype(np.float64), np.nan
+    )[valid]
+
+  hr = point_values('hr')
+  altitude = point_values('altitude_m')
+  has_altitude = np.flatnonzero(~np.isnan(altitude))
+  climbs = np.full(len(x), np.nan)
+  climbs[has_altitude[1:]] = np.diff(altitude[has_altitude])
+  gain = np.bincount(split_ids, np.fmax(climbs, 0), num_splits)
+  loss = np.bincount(split_ids, -np.fmin(climbs, 0), num_splits)
+  if not len(has_altitude):
+    gain[:] = loss[:] = np.nan
+
+  start_ns = np.round(edge_seconds[:-1] * 1e9).astype(np.int64)
+  return {
+    'start_time': start_ns.view('datetime64[ns]'),
+    'time_s': time_split,
+    'distance_m': distance_split,
+    'speed_ms': speed,
+    'pace_s_per_km': pace,
+    'hr_avg': util.group_means(hr, split_ids, num_splits),
+    'hr_max': _max(hr, split_ids, num_splits),
+    'elevation_gain_m': gain,
+    'elevation_loss_m': loss,
+  }
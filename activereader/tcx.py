@@ -16,6 +16,7 @@ import datetime
 
 from .base import (
   ActivityElement,
+  TrackpointsMixin,
   XmlReader,
   add_xml_data, add_xml_attr, add_xml_descendents,
   # add_data_props, add_attr_props, add_descendent_props,
@@ -29,6 +30,7 @@ class Trackpoint(ActivityElement):
   The most granular of data contained in the file.
   """
   TAG = 'Trackpoint'
+  CONTAINERS = {'bout': 'Track', 'lap': 'Lap'}
 
   time = create_data_prop('Time', datetime.datetime)
   """datetime.datetime: Timestamp when trackpoint was recorded.
@@ -76,7 +78,7 @@ class Trackpoint(ActivityElement):
   """
 
 
-class Track(ActivityElement):
+class Track(TrackpointsMixin, ActivityElement):
   """In a running TCX file, there is typically one Track per Lap.
 
   As far as I can tell, in a running file, Tracks and Laps are one
@@ -93,7 +95,7 @@ class Track(ActivityElement):
   intensity=('Intensity', str),
   trigger_method=('TriggerMethod', str),
 )
-class Lap(ActivityElement):
+class Lap(TrackpointsMixin, ActivityElement):
   """Represents one bout from {start/lap} -> {lap/stop}.
 
   There is at least one lap per activity file, created by the `start` button
@@ -167,7 +169,7 @@ class Lap(ActivityElement):
 
 
 @add_xml_data(product_id=('Creator/ProductID', int))
-class Activity(ActivityElement):
+class Activity(TrackpointsMixin, ActivityElement):
   """TCX files representing a run should only contain one Activity.
 
   Contains one or more :class:`Lap` elements.
@@ -211,17 +213,85 @@ class Activity(ActivityElement):
   trackpoints = create_descendent_prop(Trackpoint)
 
 
+@add_xml_data(
+  intensity=('Intensity', str),
+  begin_lat=('BeginPosition/LatitudeDegrees', float),
+  begin_lon=('BeginPosition/LongitudeDegrees', float),
+  end_lat=('EndPosition/LatitudeDegrees', float),
+  end_lon=('EndPosition/LongitudeDegrees', float),
+)
+class CourseLap(ActivityElement):
+  """Summary of one lap of a :class:`Course`.
+
+  Unlike an activity :class:`Lap`, a course lap holds no tracks: the
+  course's trackpoints follow its laps.
+  """
+  TAG = 'Lap'
+
+  total_time_s = create_data_prop('TotalTimeSeconds', float)
+  """float: Time planned for the lap, in seconds."""
+
+  distance_m = create_data_prop('DistanceMeters', float)
+  """float: Length of the lap, in meters."""
+
+
+@add_xml_data(
+  name=('Name', str),
+  point_type=('PointType', str),
+  notes=('Notes', str),
+)
+class CoursePoint(ActivityElement):
+  """A point of interest along a :class:`Course`, such as a turn or summit.
+
+  ``point_type`` is one of the course point types in Garmin's TCX schema,
+  eg. "Generic", "Summit", "Water" or "Left".
+  """
+  TAG = 'CoursePoint'
+
+  time = create_data_prop('Time', datetime.datetime)
+  """datetime.datetime: Time the course reaches the point.
+
+  See also:
+    :ref:`data.timestamp`
+  """
+
+  lat = create_data_prop('Position/LatitudeDegrees', float)
+  """float: Latitude in degrees N (-90 to 90)."""
+
+  lon = create_data_prop('Position/LongitudeDegrees', float)
+  """float: Longitude in degrees E (-180 to 180)."""
+
+  altitude_m = create_data_prop('AltitudeMeters', float)
+  """float: Elevation of ground surface in meters above sea level."""
+
+
+@add_xml_data(name=('Name', str))
+class Course(TrackpointsMixin, ActivityElement):
+  """A planned route, made to be followed on the device.
+
+  Its trackpoints are read in bulk like an activity's, eg. with
+  :meth:`~activereader.base.ActivityElement.columns`. See
+  :mod:`activereader.course` to match an activity against one.
+  """
+  TAG = 'Course'
+
+  laps = create_descendent_prop(CourseLap)
+  tracks = create_descendent_prop(Track)
+  trackpoints = create_descendent_prop(Trackpoint)
+  course_points = create_descendent_prop(CoursePoint)
+
+
 @add_xml_data(
   creator=('Author/Name', str),
   part_number=('Author/PartNumber', str)
 )
-class Tcx(ActivityElement):
+class Tcx(TrackpointsMixin, ActivityElement):
   """Represents an entire .tcx file object."""
 
   TAG = 'TrainingCenterDatabase'
 
   @classmethod
-  def from_file(cls, file_obj):
+  def from_file(cls, file_obj, keep_tree=True, simplify=None, validate=False):
     """Initialize a Tcx element from a file-like object.
 
     Args:
@@ -229,11 +299,24 @@ class Tcx(ActivityElement):
         If str, either filename or a string representation of XML 
         object. If str or StringIO, the encoding should not be declared
         within the string.
+      keep_tree (bool): If False, the data is moved into arrays and the
+        XML tree is released right away. See :meth:`~activereader.base.ActivityElement.compact`.
+        Defaults to True.
+      simplify (callable): Drops trackpoints while the file is read, so only
+        the kept ones are held in the tree. Takes trackpoint columns and
+        returns a boolean mask of the trackpoints to keep; see
+        :mod:`activereader.simplify`. Defaults to keeping every trackpoint.
+      validate (bool): Check the file against the TCX schema while it is
+        read. See :mod:`activereader.validation`. Defaults to False.
 
     Returns:
       Tcx: An instance initialized with the :class:`~lxml.etree._Element`
       that was read in.
 
+    Raises:
+      activereader.validation.ValidationError: If ``validate`` is True and
+        the file does not match the schema.
+
     See also:
       https://lxml.de/tutorial.html#the-parse-function
 
@@ -249,7 +332,12 @@ class Tcx(ActivityElement):
         
     """
     xml_reader = XmlReader(file_obj, ext='tcx')
-    xml_obj = xml_reader.read()
+    xml_obj = xml_reader.read(
+      simplify=simplify, point_class=Trackpoint, validate=validate
+    )
+
+    if not keep_tree:
+      return cls(xml_obj).compact()
 
     return cls(xml_obj)
 
@@ -288,4 +376,4 @@ class Tcx(ActivityElement):
   laps = create_descendent_prop(Lap)
   tracks = create_descendent_prop(Track)
   trackpoints = create_descendent_prop(Trackpoint)
-  # course_laps = create_descendent_prop(CourseLap)
+  courses = create_descendent_prop(Course)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""Look up trackpoints by timestamp with binary search.
+
+A :class:`TimeIndex` is built once from an activity's time column, after
+which each query is a :func:`numpy.searchsorted` call rather than a scan
+over every trackpoint.
+"""
+import datetime
+
+import numpy as np
+
+
+def _to_ns(t):
+  """Convert timestamps to integer nanoseconds since the epoch, in UTC.
+
+  Accepts datetimes (naive ones are taken to be UTC), ISO 8601 strings,
+  numpy datetime64 values, or arrays/lists of any of these.
+  """
+  if isinstance(t, np.ndarray) and t.dtype.kind == 'M':
+    return t.astype('datetime64[ns]').view(np.int64)
+  if isinstance(t, (list, tuple, np.ndarray)):
+    return np.array([_to_ns(item) for item in t], dtype=np.int64)
+  if isinstance(t, str):
+    from dateutil import parser
+
+    t = parser.isoparse(t)
+  if isinstance(t, datetime.datetime) and t.tzinfo is not None:
+    t = t.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+  return np.datetime64(t, 'ns').astype(np.int64)
+
+
+class TimeIndex(object):
+  """Sorted index over a column of trackpoint times.
+
+  If the times are in order (the usual case), queries for a time range
+  return a :class:`slice`, so selecting data with it makes views rather
+  than copies. Otherwise the index falls back to a sorted copy of the times,
+  and range queries return arrays of offsets, in trackpoint order.
+  Trackpoints without a time are never returned.
+
+  Args:
+    columns (dict): Trackpoint columns, as returned by
+      :meth:`~activereader.base.ActivityElement.columns`. Must include
+      ``time``.
+
+  Examples:
+
+    >>> index = TimeIndex(tcx_obj.columns())
+    >>> index.window('2021-04-16T13:38:00Z', '2021-04-16T13:38:30Z')['hr']
+    masked_array(data=[80, 83, 86, ...], ...)
+
+  """
+  def __init__(self, columns):
+    self.columns = columns
+    times = columns['time'].astype('datetime64[ns]')
+    valid = ~np.isnat(times)
+    ns = times.view(np.int64)
+
+    self.is_monotonic = bool(valid.all() and np.all(ns[1:] >= ns[:-1]))
+    if self.is_monotonic:
+      self._offsets = None
+      self._sorted = ns
+    else:
+      offsets = np.flatnonzero(valid)
+      self._offsets = offsets[np.argsort(ns[offsets], kind='stable')]
+      self._sorted = ns[self._offsets]
+
+  def __len__(self):
+    return len(self._sorted)
+
+  def _to_offsets(self, positions):
+    """Turn positions in the sorted times into trackpoint offsets."""
+    if self._offsets is None:
+      return positions
+    return self._offsets[positions]
+
+  def between(self, t0, t1, inclusive=True):
+    """Find the trackpoints recorded between two times.
+
+    Args:
+      t0, t1: Start and end times, as datetimes, ISO 8601 strings or
+        :class:`numpy.datetime64`. Either may be None for no limit.
+      inclusive (bool): Whether to include trackpoints at exactly ``t1``.
+        Trackpoints at ``t0`` are always included.
+
+    Returns:
+      slice or numpy.ndarray: Indexer into the trackpoint columns (or the
+      element's list of trackpoints): a slice if the index is monotonic,
+      otherwise an array of offsets in trackpoint order.
+    """
+    start = 0 if t0 is None else np.searchsorted(self._sorted, _to_ns(t0), side='left')
+    if t1 is None:
+      stop = len(self._sorted)
+    else:
+      side = 'right' if inclusive else 'left'
+      stop = np.searchsorted(self._sorted, _to_ns(t1), side=side)
+    stop = max(start, stop)
+
+    if self._offsets is None:
+      return slice(int(start), int(stop))
+    return np.sort(self._offsets[start:stop])
+
+  def asof(self, t):
+    """Find the last trackpoint recorded at or before each time.
+
+    Args:
+      t: A time, or an array of times, in any form :meth:`between` accepts.
+
+    Returns:
+      int or numpy.ndarray: Trackpoint offsets, -1 where no trackpoint was
+      recorded at or before the time.
+    """
+    positions = np.searchsorted(self._sorted, _to_ns(t), side='right') - 1
+    offsets = np.where(
+      positions >= 0,
+      self._to_offsets(np.maximum(positions, 0)),
+      -1
+    ) if len(self._sorted) else np.full(np.shape(positions), -1)
+    return offsets if np.ndim(offsets) else int(offsets)
+
+  def nearest(self, t):
+    """Find the trackpoint recorded nearest to each time.
+
+    Ties go to the earlier trackpoint.
+
+    Args:
+      t: A time, or an array of times, in any form :meth:`between` accepts.
+
+    Returns:
+      int or numpy.ndarray: Trackpoint offsets, -1 if the index is empty.
+    """
+    ns = _to_ns(t)
+    if not len(self._sorted):
+      offsets = np.full(np.shape(ns), -1)
+      return offsets if np.ndim(offsets) else -1
+
+    right = np.clip(np.searchsorted(self._sorted, ns), 0, len(self._sorted) - 1)
+    left = np.maximum(right - 1, 0)
+    use_right = np.abs(self._sorted[right] - ns) < np.abs(ns - self._sorted[left])
+    offsets = self._to_offsets(np.where(use_right, right, left))
+    return offsets if np.ndim(offsets) else int(offsets)
+
+  def window(self, t0, t1, inclusive=True):
+    """Select the columns' data recorded between two times.
+
+    Returns:
+      dict: The same columns, limited to the trackpoints found by
+      :meth:`between`. These are views when the index is monotonic.
+    """
+    indexer = self.between(t0, t1, inclusive=inclusive)
+    return {name: values[indexer] for name, values in self.columns.items()}
@@ -1,11 +1,45 @@
 import datetime
+import functools
+import importlib
+import re
 
-from dateutil import parser
-from lxml import objectify
+import numpy as np
+from lxml import etree
+
+
+# Attributes left by type annotation: xsi:type, and lxml.objectify's py:pytype.
+_ANNOTATION_ATTRIBUTES = (
+  '{http://www.w3.org/2001/XMLSchema-instance}type',
+  '{http://codespeak.net/lxml/objectify/pytype}pytype',
+)
+
+
+def import_optional_dependency(name, extra=''):
+  """Import an optional dependency, or explain how to get it.
+
+  Inspired by (taken from) pandas' ``compat._optional`` module.
+
+  Args:
+    name (str): The module name.
+    extra (str): Additional text to include in the ImportError message.
+  Returns:
+    module: The imported module.
+  Raises:
+    ImportError: if the module is not installed.
+  """
+  try:
+    return importlib.import_module(name)
+  except ImportError:
+    raise ImportError(
+      f'Missing optional dependency "{name}". {extra} '
+      f'Use pip or conda to install {name}.'
+    ) from None
 
 
 def get_conv_func(conv_type):
   if conv_type == datetime.datetime:
+    from dateutil import parser
+
     return parser.isoparse
   
   # Assume this is a Python type
@@ -14,12 +48,196 @@ def get_conv_func(conv_type):
 
 def get_time(time_text):
   """Returns a tz-aware datetime."""
+  from dateutil import parser
+
   try:
     return parser.isoparse(time_text)
   except TypeError:
     return None
 
 
+def _text_array(texts):
+  """Make a numpy string array, and a mask of its missing (None or '') values."""
+  values = np.array(['' if text is None else text for text in texts], dtype=str)
+  return values, values == ''
+
+
+def to_float_array(texts):
+  """Convert text values to floats in a single numpy call.
+
+  Args:
+    texts (list of str): Text values. None or '' for missing values.
+  Returns:
+    numpy.ndarray: ``float64`` array, with NaN for missing values.
+  """
+  values, missing = _text_array(texts)
+  result = np.full(len(values), np.nan)
+  result[~missing] = values[~missing].astype(np.float64)
+  return result
+
+
+def to_int_array(texts):
+  """Convert text values to integers in a single numpy call.
+
+  Args:
+    texts (list of str): Text values. None or '' for missing values.
+  Returns:
+    numpy.ma.MaskedArray: ``int64`` array whose mask marks missing values.
+    The mask is always a full boolean array, so ``~result.mask`` is the
+    validity mask.
+  """
+  values, missing = _text_array(texts)
+  result = np.zeros(len(values), dtype=np.int64)
+  result[~missing] = values[~missing].astype(np.int64)
+  return np.ma.MaskedArray(result, mask=missing)
+
+
+def to_array(texts, conv_type):
+  """Convert a whole column of text values to an array of conv_type.
+
+  This is the batch counterpart of :func:`get_conv_func`.
+
+  Args:
+    texts (list of str): Text values. None for missing values.
+    conv_type (data type): Python type, or datetime.datetime to read
+      timestamps.
+  Returns:
+    numpy.ndarray: ``float`` and ``int`` text is converted by 
+    :func:`to_float_array` and :func:`to_int_array`, and timestamps by 
+    :func:`to_datetime64`. Other types are converted value by value into an 
+    object array, with None for missing values.
+  """
+  if conv_type == float:
+    return to_float_array(texts)
+
+  if conv_type == int:
+    return to_int_array(texts)
+
+  if conv_type == datetime.datetime:
+    return to_datetime64(texts)
+
+  conv_func = get_conv_func(conv_type)
+  result = np.empty(len(texts), dtype=object)
+  result[:] = [None if text is None else conv_func(text) for text in texts]
+  return result
+
+
+def to_texts(values):
+  """Convert a column back to text values, the inverse of :func:`to_array`.
+
+  Args:
+    values (numpy.ndarray): A column as returned by :func:`to_array`.
+  Returns:
+    list of str: Text values, with None for missing values. Floats are
+    written in their shortest round-tripping form, and times in UTC with
+    millisecond precision (eg. ``'2021-04-16T13:37:53.000Z'``).
+  """
+  if isinstance(values, np.ma.MaskedArray):
+    missing = np.ma.getmaskarray(values)
+    values = values.data
+  elif values.dtype.kind == 'f':
+    missing = np.isnan(values)
+  elif values.dtype.kind == 'M':
+    missing = np.isnat(values)
+  else:
+    missing = np.array([value is None for value in values], dtype=bool)
+
+  if values.dtype.kind == 'M':
+    texts = np.char.add(np.datetime_as_string(values, unit='ms'), 'Z')
+  elif values.dtype.kind == 'O':
+    texts = np.array([str(value) for value in values], dtype=object)
+  else:
+    texts = values.astype(str)
+
+  texts = texts.astype(object)
+  texts[missing] = None
+  return texts.tolist()
+
+
+_UTC_OFFSET = re.compile(r'[+-]\d\d:?\d\d$')
+
+
+def to_datetime64(time_texts):
+  """Convert timestamp strings to an array of naive UTC datetimes.
+
+  Timestamps in UTC (ending in "Z") or without any timezone are converted
+  by numpy in one go. The rare timestamp with a UTC offset is read with
+  :meth:`dateutil.parser.isoparse` and shifted to UTC first.
+
+  Args:
+    time_texts (list of str): ISO 8601 timestamps. None for missing values.
+  Returns:
+    numpy.ndarray: ``datetime64[ns]`` array, with NaT for missing values.
+  """
+  texts = [
+    '' if text is None else text.rstrip('Z')
+    for text in time_texts
+  ]
+  for i, text in enumerate(texts):
+    if _UTC_OFFSET.search(text[10:]):
+      from dateutil import parser
+
+      dt = parser.isoparse(text).astimezone(datetime.timezone.utc)
+      texts[i] = dt.replace(tzinfo=None).isoformat()
+  return np.array(texts, dtype='datetime64[ns]')
+
+
+def to_seconds(times):
+  """Convert datetimes to seconds since the epoch.
+
+  Args:
+    times (numpy.ndarray): ``datetime64`` array, as read into a ``time``
+      column.
+  Returns:
+    numpy.ndarray: float64 seconds, NaN where the time is missing.
+  """
+  seconds = times.astype('datetime64[ns]').view(np.int64) / 1e9
+  seconds[np.isnat(times)] = np.nan
+  return seconds
+
+
+def group_means(values, group_ids, num_groups):
+  """Mean of each group's non-NaN values.
+
+  Args:
+    values (numpy.ndarray): float64 values.
+    group_ids (numpy.ndarray): The group of each value, from 0 up to
+      ``num_groups - 1``.
+    num_groups (int): Number of groups.
+  Returns:
+    numpy.ndarray: One mean per group, NaN for groups without values.
+  """
+  present = ~np.isnan(values)
+  sums = np.bincount(group_ids[present], values[present], num_groups)
+  counts = np.bincount(group_ids[present], minlength=num_groups)
+  with np.errstate(invalid='ignore'):
+    return sums / np.where(counts, counts, np.nan)
+
+
+def field_text(elem, prop):
+  """Read a declared field's text from an element that still has namespaces.
+
+  Used while a file is being parsed, before :func:`strip_namespaces` has
+  run. Every tag in the field's path matches in any namespace.
+
+  Args:
+    elem (lxml.etree._Element): The element the property would wrap.
+    prop (property): A :class:`~activereader.base.DataProperty` or
+      :class:`~activereader.base.AttrProperty`.
+  Returns:
+    str: The text, or None if the element does not have it.
+  """
+  key = getattr(prop, 'key', None)
+  if key is not None:
+    return elem.get(key)
+  return elem.findtext(_any_namespace_path(prop.path))
+
+
+@functools.lru_cache(maxsize=None)
+def _any_namespace_path(path):
+  return '/'.join(f'{{*}}{tag}' for tag in path.split('/'))
+
+
 def strip_namespaces(element):
   """Strip namespaces from an elements to permit easier operations.
 
@@ -41,5 +259,8 @@ def strip_namespaces(element):
     if i >= 0:
       elem.tag = elem.tag[i+1:]
 
-  # Get rid of all the `'ns5': 'http://...'` and `xsi:type` business
-  objectify.deannotate(element, cleanup_namespaces=True)
\ No newline at end of file
+  # Get rid of all the `'ns5': 'http://...'` and `xsi:type` business.
+  # Same as `lxml.objectify.deannotate(element, cleanup_namespaces=True)`,
+  # without importing objectify.
+  etree.strip_attributes(element, *_ANNOTATION_ATTRIBUTES)
+  etree.cleanup_namespaces(element)
\ No newline at end of file
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Check TCX and GPX files against their XML schemas.
+
+Schemas ship with activereader, so validating needs no network access.
+Each schema is compiled the first time it is needed and kept for the rest
+of the process.
+
+The bundled schemas are partial. They were written after the published TCX,
+ActivityExtension and GPX schemas rather than copied from them, and they
+check only the parts of a file activereader reads. See :func:`get_schema`
+for what they do not check.
+
+Validation happens while a file is parsed: the parser checks each element
+as it builds it, so ``Tcx.from_file(path, validate=True)`` still reads the
+file only once. A file that breaks its schema raises :class:`ValidationError`,
+which lists where and how.
+
+Examples:
+
+  >>> try:
+  ...   Tcx.from_file('upload.tcx', validate=True)
+  ... except ValidationError as e:
+  ...   print(e)
+  upload.tcx does not match the tcx schema (1 error):
+    line 12: Element '{...}Intensity': [facet 'enumeration'] The value 'Easy' ...
+
+"""
+import functools
+import os
+import threading
+
+from lxml import etree
+
+
+SCHEMA_DIR = os.path.join(os.path.dirname(__file__), 'schemas')
+"""Directory of the bundled schema files."""
+
+SCHEMA_FILES = {
+  'tcx': 'TrainingCenterDatabasev2.xsd',
+  'gpx': 'gpx.xsd',
+}
+"""Maps a format to its schema file in :data:`SCHEMA_DIR`."""
+
+MAX_LISTED_ERRORS = 10
+"""Most errors listed in a :class:`ValidationError` message."""
+
+# A schema keeps the errors of its last check, so threads sharing the
+# cached schemas take turns when checking a whole tree.
+_validate_lock = threading.Lock()
+
+
+class ValidationError(ValueError):
+  """A file does not match its format's schema.
+
+  Attributes:
+    errors (list of tuple): ``(line, message)`` for each problem found.
+  """
+  def __init__(self, errors, ext, source=None):
+    self.errors = list(errors)
+    self.ext = ext
+    self.source = source
+    super().__init__(self._summary())
+
+  def _summary(self):
+    name = self.source or 'File'
+    num = len(self.errors)
+    lines = [
+      f'{name} does not match the {self.ext} schema '
+      f'({num} error{"" if num == 1 else "s"}):'
+    ]
+    lines += [
+      f'  line {line}: {message}'
+      for line, message in self.errors[:MAX_LISTED_ERRORS]
+    ]
+    if num > MAX_LISTED_ERRORS:
+      lines.append(f'  ...and {num - MAX_LISTED_ERRORS} more')
+    return '\n'.join(lines)
+
+  @classmethod
+  def from_error_log(cls, error_log, ext, source=None):
+    """Collect the errors from an lxml parser or schema error log."""
+    return cls(
+      [(entry.line, entry.message) for entry in error_log
+       if entry.level >= etree.ErrorLevels.ERROR],
+      ext,
+      source=source,
+    )
+
+
+def get_schema(ext):
+  """The compiled schema for a format, compiled on first use.
+
+  The schemas are partial, written after the published ones rather than
+  copied from them, and may differ from them in detail. They do not check:
+
+  - TCX ``Folders``, ``Workouts``, ``MultiSportSession`` and ``Training``,
+    which accept any content.
+  - The content of TCX ``Extensions`` and GPX ``extensions`` elements,
+    which accept any element from another namespace. This includes
+    Garmin's GPX TrackPointExtension.
+
+  Args:
+    ext (str): The format, eg. ``'tcx'`` or ``'gpx'``.
+
+  Returns:
+    lxml.etree.XMLSchema
+
+  Raises:
+    ValueError: If there is no bundled schema for the format.
+  """
+  if ext.lower() not in SCHEMA_FILES:
+    raise ValueError(
+      f'No schema for "{ext}"; choose from {sorted(SCHEMA_FILES)}'
+    )
+  return _compile(SCHEMA_FILES[ext.lower()])
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(filename):
+  # The TCX schema imports its extension schema from the same directory.
+  return etree.XMLSchema(etree.parse(os.path.join(SCHEMA_DIR, filename)))
+
+
+def validate(element, ext):
+  """Check an already-parsed tree against a format's schema.
+
+  Reading with ``validate=True`` is cheaper, since it checks the file
+  while parsing it. Trees whose namespaces were stripped by the readers
+  will not match.
+
+  Args:
+    element (lxml.etree._Element or lxml.etree._ElementTree): The tree.
+    ext (str): The format, eg. ``'tcx'`` or ``'gpx'``.
+
+  Raises:
+    ValidationError: If the tree does not match the schema.
+  """
+  schema = get_schema(ext)
+  with _validate_lock:
+    if schema.validate(element):
+      return
+    error_log = schema.error_log
+  raise ValidationError.from_error_log(error_log, ext)
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+"""Write TCX and GPX files from trackpoint columns.
+
+The writers take columns like the ones returned by
+:meth:`ActivityElement.columns<activereader.base.ActivityElement.columns>`,
+and lay each trackpoint out the way the reader's ``Trackpoint`` class
+declares its fields, so a written file reads back into the same columns.
+Output goes through :class:`lxml.etree.xmlfile`, one trackpoint at a time,
+so no tree is built for the file being written. The destination can be a
+path or any binary file object, like one from :func:`gzip.open`.
+
+Examples:
+
+  >>> columns = Tcx.from_file('activity.tcx').columns()
+  >>> with gzip.open('activity.gpx.gz', 'wb') as f:
+  ...   write_gpx(f, columns, name='Morning run')
+
+See also:
+
+  :mod:`activereader.converter`
+    Converts files without reading them into columns first.
+"""
+import numpy as np
+from lxml import etree
+
+from . import geo, gpx, tcx, util
+
+
+GPX_NS = 'http://www.topografix.com/GPX/1/1'
+GPX_TPX_NS = 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'
+TCX_NS = 'http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2'
+TCX_TPX_NS = 'http://www.garmin.com/xmlschemas/ActivityExtension/v2'
+XSI_NS = 'http://www.w3.org/2001/XMLSchema-instance'
+
+TCX_SPORTS = ('Running', 'Biking', 'Other')
+"""Values allowed for a TCX activity's sport."""
+
+
+def _qname(ns, tag):
+  return f'{{{ns}}}{tag}'
+
+
+class _TrackpointLayout(object):
+  """How to write trackpoints of one format from a set of columns.
+
+  Args:
+    point_class (type): The reader's trackpoint class, whose field
+      declarations give each column's attribute or subelement path.
+    ns (str): Namespace of the trackpoint elements.
+    extension_namespaces (dict): Maps extension element tags to the
+      namespace used for them and everything inside them.
+    child_order (list of str): The order the schema requires for a
+      trackpoint's subelements.
+    names (list of str): The column names available.
+  """
+  def __init__(self, point_class, ns, extension_namespaces, child_order, names):
+    self.tag = _qname(ns, point_class.TAG)
+    fields = {
+      name: prop for name, prop in point_class._fields().items()
+      if name in names
+    }
+    self.names = list(fields)
+    self.attrs = [
+      (prop.key, i) for i, prop in enumerate(fields.values())
+      if not hasattr(prop, 'path')
+    ]
+
+    # A tree of (qualified tag, children or column position) nodes.
+    self.children = []
+    for i, prop in enumerate(fields.values()):
+      if not hasattr(prop, 'path'):
+        continue
+      nodes, node_ns = self.children, ns
+      tags = prop.path.split('/')
+      for depth, tag in enumerate(tags):
+        node_ns = extension_namespaces.get(tag, node_ns)
+        qname = _qname(node_ns, tag)
+        if depth == len(tags) - 1:
+          nodes.append((qname, i))
+          break
+        for node in nodes:
+          if node[0] == qname and isinstance(node[1], list):
+            nodes = node[1]
+            break
+        else:
+          nodes.append((qname, []))
+          nodes = nodes[-1][1]
+
+    order = {_qname(ns, tag): n for n, tag in enumerate(child_order)}
+    self.children.sort(key=lambda node: order.get(node[0], len(order)))
+    self._positions = {}
+    for node in self.children:
+      self._collect_positions(node)
+
+  def _collect_positions(self, node):
+    qname, content = node
+    if isinstance(content, list):
+      positions = set()
+      for child in content:
+        positions |= self._collect_positions(child)
+    else:
+      positions = {content}
+    self._positions[id(node)] = positions
+    return positions
+
+  def rows(self, columns):
+    """Each trackpoint's text values, in the order of :attr:`names`."""
+    return zip(*(util.to_texts(columns[name]) for name in self.names))
+
+  def write(self, xf, row):
+    """Write one trackpoint."""
+    attrib = {key: row[i] for key, i in self.attrs if row[i] is not None}
+    with xf.element(self.tag, attrib):
+      for node in self.children:
+        self._write_node(xf, node, row)
+
+  def _write_node(self, xf, node, row):
+    qname, content = node
+    if isinstance(content, list):
+      if all(row[i] is None for i in self._positions[id(node)]):
+        return
+      with xf.element(qname):
+        for child in content:
+          self._write_node(xf, child, row)
+    elif row[content] is not None:
+      with xf.element(qname):
+        xf.write(row[content])
+
+
+def _split(columns, name):
+  """Split columns into runs of trackpoints with the same value of a column."""
+  n = len(next(iter(columns.values()))) if columns else 0
+  if name not in columns or not n:
+    return [columns] if n else []
+  ids = np.asarray(columns[name])
+  bounds = np.concatenate([[0], np.flatnonzero(np.diff(ids)) + 1, [n]])
+  return [
+    {key: values[start:stop] for key, values in columns.items()}
+    for start, stop in zip(bounds[:-1], bounds[1:])
+  ]
+
+
+class _Writer(object):
+  """Shared context manager plumbing for the format writers."""
+  def __init__(self, file):
+    self.file = file
+    self._contexts = []
+
+  def _open(self, tag, attrib=None, nsmap=None):
+    context = self._xf.element(tag, attrib or {}, nsmap=nsmap)
+    context.__enter__()
+    self._contexts.append(context)
+
+  def _close(self):
+    self._contexts.pop().__exit__(None, None, None)
+
+  def _leaf(self, tag, text):
+    with self._xf.element(tag):
+      self._xf.write(text)
+
+  def __enter__(self):
+    self._xmlfile = etree.xmlfile(self.file, encoding='UTF-8')
+    self._xf = self._xmlfile.__enter__()
+    self._xf.write_declaration()
+    self._start()
+    return self
+
+  def __exit__(self, *exc_info):
+    if exc_info[0] is None:
+      while self._contexts:
+        self._close()
+    self._xmlfile.__exit__(*exc_info)
+
+
+class GpxWriter(_Writer):
+  """Write a GPX file with one track, a segment at a time.
+
+  Args:
+    file (str or file-like): Destination path or binary file object.
+    name (str): Name of the track (and the file).
+    activity_type (str): Type of the track, eg. ``'running'``.
+    creator (str): The program that made the file.
+
+  Examples:
+
+    >>> with GpxWriter('activity.gpx', name='Morning run') as writer:
+    ...   writer.write_columns(tcx_obj.columns())
+
+  """
+  def __init__(self, file, name=None, activity_type=None, creator='activereader'):
+    super().__init__(file)
+    self.name = name
+    self.activity_type = activity_type
+    self.creator = creator
+    self._layouts = {}
+
+  def _start(self):
+    nsmap = {None: GPX_NS, 'gpxtpx': GPX_TPX_NS, 'xsi': XSI_NS}
+    self._open(
+      _qname(GPX_NS, 'gpx'),
+      {
+        'creator': self.creator,
+        'version': '1.1',
+        _qname(XSI_NS, 'schemaLocation'): f'{GPX_NS} http://www.topografix.com/GPX/1/1/gpx.xsd',
+      },
+      nsmap=nsmap,
+    )
+    if self.name is not None:
+      with self._xf.element(_qname(GPX_NS, 'metadata')):
+        self._leaf(_qname(GPX_NS, 'name'), self.name)
+    self._open(_qname(GPX_NS, 'trk'))
+    if self.name is not None:
+      self._leaf(_qname(GPX_NS, 'name'), self.name)
+    if self.activity_type is not None:
+      self._leaf(_qname(GPX_NS, 'type'), self.activity_type)
+
+  def _layout(self, names):
+    names = tuple(names)
+    if names not in self._layouts:
+      self._layouts[names] = _TrackpointLayout(
+        gpx.Trackpoint, GPX_NS, {'TrackPointExtension': GPX_TPX_NS},
+        ['ele', 'time', 'extensions'], names
+      )
+    return self._layouts[names]
+
+  def start_segment(self):
+    """Open a ``trkseg`` for :meth:`write_trackpoints` to write into."""
+    self._open(_qname(GPX_NS, 'trkseg'))
+
+  def end_segment(self):
+    """Close the ``trkseg`` opened by :meth:`start_segment`."""
+    self._close()
+
+  def write_trackpoints(self, columns):
+    """Write trackpoint columns into the current segment.
+
+    The GPX schema requires a position for every trackpoint, so
+    trackpoints whose ``lat`` or ``lon`` is NaN (or columns without
+    them) are left out.
+
+    Args:
+      columns (dict): Trackpoint columns. Those named after a field of
+        :class:`activereader.gpx.Trackpoint` are written; others are
+        left out.
+    """
+    if 'lat' in columns and 'lon' in columns:
+      positioned = ~(
+        np.isnan(np.asarray(columns['lat'], dtype=np.float64))
+        | np.isnan(np.asarray(columns['lon'], dtype=np.float64))
+      )
+    else:
+      positioned = np.zeros(len(next(iter(columns.values()), [])), dtype=bool)
+    if not positioned.all():
+      columns = {name: values[positioned] for name, values in columns.items()}
+    layout = self._layout(columns)
+    for row in layout.rows(columns):
+      layout.write(self._xf, row)
+
+  def write_segment(self, columns):
+    """Write trackpoint columns as one ``trkseg``.
+
+    Args:
+      columns (dict): Trackpoint columns; see :meth:`write_trackpoints`.
+    """
+    self.start_segment()
+    self.write_trackpoints(columns)
+    self.end_segment()
+
+  def write_columns(self, columns):
+    """Write trackpoint columns, starting a segment at each new ``bout``."""
+    for segment in _split(columns, 'bout'):
+      self.write_segment(segment)
+
+
+class TcxWriter(_Writer):
+  """Write a TCX file with one activity, a lap at a time.
+
+  Each lap's totals come before its trackpoints in a TCX file, so the
+  writer holds one lap's columns at a time.
+
+  Args:
+    file (str or file-like): Destination path or binary file object.
+    sport (str): One of :data:`TCX_SPORTS`.
+  """
+  def __init__(self, file, sport='Other'):
+    if sport not in TCX_SPORTS:
+      raise ValueError(f'sport must be one of {TCX_SPORTS}, not "{sport}"')
+    super().__init__(file)
+    self.sport = sport
+    self._layouts = {}
+    self._has_id = False
+
+  def _start(self):
+    nsmap = {None: TCX_NS, 'ns3': TCX_TPX_NS, 'xsi': XSI_NS}
+    self._open(
+      _qname(TCX_NS, 'TrainingCenterDatabase'),
+      {
+        _qname(XSI_NS, 'schemaLocation'): f'{TCX_NS} http://www.garmin.com/xmlschemas/TrainingCenterDatabasev2.xsd',
+      },
+      nsmap=nsmap,
+    )
+    self._open(_qname(TCX_NS, 'Activities'))
+    self._open(_qname(TCX_NS, 'Activity'), {'Sport': self.sport})
+
+  def _layout(self, names):
+    names = tuple(names)
+    if names not in self._layouts:
+      self._layouts[names] = _TrackpointLayout(
+        tcx.Trackpoint, TCX_NS, {'TPX': TCX_TPX_NS},
+        [
+          'Time', 'Position', 'AltitudeMeters', 'DistanceMeters',
+          'HeartRateBpm', 'Cadence', 'SensorState', 'Extensions'
+        ],
+        names
+      )
+    return self._layouts[names]
+
+  def write_lap(self, columns, intensity='Active', trigger_method='Manual'):
+    """Write trackpoint columns as one ``Lap``, with a ``Track`` per bout.
+
+    The lap's total time and distance are worked out from the columns;
+    distance comes from ``distance_m`` if present, else from positions.
+    The TCX schema requires a time for every trackpoint, so trackpoints
+    whose ``time`` is NaT are left out.
+
+    Args:
+      columns (dict): Trackpoint columns. Must include ``time``. Those
+        named after a field of :class:`activereader.tcx.Trackpoint` are
+        written; others are left out.
+      intensity (str): ``'Active'`` or ``'Resting'``.
+      trigger_method (str): What started the lap, eg. ``'Manual'``,
+        ``'Distance'`` or ``'Time'``.
+    """
+    times = columns['time'].astype('datetime64[ns]')
+    timed = ~np.isnat(times)
+    if not timed.any():
+      raise ValueError('A TCX lap needs at least one trackpoint with a time')
+    if not timed.all():
+      columns = {name: values[timed] for name, values in columns.items()}
+    valid_times = times[timed]
+    start_time = util.to_texts(valid_times[:1])[0]
+    total_time_s = (valid_times.max() - valid_times.min()) / np.timedelta64(1, 's')
+
+    distance = np.asarray(columns.get('distance_m', []), dtype=np.float64)
+    distance = distance[~np.isnan(distance)]
+    if len(distance):
+      total_distance_m = distance.max() - distance.min()
+    elif 'lat' in columns and 'lon' in columns:
+      steps = geo.step_distances(columns['lat'], columns['lon'], columns.get('bout'))
+      total_distance_m = np.nansum(steps)
+    else:
+      total_distance_m = 0.0
+
+    if not self._has_id:
+      self._leaf(_qname(TCX_NS, 'Id'), start_time)
+      self._has_id = True
+
+    layout = self._layout(columns)
+    with self._xf.element(_qname(TCX_NS, 'Lap'), {'StartTime': start_time}):
+      self._leaf(_qname(TCX_NS, 'TotalTimeSeconds'), repr(float(total_time_s)))
+      self._leaf(_qname(TCX_NS, 'DistanceMeters'), repr(float(total_distance_m)))
+      self._leaf(_qname(TCX_NS, 'Calories'), '0')
+      self._leaf(_qname(TCX_NS, 'Intensity'), intensity)
+      self._leaf(_qname(TCX_NS, 'TriggerMethod'), trigger_method)
+      for track in _split(columns, 'bout'):
+        with self._xf.element(_qname(TCX_NS, 'Track')):
+          for row in layout.rows(track):
+            layout.write(self._xf, row)
+
+  def write_columns(self, columns):
+    """Write trackpoint columns, starting a lap at each new ``lap``."""
+    for lap in _split(columns, 'lap'):
+      self.write_lap(lap)
+
+
+def write_gpx(file, columns, **kwargs):
+  """Write trackpoint columns to a GPX file.
+
+  Args:
+    file (str or file-like): Destination path or binary file object.
+    columns (dict): Trackpoint columns; see :meth:`GpxWriter.write_columns`.
+    **kwargs: Passed to :class:`GpxWriter`.
+  """
+  with GpxWriter(file, **kwargs) as writer:
+    writer.write_columns(columns)
+
+
+def write_tcx(file, columns, **kwargs):
+  """Write trackpoint columns to a TCX file.
+
+  Args:
+    file (str or file-like): Destination path or binary file object.
+    columns (dict): Trackpoint columns; see :meth:`TcxWriter.write_columns`.
+    **kwargs: Passed to :class:`TcxWriter`.
+  """
+  with TcxWriter(file, **kwargs) as writer:
+    writer.write_columns(columns)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Measure how long importing activereader takes in a fresh interpreter.
+
+Each statement runs in its own new Python process, several times, and the
+median time is reported along with the heavy dependencies it pulled in.
+
+Usage:
+
+  python benchmarks/import_time.py
+  python benchmarks/import_time.py --repeat 20 --max-ms 50
+
+With ``--max-ms``, the script exits with status 1 if the bare
+``import activereader`` takes longer than that, so it can guard against
+startup regressions in CI. For a per-module breakdown, run
+``python -X importtime -c "import activereader"``.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+STATEMENTS = [
+  'import activereader',
+  'from activereader import Fit',
+  'from activereader import Gpx',
+  'from activereader import Tcx',
+  'from activereader import convert',
+]
+
+HEAVY_MODULES = [
+  'numpy',
+  'lxml.etree',
+  'lxml.objectify',
+  'dateutil.parser',
+  'dateutil.tz',
+]
+
+# Runs in the child process: time the statement, and report what it loaded.
+_CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+  'ms': elapsed * 1000,
+  'loaded': [name for name in {heavy!r} if name in sys.modules],
+}}))
+'''
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(statement, repeat):
+  """Median time (ms) to run a statement in a new interpreter, and the
+  heavy modules it imported."""
+  code = _CHILD.format(statement=statement, heavy=HEAVY_MODULES)
+  env = dict(os.environ)
+  env['PYTHONPATH'] = os.pathsep.join(
+    [REPO_DIR] + [p for p in [env.get('PYTHONPATH')] if p]
+  )
+  times = []
+  for _ in range(repeat):
+    out = subprocess.run(
+      [sys.executable, '-c', code],
+      check=True, capture_output=True, text=True, env=env
+    ).stdout
+    result = json.loads(out)
+    times.append(result['ms'])
+  return statistics.median(times), result['loaded']
+
+
+def main(argv=None):
+  arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  arg_parser.add_argument('--repeat', type=int, default=10,
+    help='Fresh interpreters per statement (default 10).')
+  arg_parser.add_argument('--max-ms', type=float, default=None,
+    help='Fail if "import activereader" takes longer than this.')
+  args = arg_parser.parse_args(argv)
+
+  results = {}
+  for statement in STATEMENTS:
+    ms, loaded = measure(statement, args.repeat)
+    results[statement] = ms
+    print(f'{statement:<32} {ms:8.1f} ms   {", ".join(loaded) or "-"}')
+
+  if args.max_ms is not None and results[STATEMENTS[0]] > args.max_ms:
+    print(
+      f'"{STATEMENTS[0]}" took {results[STATEMENTS[0]]:.1f} ms, '
+      f'more than {args.max_ms} ms'
+    )
+    return 1
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -50,14 +50,19 @@ setup(
   author_email='aaron@trailzealot.com',
   install_requires = [
     'lxml>=4.6.2',
+    'numpy>=1.20.0',
     'python-dateutil>=2.8.1',
   ],
+  extras_require={
+    'arrow': ['pyarrow>=6.0.0'],
+  },
   url='https://github.com/aaron-schroeder/activereader',
   project_urls={
     'Documentation': f'https://activereader.readthedocs.io/en/stable/',
   },
   license='MIT',
   packages=[pkg_name],
+  package_data={pkg_name: ['schemas/*.xsd']},
   classifiers=[
     'License :: OSI Approved :: MIT License',
     'Intended Audience :: Developers',
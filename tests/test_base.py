@@ -1,7 +1,9 @@
 import datetime
 import io
+import threading
 import unittest
 
+import numpy as np
 from lxml import etree
 
 from activereader import base
@@ -38,6 +40,21 @@ MyElement._add_descendent_properties(
   sub_sub_elements=MySubSubElement
 )
 
+class MyTrackpoint(base.ActivityElement):
+  TAG = 'point'
+
+class MyTrack(base.ActivityElement):
+  TAG = 'track'
+MyTrack._add_descendent_properties(trackpoints=MyTrackpoint)
+
+TRACK_XML = (
+  '<track>'
+    '<point id="1"><Value>1.5</Value><Ext><Power>200</Power></Ext></point>'
+    '<point id="2"><Value>2.5</Value></point>'
+    '<point><Ext><Power>210</Power><Power>999</Power></Ext></point>'
+  '</track>'
+)
+
 
 class TestActivityElement(unittest.TestCase):
 
@@ -128,6 +145,47 @@ class TestActivityElement(unittest.TestCase):
     self.assertEqual(len(my_element.sub_elements[0].sub_sub_elements), 4)
     self.assertEqual(len(my_element.sub_elements[1].sub_sub_elements), 2)
 
+  def test_column(self):
+    track = MyTrack(etree.fromstring(TRACK_XML))
+
+    values = track.column('Value')
+    self.assertEqual(values.dtype, np.float64)
+    self.assertEqual(values[:2].tolist(), [1.5, 2.5])
+    self.assertTrue(np.isnan(values[2]))
+
+    power = track.column('Ext/Power', int)
+    self.assertIsInstance(power, np.ma.MaskedArray)
+    self.assertEqual(power.tolist(), [200, None, 210])
+
+    ids = track.column('@id', int)
+    self.assertEqual(ids.tolist(), [1, 2, None])
+
+    # Paths that can't be traced back by depth take the slow road.
+    self.assertEqual(track.column('Ext/*', int).tolist(), [200, None, 210])
+    self.assertEqual(track.column('./Ext/Power', int).tolist(), [200, None, 210])
+    self.assertEqual(track.column('Ext/../Ext/Power', int).tolist(), [200, None, 210])
+
+    with self.assertRaises(AttributeError):
+      MyElement(etree.fromstring('<element></element>')).column('Value')
+
+  def test_get_data_many(self):
+    track = MyTrack(etree.fromstring(TRACK_XML))
+    values = MyTrackpoint.get_data_many(track.trackpoints, 'Value', float)
+    np.testing.assert_array_equal(values, [1.5, 2.5, np.nan])
+
+    power = MyTrackpoint.get_data_many(
+      [tp.elem for tp in track.trackpoints], 'Ext/Power', int
+    )
+    self.assertEqual(power.tolist(), [200, None, 210])
+
+  def test_leaf_paths(self):
+    track = MyTrack(etree.fromstring(TRACK_XML))
+    self.assertEqual(
+      dict(track.leaf_paths()),
+      {'Value': 2, 'Ext/Power': 3}
+    )
+    self.assertEqual(dict(track.leaf_paths('Ext')), {'Ext/Power': 3})
+
   def test_raises(self):
 
     with self.assertRaisesRegex(TypeError, 'Expected lxml element, not *.'):
@@ -144,5 +202,71 @@ class TestActivityElement(unittest.TestCase):
       ))
 
 
+class TestXmlReader(unittest.TestCase):
+
+  XML = '<track>\n  <!-- note -->\n  <point><Value>1.5</Value></point>\n</track>'
+
+  def tearDown(self):
+    base.XmlReader.reset_parsers()
+
+  def test_default_parser(self):
+    root = base.XmlReader(self.XML).read()
+    self.assertEqual([child.tag for child in root], ['point'])
+    self.assertIsNone(root.text)
+
+  def test_parser_reuse(self):
+    parser = base.XmlReader.get_parser('tcx')
+    self.assertIs(base.XmlReader.get_parser('TCX'), parser)
+    self.assertIsNot(base.XmlReader.get_parser('gpx'), parser)
+
+    results = []
+    thread = threading.Thread(
+      target=lambda: results.append(base.XmlReader.get_parser('tcx'))
+    )
+    thread.start()
+    thread.join()
+    self.assertIsNot(results[0], parser)
+
+  def test_configure_parser(self):
+    class PointElement(etree.ElementBase):
+      pass
+
+    lookup = etree.ElementNamespaceClassLookup()
+    lookup.get_namespace(None)['point'] = PointElement
+    base.XmlReader.configure_parser('xml', lookup=lookup, remove_comments=False)
+    self.assertFalse(base.XmlReader.get_parser_options('XML')['remove_comments'])
+    self.assertTrue(base.XmlReader.get_parser_options('gpx')['remove_comments'])
+
+    root = base.XmlReader(self.XML).read()
+    self.assertEqual(len(root), 2)
+    self.assertIsInstance(root[1], PointElement)
+
+    base.XmlReader.reset_parsers()
+    self.assertEqual(len(base.XmlReader(self.XML).read()), 1)
+
+  def test_configure_parser_simplify(self):
+    class PointElement(etree.ElementBase):
+      pass
+
+    class TimedPoint(base.ActivityElement):
+      TAG = 'point'
+    TimedPoint._add_data_properties(time=('Time', datetime.datetime))
+
+    lookup = etree.ElementNamespaceClassLookup()
+    lookup.get_namespace(None)['point'] = PointElement
+    base.XmlReader.configure_parser('xml', lookup=lookup)
+    xml = '<track>' + ''.join(
+      f'<point><Time>2021-04-16T13:37:5{i}Z</Time></point>' for i in range(3)
+    ) + '</track>'
+
+    root = base.XmlReader(xml.encode()).read(
+      simplify=lambda columns: np.array([True, False, True]),
+      point_class=TimedPoint,
+    )
+    self.assertEqual(len(root), 2)
+    for point in root:
+      self.assertIsInstance(point, PointElement)
+
+
 if __name__ == '__main__':
-  unittest.main()
\ No newline at end of file
+  unittest.main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+import numpy as np
+
+from activereader import bouts, tcx
+
+
+def make_columns(seconds, bout_ids, speeds=None, distances=None):
+  columns = {
+    'time': np.datetime64('2021-04-16T13:37:53', 'ns')
+      + np.array(seconds, dtype='timedelta64[s]'),
+    'bout': np.array(bout_ids),
+  }
+  if speeds is not None:
+    columns['speed_ms'] = np.array(speeds, dtype=np.float64)
+  if distances is not None:
+    columns['distance_m'] = np.array(distances, dtype=np.float64)
+  return columns
+
+
+class TestBouts(unittest.TestCase):
+
+  def test_device_bouts(self):
+    columns = make_columns([0, 1, 2, 10, 11], [0, 0, 0, 1, 1])
+    starts, stops = bouts.detect_bouts(columns)
+    self.assertEqual(starts.tolist(), [0, 3])
+    self.assertEqual(stops.tolist(), [3, 5])
+    self.assertEqual(bouts.moving_time_s(columns), 3.0)
+
+  def test_gaps(self):
+    columns = make_columns([0, 1, 2, 30, 31, 32], [0] * 6)
+    self.assertEqual(len(bouts.detect_bouts(columns)[0]), 1)
+    starts, stops = bouts.detect_bouts(columns, max_gap_s=10)
+    self.assertEqual(starts.tolist(), [0, 3])
+    self.assertEqual(stops.tolist(), [3, 6])
+    self.assertEqual(bouts.moving_time_s(columns, max_gap_s=10), 4.0)
+
+  def test_speed(self):
+    columns = make_columns(
+      range(7), [0] * 7, speeds=[3, 3, 0.1, 0.2, 3, np.nan, 3]
+    )
+    starts, stops = bouts.detect_bouts(columns, min_speed_ms=0.5)
+    self.assertEqual(starts.tolist(), [0, 4])
+    self.assertEqual(stops.tolist(), [2, 7])
+
+  def test_speed_from_distance(self):
+    columns = make_columns(range(5), [0] * 5, distances=[0, 3, 3, 3, 6])
+    np.testing.assert_allclose(
+      bouts.point_speeds(columns), [np.nan, 3, 0, 0, 3]
+    )
+    starts, stops = bouts.detect_bouts(columns, min_speed_ms=0.5)
+    self.assertEqual(starts.tolist(), [0, 4])
+    self.assertEqual(stops.tolist(), [2, 5])
+
+  def test_element(self):
+    reader = tcx.Tcx.from_file(
+      os.path.join(os.path.dirname(__file__), 'testdata.tcx')
+    )
+    starts, stops = reader.detect_bouts()
+    self.assertEqual(len(starts), reader.num_bouts)
+    self.assertEqual(
+      (stops - starts).tolist(),
+      [len(track.trackpoints) for track in reader.tracks]
+    )
+    self.assertLessEqual(
+      reader.moving_time_s(min_speed_ms=1.0), reader.moving_time_s()
+    )
+
+
+if __name__ == '__main__':
+  unittest.main()
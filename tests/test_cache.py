@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from activereader import cache, gpx, tcx
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+
+class SlowTcx(tcx.Tcx):
+  """Counts reads, and takes long enough for other threads to pile up."""
+  reads = 0
+  lock = threading.Lock()
+
+  @classmethod
+  def from_file(cls, file_obj):
+    with cls.lock:
+      cls.reads += 1
+    time.sleep(0.1)
+    return tcx.Tcx.from_file(file_obj)
+
+
+class BrokenReader(object):
+  @classmethod
+  def from_file(cls, file_obj):
+    time.sleep(0.05)
+    raise ValueError('broken')
+
+
+class TestActivityCache(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.tcx_path = os.path.join(self.tmpdir, 'activity.tcx')
+    self.gpx_path = os.path.join(self.tmpdir, 'activity.gpx')
+    shutil.copy(os.path.join(TESTDATA_DIR, 'testdata.tcx'), self.tcx_path)
+    shutil.copy(os.path.join(TESTDATA_DIR, 'testdata.gpx'), self.gpx_path)
+    self.cache = cache.ActivityCache()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def test_hit_and_miss(self):
+    first = self.cache.get(self.tcx_path)
+    second = self.cache.get(self.tcx_path)
+    self.assertIsInstance(first, tcx.Tcx)
+    self.assertTrue(first.is_compact)
+    self.assertIs(first, second)
+
+    info = self.cache.info()
+    self.assertEqual((info.hits, info.misses, info.entries), (1, 1, 1))
+    self.assertEqual(info.nbytes, first._compact.nbytes)
+
+  def test_nbytes_counts_everything_held(self):
+    store = self.cache.get(self.tcx_path)._compact
+    arrays = sum(
+      array.nbytes for arrays in list(store.fields.values()) + list(store.containers.values())
+      for array in arrays.values()
+    )
+    ancestors = sum(array.nbytes for array in store.ancestors.values())
+    self.assertGreater(ancestors, 0)
+    self.assertTrue(store.records)
+    # Lap and activity records, and ancestor positions, count as well.
+    self.assertGreater(store.nbytes, arrays + ancestors)
+
+  def test_reader_by_extension(self):
+    self.assertIsInstance(self.cache.get(self.gpx_path), gpx.Gpx)
+    with self.assertRaises(ValueError):
+      self.cache.get(os.path.join(TESTDATA_DIR, '__init__.py'))
+
+  def test_changed_file_is_reread(self):
+    first = self.cache.get(self.tcx_path)
+    stat = os.stat(self.tcx_path)
+    os.utime(self.tcx_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    second = self.cache.get(self.tcx_path)
+    self.assertIsNot(first, second)
+    self.assertEqual(self.cache.info().misses, 2)
+    self.assertEqual(len(self.cache), 1)
+
+  def test_eviction(self):
+    nbytes = self.cache.get(self.tcx_path)._compact.nbytes
+    budget = cache.ActivityCache(max_bytes=nbytes + 1)
+    budget.get(self.tcx_path)
+    budget.get(self.gpx_path)
+    info = budget.info()
+    self.assertEqual(info.evictions, 1)
+    self.assertEqual(info.entries, 1)
+    self.assertLessEqual(info.nbytes, info.max_bytes)
+
+    # The least recently used entry goes first.
+    paths = [os.path.join(self.tmpdir, f'{name}.tcx') for name in 'abc']
+    for path in paths:
+      shutil.copy(self.tcx_path, path)
+    budget = cache.ActivityCache(max_bytes=2 * nbytes)
+    budget.get(paths[0])
+    budget.get(paths[1])
+    budget.get(paths[0])
+    budget.get(paths[2])
+    self.assertEqual(list(budget._entries), [paths[0], paths[2]])
+
+  def test_too_big_to_keep(self):
+    tiny = cache.ActivityCache(max_bytes=10)
+    self.assertIsInstance(tiny.get(self.tcx_path), tcx.Tcx)
+    self.assertEqual(len(tiny), 0)
+
+  def test_single_flight(self):
+    SlowTcx.reads = 0
+    results = []
+
+    def get():
+      results.append(self.cache.get(self.tcx_path, reader=SlowTcx))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    self.assertEqual(SlowTcx.reads, 1)
+    self.assertEqual(len(results), 8)
+    self.assertTrue(all(result is results[0] for result in results))
+    info = self.cache.info()
+    self.assertEqual((info.hits, info.misses), (7, 1))
+
+  def test_error_reaches_waiters(self):
+    errors = []
+
+    def get():
+      try:
+        self.cache.get(self.tcx_path, reader=BrokenReader)
+      except ValueError as error:
+        errors.append(error)
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    self.assertEqual(len(errors), 4)
+    self.assertEqual(len(self.cache), 0)
+    self.assertEqual(self.cache._loading, {})
+
+  def test_discard_and_clear(self):
+    self.cache.get(self.tcx_path)
+    self.cache.discard(self.tcx_path)
+    self.assertEqual(len(self.cache), 0)
+    self.assertEqual(self.cache.info().nbytes, 0)
+
+    self.cache.get(self.tcx_path)
+    self.cache.clear()
+    self.assertEqual(self.cache.info(), cache.CacheInfo(0, 0, 0, 0, 0, cache.DEFAULT_MAX_BYTES))
+
+
+if __name__ == '__main__':
+  unittest.main()
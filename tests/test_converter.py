@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import unittest
+
+import numpy as np
+from lxml import etree
+
+import activereader
+from activereader import base, converter, gpx, tcx, writer
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+
+class TestConvert(unittest.TestCase):
+
+  def setUp(self):
+    self.tcx_path = os.path.join(TESTDATA_DIR, 'testdata.tcx')
+    self.gpx_path = os.path.join(TESTDATA_DIR, 'testdata.gpx')
+
+  def check_columns(self, source, converted, names):
+    expected = source.columns(names)
+    actual = converted.columns(names)
+    for name in names:
+      if expected[name].dtype.kind == 'M':
+        np.testing.assert_array_equal(actual[name], expected[name])
+      else:
+        np.testing.assert_array_equal(
+          np.ma.filled(actual[name].astype(np.float64), np.nan),
+          np.ma.filled(expected[name].astype(np.float64), np.nan),
+          err_msg=name
+        )
+
+  def test_tcx_to_gpx(self):
+    buffer = io.BytesIO()
+    activereader.convert(self.tcx_path, buffer, to='gpx', name='Boulder')
+    source = tcx.Tcx.from_file(self.tcx_path)
+    converted = gpx.Gpx.from_file(buffer.getvalue(), validate=True)
+
+    self.assertEqual(converted.name, 'Boulder')
+    self.assertEqual(len(converted.segments), len(source.tracks))
+    self.check_columns(
+      source, converted,
+      ['time', 'lat', 'lon', 'altitude_m', 'hr', 'cadence_rpm']
+    )
+
+  def test_gpx_to_tcx(self):
+    buffer = io.BytesIO()
+    with open(self.gpx_path, 'rb') as f:
+      activereader.convert(f.read(), buffer, to='tcx', sport='Running')
+    source = gpx.Gpx.from_file(self.gpx_path)
+    converted = tcx.Tcx.from_file(buffer.getvalue())
+
+    self.assertEqual(converted.activities[0].sport, 'Running')
+    self.assertEqual(len(converted.laps), len(source.segments))
+    self.check_columns(source, converted, ['time', 'lat', 'lon', 'hr', 'cadence_rpm'])
+
+  def test_tracks_and_missing_positions(self):
+    # A pause splits the first lap in two tracks, and one trackpoint lost
+    # its GPS fix.
+    tree = etree.parse(self.tcx_path)
+    ns = {'tcx': writer.TCX_NS}
+    track = tree.find('.//tcx:Track', ns)
+    paused = etree.SubElement(track.getparent(), track.tag)
+    for trackpoint in track.findall('tcx:Trackpoint', ns)[5:]:
+      paused.append(trackpoint)
+    positions = tree.findall('.//tcx:Position', ns)
+    positions[20].getparent().remove(positions[20])
+    data = etree.tostring(tree)
+    source = tcx.Tcx.from_file(data)
+
+    buffer = io.BytesIO()
+    activereader.convert(data, buffer, to='gpx')
+    converted = gpx.Gpx.from_file(buffer.getvalue(), validate=True)
+    self.assertEqual(len(converted.segments), len(source.tracks))
+    self.assertEqual(len(converted.trackpoints), len(source.trackpoints) - 1)
+    np.testing.assert_array_equal(
+      converted.columns()['bout'],
+      np.delete(source.columns()['bout'], 20)
+    )
+
+    buffer = io.BytesIO()
+    activereader.convert(data, buffer, to='tcx')
+    converted = tcx.Tcx.from_file(buffer.getvalue(), validate=True)
+    self.assertEqual(len(converted.laps), len(source.laps))
+    self.assertEqual(len(converted.tracks), len(source.tracks))
+    self.check_columns(source, converted, ['time', 'lat', 'hr'])
+
+  def test_chunks(self):
+    chunk_size = converter.CHUNK_SIZE
+    converter.CHUNK_SIZE = 5
+    try:
+      for to, reader in (('gpx', gpx.Gpx), ('tcx', tcx.Tcx)):
+        buffer = io.BytesIO()
+        activereader.convert(self.tcx_path, buffer, to=to)
+        self.check_columns(
+          tcx.Tcx.from_file(self.tcx_path),
+          reader.from_file(buffer.getvalue()),
+          ['time', 'hr']
+        )
+    finally:
+      converter.CHUNK_SIZE = chunk_size
+
+  def test_parser_options(self):
+    with open(self.tcx_path, 'rb') as f:
+      data = f.read()
+    truncated = data[:len(data) * 2 // 3]
+    with self.assertRaises(etree.XMLSyntaxError):
+      activereader.convert(truncated, io.BytesIO())
+
+    # Options set for the source's format reach the streaming parser.
+    base.XmlReader.configure_parser('tcx', recover=True)
+    try:
+      buffer = io.BytesIO()
+      activereader.convert(truncated, buffer)
+      self.assertGreater(len(gpx.Gpx.from_file(buffer.getvalue()).trackpoints), 0)
+    finally:
+      base.XmlReader.reset_parsers()
+    self.assertEqual(converter._source_format('activity.GPX.gz'), 'gpx')
+    self.assertEqual(converter._source_format(b'<kml></kml>'), 'xml')
+
+  def test_errors(self):
+    with self.assertRaises(ValueError):
+      activereader.convert(self.tcx_path, io.BytesIO(), to='fit')
+    with self.assertRaises(ValueError):
+      activereader.convert(b'<kml></kml>', io.BytesIO())
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+import numpy as np
+
+from activereader import geo, gpx, tcx
+from activereader.course import CourseMatcher
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+# One degree of latitude, in meters.
+DEG_M = np.radians(1) * geo.EARTH_RADIUS_M
+
+
+class TestCourseElements(unittest.TestCase):
+
+  def test_tcx_course(self):
+    path = os.path.join(TESTDATA_DIR, 'testcourse.tcx')
+    for keep_tree in (True, False):
+      tcx_obj = tcx.Tcx.from_file(path, keep_tree=keep_tree)
+      self.assertEqual(len(tcx_obj.courses), 1)
+      course = tcx_obj.courses[0]
+      self.assertEqual(course.name, 'Pemberton Trail')
+      self.assertEqual(course.laps[0].intensity, 'Active')
+      self.assertAlmostEqual(course.laps[0].distance_m, 25254.9, places=2)
+      self.assertAlmostEqual(course.laps[0].begin_lat, 33.69041)
+
+      columns = course.columns()
+      self.assertEqual(len(columns['lat']), 4990)
+      self.assertAlmostEqual(columns['distance_m'][-1], 25254.902)
+
+    activity = tcx.Tcx.from_file(os.path.join(TESTDATA_DIR, 'testdata.tcx'))
+    self.assertEqual(activity.courses, [])
+    self.assertEqual(len(activity.laps), 4)
+
+  def test_gpx_route(self):
+    path = os.path.join(TESTDATA_DIR, 'testcourse.gpx')
+    for keep_tree in (True, False):
+      route = gpx.Gpx.from_file(path, keep_tree=keep_tree).routes[0]
+      self.assertEqual(len(route.routepoints), 4990)
+      columns = route.columns()
+      self.assertEqual(len(columns['lat']), 4990)
+      self.assertTrue((columns['route'] == 0).all())
+
+
+class TestCourseMatcher(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    course = tcx.Tcx.from_file(os.path.join(TESTDATA_DIR, 'testcourse.tcx')).courses[0]
+    cls.columns = course._available_columns('lat', 'lon', 'distance_m')
+    cls.matcher = CourseMatcher(course)
+
+  def brute_force(self, lat, lon):
+    """Distance to the nearest segment, comparing with every one."""
+    matcher = self.matcher
+    x, y = matcher._project(lat, lon)
+    num_segments = len(matcher.x) - 1
+    points = np.repeat(np.arange(len(x)), num_segments)
+    segments = np.tile(np.arange(num_segments), len(x))
+    dist, _ = matcher._project_onto(x, y, points, segments)
+    return dist.reshape(len(x), num_segments).min(axis=1)
+
+  def test_straight_course(self):
+    # Due north along a meridian, 1 km; points 30 m east of it.
+    lat = np.linspace(0, 1000 / DEG_M, 11)
+    matcher = CourseMatcher({'lat': lat, 'lon': np.zeros(11)}, cell_m=50)
+    self.assertAlmostEqual(matcher.length_m, 1000, delta=0.5)
+
+    matched = matcher.match(
+      [250 / DEG_M, 1200 / DEG_M, np.nan], [30 / DEG_M, 0, 0]
+    )
+    np.testing.assert_allclose(matched['deviation_m'][:2], [30, 200], atol=0.5)
+    np.testing.assert_allclose(
+      matched['course_distance_m'][:2], [250, 1000], atol=0.5
+    )
+    np.testing.assert_array_equal(matched['segment'], [2, 9, -1])
+    self.assertTrue(np.isnan(matched['deviation_m'][2]))
+
+  def test_against_brute_force(self):
+    rng = np.random.default_rng(0)
+    offsets = rng.integers(0, len(self.columns['lat']), 300)
+    # Mostly within a few meters of the course, some hundreds of meters off.
+    spread = np.where(np.arange(300) % 10, 5e-5, 3e-3)
+    lat = self.columns['lat'][offsets] + rng.normal(0, spread)
+    lon = self.columns['lon'][offsets] + rng.normal(0, spread)
+
+    matched = self.matcher.match(lat, lon)
+    np.testing.assert_allclose(
+      matched['deviation_m'], self.brute_force(lat, lon), atol=1e-6
+    )
+    self.assertTrue((matched['segment'] >= 0).all())
+
+  def test_sparse_route(self):
+    # A planner's route: three points, segments hundreds of km long.
+    route = {'lat': np.array([33.0, 35.5, 34.0]), 'lon': np.array([-112.0, -111.0, -109.0])}
+    matcher = CourseMatcher(route)
+    # Segments are registered along their length, not their bounding box.
+    self.assertLess(len(matcher._keys), 4 * (matcher.length_m / matcher.cell_m + 2))
+
+    rng = np.random.default_rng(0)
+    t = rng.random(200)
+    lat = 33.0 + 2.5 * t + rng.normal(0, 1e-3, 200)
+    lon = -112.0 + t + rng.normal(0, 1e-3, 200)
+    lat[::20] += 0.5
+    matched = matcher.match(lat, lon)
+
+    x, y = matcher._project(lat, lon)
+    points = np.repeat(np.arange(200), 2)
+    segments = np.tile([0, 1], 200)
+    dist, _ = matcher._project_onto(x, y, points, segments)
+    np.testing.assert_allclose(
+      matched['deviation_m'], dist.reshape(200, 2).min(axis=1), atol=1e-6
+    )
+
+  def test_own_trackpoints(self):
+    matched = self.matcher.match_activity(
+      tcx.Tcx.from_file(os.path.join(TESTDATA_DIR, 'testcourse.tcx'))
+    )
+    np.testing.assert_allclose(matched['deviation_m'], 0, atol=1e-6)
+    np.testing.assert_allclose(
+      matched['course_distance_m'], self.columns['distance_m'], atol=1e-6
+    )
+
+  def test_loop_passes(self):
+    # The course ends where it starts.
+    start = [self.columns['lat'][0]], [self.columns['lon'][0]]
+    self.assertEqual(self.matcher.match(*start)['course_distance_m'][0], 0)
+    at_end = self.matcher.match(*start, distance_m=[self.matcher.length_m])
+    self.assertAlmostEqual(
+      at_end['course_distance_m'][0], self.matcher.length_m, delta=1
+    )
+    self.assertEqual(at_end['segment'][0], len(self.matcher.x) - 2)
+
+  def test_errors(self):
+    with self.assertRaises(ValueError):
+      CourseMatcher({'lat': [0.0, np.nan], 'lon': [0.0, 0.0]})
+    with self.assertRaises(ValueError):
+      CourseMatcher({'lat': [0.0, 1.0], 'lon': [0.0, 0.0]}, cell_m=0)
+
+
+if __name__ == '__main__':
+  unittest.main()
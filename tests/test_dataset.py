@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import unittest
+
+from activereader import dataset, tcx
+
+try:
+  import pyarrow as pa
+  import pyarrow.dataset as ds
+except ImportError:
+  pa = None
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+TCX_FILENAME = os.path.join(TESTDATA_DIR, 'testdata.tcx')
+GPX_FILENAME = os.path.join(TESTDATA_DIR, 'testdata.gpx')
+
+
+@unittest.skipIf(pa is None, 'pyarrow is not installed')
+class TestDataset(unittest.TestCase):
+
+  def test_record_batch(self):
+    batch = dataset.to_record_batch(TCX_FILENAME)
+    reader = tcx.Tcx.from_file(TCX_FILENAME)
+
+    self.assertEqual(batch.num_rows, reader.num_records)
+    self.assertEqual(batch.schema, dataset.get_schema())
+    for name in dataset.CATEGORY_COLUMNS:
+      self.assertTrue(pa.types.is_dictionary(batch.schema.field(name).type))
+
+    data = batch.to_pydict()
+    self.assertEqual(set(data['activity']), {'testdata.tcx'})
+    self.assertEqual(set(data['date']), {'2021-04-16'})
+    self.assertEqual(set(data['sport']), {'Running'})
+    self.assertEqual(set(data['trigger_method']), {'Manual'})
+    self.assertEqual(data['hr'], [tp.hr for tp in reader.trackpoints])
+
+  def test_record_batch_fields(self):
+    batch = dataset.to_record_batch(GPX_FILENAME, fields=['time', 'hr', 'speed_ms'])
+    self.assertEqual(batch.schema.names[-3:], ['time', 'hr', 'speed_ms'])
+    # GPX trackpoints have no speed.
+    self.assertEqual(batch.column('speed_ms').null_count, batch.num_rows)
+
+    with self.assertRaises(KeyError):
+      dataset.get_schema(['not_a_field'])
+
+  def test_write_dataset(self):
+    with tempfile.TemporaryDirectory() as base_dir:
+      dataset.write_dataset(
+        iter([TCX_FILENAME, GPX_FILENAME]),
+        base_dir,
+        row_group_size=20
+      )
+      self.assertTrue(os.path.isdir(
+        os.path.join(base_dir, 'date=2021-04-16', 'sport=Running')
+      ))
+      table = ds.dataset(base_dir, partitioning='hive').to_table()
+
+    num_records = (
+      dataset.to_record_batch(TCX_FILENAME).num_rows
+      + dataset.to_record_batch(GPX_FILENAME).num_rows
+    )
+    self.assertEqual(table.num_rows, num_records)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+import numpy as np
+
+from activereader import efforts, gpx, tcx
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+START = np.datetime64('2021-04-16T13:00:00', 'ns')
+
+
+def make_columns(seconds, distance):
+  return {
+    'time': START + (np.array(seconds, dtype=np.float64) * 1e9).astype('timedelta64[ns]'),
+    'distance_m': np.array(distance, dtype=np.float64),
+  }
+
+
+def brute_force_fastest(seconds, distance, target):
+  best = None
+  for i in range(len(distance)):
+    for j in range(i, len(distance)):
+      if distance[j] - distance[i] >= target:
+        if best is None or seconds[j] - seconds[i] < best:
+          best = seconds[j] - seconds[i]
+        break
+  return best
+
+
+def brute_force_farthest(seconds, distance, target):
+  best = None
+  for i in range(len(distance)):
+    if seconds[i] + target > seconds[-1]:
+      break
+    for j in range(len(distance) - 1, i - 1, -1):
+      if seconds[j] - seconds[i] <= target:
+        if best is None or distance[j] - distance[i] > best:
+          best = distance[j] - distance[i]
+        break
+  return best
+
+
+class TestBestEfforts(unittest.TestCase):
+
+  def test_simple(self):
+    # 2 m/s, then 5 m/s for 20 s, then 2 m/s.
+    seconds = np.arange(61)
+    speed = np.where((seconds > 20) & (seconds <= 40), 5.0, 2.0)
+    speed[0] = 0
+    distance = np.cumsum(speed)
+    found = efforts.best_efforts(
+      make_columns(seconds, distance), distances_m=[100], durations_s=[20]
+    )
+    self.assertEqual(len(found), 2)
+    fastest, farthest = found
+    self.assertEqual(fastest.kind, 'distance')
+    self.assertEqual(fastest.time_s, 20)
+    self.assertEqual((fastest.start, fastest.stop), (20, 41))
+    self.assertEqual(farthest.kind, 'duration')
+    self.assertEqual(farthest.distance_m, 100)
+
+  def test_too_short(self):
+    columns = make_columns([0, 10, 20], [0, 30, 60])
+    self.assertEqual(
+      efforts.best_efforts(columns, distances_m=[100], durations_s=[30]), []
+    )
+
+  def test_missing_data(self):
+    columns = make_columns([0, 10, 20, 30], [0, np.nan, 100, 200])
+    columns['time'][2] = np.datetime64('NaT')
+    (effort,) = efforts.best_efforts(columns, distances_m=[150], durations_s=[])
+    self.assertEqual((effort.start, effort.stop), (0, 4))
+    self.assertEqual(effort.time_s, 30)
+
+  def test_matches_brute_force(self):
+    tcx_obj = tcx.Tcx.from_file(os.path.join(TESTDATA_DIR, 'testcourse.tcx'))
+    columns = tcx_obj.columns(['time', 'distance_m'])
+    columns = {name: column[:600] for name, column in columns.items()}
+    seconds = columns['time'].view(np.int64) / 1e9
+    distance = columns['distance_m']
+
+    found = efforts.best_efforts(
+      columns, distances_m=[400, 1000], durations_s=[60, 300]
+    )
+    for effort in found[:2]:
+      self.assertEqual(
+        effort.time_s, brute_force_fastest(seconds, distance, effort.target)
+      )
+      self.assertGreaterEqual(effort.distance_m, effort.target)
+    for effort in found[2:]:
+      self.assertAlmostEqual(
+        effort.distance_m, brute_force_farthest(seconds, distance, effort.target)
+      )
+      self.assertLessEqual(effort.time_s, effort.target)
+
+  def test_element(self):
+    gpx_obj = gpx.Gpx.from_file(os.path.join(TESTDATA_DIR, 'testdata.gpx'))
+    (effort,) = gpx_obj.best_efforts(distances_m=[10], durations_s=[])
+    derived = gpx_obj.derived_columns()
+    self.assertGreaterEqual(
+      derived['distance_m'][effort.stop - 1] - derived['distance_m'][effort.start], 10
+    )
+    # Too short for any of the default distances.
+    self.assertEqual({e.kind for e in gpx_obj.best_efforts()}, {'duration'})
+
+
+if __name__ == '__main__':
+  unittest.main()
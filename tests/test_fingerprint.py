@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from lxml import etree
+
+from activereader import base, convert, fingerprint, tcx
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+GPX_NS = '{http://www.topografix.com/GPX/1/1}'
+
+
+def edit_gpx(src, dst, edit):
+  """Write a copy of a GPX file with each trkpt passed through edit.
+
+  edit(i, trkpt) returns False to drop the trackpoint.
+  """
+  tree = etree.parse(src)
+  for i, trkpt in enumerate(list(tree.iter(f'{GPX_NS}trkpt'))):
+    if edit(i, trkpt) is False:
+      trkpt.getparent().remove(trkpt)
+  tree.write(dst)
+
+
+def shift_time(trkpt, hours):
+  time = trkpt.find(f'{GPX_NS}time')
+  shifted = np.datetime64(time.text.rstrip('Z')) + np.timedelta64(hours, 'h')
+  time.text = f'{shifted}Z'
+
+
+class TestFingerprint(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    cls.tmpdir = tempfile.mkdtemp()
+    cls.data_tcx = os.path.join(TESTDATA_DIR, 'testdata.tcx')
+    cls.course_tcx = os.path.join(TESTDATA_DIR, 'testcourse.tcx')
+    cls.data_gpx = cls.tmp('data.gpx')
+    cls.course_gpx = cls.tmp('course.gpx')
+    convert(cls.data_tcx, cls.data_gpx, to='gpx')
+    convert(cls.course_tcx, cls.course_gpx, to='gpx')
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls.tmpdir)
+
+  @classmethod
+  def tmp(cls, name):
+    return os.path.join(cls.tmpdir, name)
+
+  def test_formats_agree(self):
+    a = fingerprint.fingerprint(self.data_tcx)
+    b = fingerprint.fingerprint(self.data_gpx)
+    self.assertEqual(a.start_time, np.datetime64('2021-04-16T13:37:53'))
+    self.assertEqual(a.start_time, b.start_time)
+    self.assertEqual(a.duration_s, b.duration_s)
+    self.assertIsNotNone(a.geometry_hash)
+    self.assertEqual(a.geometry_hash, b.geometry_hash)
+    self.assertEqual(a.hr, b.hr)
+    self.assertTrue(fingerprint.same_activity(a, b))
+
+  def test_element_source(self):
+    self.assertEqual(
+      fingerprint.fingerprint(tcx.Tcx.from_file(self.course_tcx)),
+      fingerprint.fingerprint(self.course_tcx)
+    )
+
+  def test_trimmed_resampled_copy(self):
+    # A copy missing its first minutes and every other trackpoint, with
+    # elevation offset the way a service might correct it.
+    def edit(i, trkpt):
+      if i < 120 or i % 2:
+        return False
+      ele = trkpt.find(f'{GPX_NS}ele')
+      ele.text = str(float(ele.text) + 35)
+    edit_gpx(self.course_gpx, self.tmp('trimmed.gpx'), edit)
+
+    a = fingerprint.fingerprint(self.course_tcx)
+    b = fingerprint.fingerprint(self.tmp('trimmed.gpx'))
+    self.assertGreater(b.start_time, a.start_time)
+    self.assertTrue(fingerprint.same_activity(a, b, time_tolerance_s=600))
+    self.assertFalse(fingerprint.same_activity(a, b, time_tolerance_s=10))
+
+  def test_different_activities(self):
+    a = fingerprint.fingerprint(self.course_tcx)
+    self.assertFalse(fingerprint.same_activity(a, fingerprint.fingerprint(self.data_tcx)))
+
+    edit_gpx(self.course_gpx, self.tmp('later.gpx'), lambda i, trkpt: shift_time(trkpt, 1))
+    self.assertFalse(fingerprint.same_activity(a, fingerprint.fingerprint(self.tmp('later.gpx'))))
+
+    # Same times, somewhere else.
+    def move(i, trkpt):
+      trkpt.set('lat', str(float(trkpt.get('lat')) + 0.05))
+    edit_gpx(self.course_gpx, self.tmp('moved.gpx'), move)
+    moved = fingerprint.fingerprint(self.tmp('moved.gpx'))
+    self.assertNotEqual(a.geometry_hash, moved.geometry_hash)
+    self.assertFalse(fingerprint.same_activity(a, moved))
+
+  def test_start_time_reads_only_the_start(self):
+    with open(self.course_tcx, 'rb') as f:
+      data = f.read()
+    truncated = self.tmp('truncated.tcx')
+    with open(truncated, 'wb') as f:
+      f.write(data[:len(data) // 3])
+
+    self.assertEqual(
+      fingerprint.start_time(truncated), np.datetime64('2009-12-31T23:00:00')
+    )
+    with self.assertRaises(etree.XMLSyntaxError):
+      fingerprint.fingerprint(truncated)
+
+    # Options set for the format are used, as in a normal read.
+    base.XmlReader.configure_parser('tcx', recover=True)
+    try:
+      self.assertEqual(
+        fingerprint.fingerprint(truncated).start_time,
+        np.datetime64('2009-12-31T23:00:00')
+      )
+    finally:
+      base.XmlReader.reset_parsers()
+
+  def test_errors(self):
+    with self.assertRaises(ValueError):
+      fingerprint.fingerprint(self.tmp('activity.csv'))
+    edit_gpx(self.data_gpx, self.tmp('untimed.gpx'), lambda i, trkpt: trkpt.remove(trkpt.find(f'{GPX_NS}time')))
+    self.assertTrue(np.isnat(fingerprint.start_time(self.tmp('untimed.gpx'))))
+    with self.assertRaises(ValueError):
+      fingerprint.fingerprint(self.tmp('untimed.gpx'))
+
+  def test_find_duplicates(self):
+    edit_gpx(self.course_gpx, self.tmp('sparse.gpx'), lambda i, trkpt: i % 3 == 0)
+    edit_gpx(self.course_gpx, self.tmp('later.gpx'), lambda i, trkpt: shift_time(trkpt, 1))
+    edit_gpx(self.data_gpx, self.tmp('untimed.gpx'), lambda i, trkpt: trkpt.remove(trkpt.find(f'{GPX_NS}time')))
+    sources = [
+      self.course_tcx, self.data_tcx, self.tmp('later.gpx'), self.data_gpx,
+      self.tmp('untimed.gpx'), self.tmp('sparse.gpx'),
+      os.path.join(TESTDATA_DIR, 'testdata.gpx'),
+    ]
+    self.assertEqual(fingerprint.find_duplicates(sources), [
+      [self.course_tcx, self.tmp('sparse.gpx')],
+      [self.data_tcx, self.data_gpx, os.path.join(TESTDATA_DIR, 'testdata.gpx')],
+    ])
+    self.assertEqual(fingerprint.find_duplicates(sources[:3]), [])
+
+
+if __name__ == '__main__':
+  unittest.main()
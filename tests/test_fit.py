@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+import datetime
+import io
+import pickle
+import struct
+import unittest
+
+import numpy as np
+from dateutil import tz
+
+import activereader
+from activereader import fit
+
+
+START = 1000000000  # Seconds since the FIT epoch.
+START_TIME = datetime.datetime(2021, 9, 8, 1, 46, 40, tzinfo=tz.UTC)
+
+
+def _crc(data):
+  table = [
+    0x0000, 0xCC01, 0xD801, 0x1400, 0xF001, 0x3C00, 0x2800, 0xE401,
+    0xA001, 0x6C00, 0x7800, 0xB401, 0x5000, 0x9C01, 0x8801, 0x4400,
+  ]
+  crc = 0
+  for byte in data:
+    for nibble in (byte & 0xF, byte >> 4):
+      tmp = table[crc & 0xF]
+      crc = (crc >> 4) & 0x0FFF
+      crc = crc ^ tmp ^ table[nibble]
+  return crc
+
+
+class FitBuilder(object):
+  """Writes just enough FIT to exercise the reader."""
+  FORMATS = {0: 'B', 1: 'b', 2: 'B', 4: 'H', 0x84: 'H', 5: 'i', 0x85: 'i', 6: 'I', 0x86: 'I'}
+
+  def __init__(self):
+    self.body = b''
+
+  def define(self, local, global_number, fields, big_endian=False, developer_sizes=()):
+    """fields: list of (field number, base type)."""
+    header = 0x40 | local | (0x20 if developer_sizes else 0)
+    endian = '>' if big_endian else '<'
+    self.body += struct.pack('<BBB', header, 0, int(big_endian))
+    self.body += struct.pack(f'{endian}HB', global_number, len(fields))
+    for number, base_type in fields:
+      size = struct.calcsize(self.FORMATS[base_type])
+      self.body += struct.pack('<BBB', number, size, base_type)
+    if developer_sizes:
+      self.body += struct.pack('<B', len(developer_sizes))
+      for i, size in enumerate(developer_sizes):
+        self.body += struct.pack('<BBB', i, size, 0)
+    self.formats = getattr(self, 'formats', {})
+    self.formats[local] = (
+      endian + ''.join(self.FORMATS[base_type] for _, base_type in fields),
+      sum(developer_sizes)
+    )
+
+  def message(self, local, *values, time_offset=None):
+    fmt, extra = self.formats[local]
+    if time_offset is None:
+      header = local
+    else:
+      header = 0x80 | (local << 5) | (time_offset & 0x1F)
+    self.body += struct.pack('<B', header) + struct.pack(fmt, *values) + b'\0' * extra
+
+  def getvalue(self):
+    header = struct.pack('<BBHI4s', 12, 0x10, 2000, len(self.body), b'.FIT')
+    data = header + self.body
+    return data + struct.pack('<H', _crc(data))
+
+
+def semicircles(degrees):
+  return int(round(degrees * 2 ** 31 / 180))
+
+
+def build_activity():
+  """Two laps of five records each, with a pause after the first lap."""
+  b = FitBuilder()
+  b.define(0, 0, [(0, 0), (1, 0x84), (2, 0x84), (3, 0x86), (4, 0x86)])
+  b.message(0, 4, 1, 3121, 3900000000, START)
+
+  b.define(1, 21, [(253, 0x86), (0, 0), (1, 0)])
+  b.message(1, START, 0, 0)
+
+  b.define(
+    2, 20,
+    [(253, 0x86), (0, 0x85), (1, 0x85), (2, 0x84), (3, 2), (4, 2), (5, 0x86), (6, 0x84), (7, 0x84)]
+  )
+  for i in range(5):
+    b.message(
+      2, START + i, semicircles(40.0 + i * 1e-4), semicircles(-105.0),
+      (1600 + 500) * 5 + i, 140 + i, 80, i * 300, 3000, 200 + i
+    )
+
+  b.define(3, 19, [
+    (253, 0x86), (2, 0x86), (7, 0x86), (8, 0x86), (9, 0x86), (11, 0x84),
+    (13, 0x84), (14, 0x84), (15, 2), (16, 2), (23, 0), (24, 0),
+  ])
+  b.message(3, START + 4, START, 4000, 4000, 1200, 10, 3000, 3500, 142, 144, 0, 2)
+
+  b.message(1, START + 4, 0, 4)  # stop_all
+  b.message(1, START + 10, 0, 0)  # start
+
+  # The second lap's records: one missing position, one invalid hr, and
+  # compressed timestamps.
+  for i in range(5):
+    lat = 0x7FFFFFFF if i == 2 else semicircles(40.001 + i * 1e-4)
+    hr = 0xFF if i == 3 else 150 + i
+    b.message(
+      2, START + 10 + i, lat, semicircles(-105.0), (1610 + 500) * 5, hr,
+      85, 1200 + i * 300, 3000, 210,
+      time_offset=None if i == 0 else (START + 10 + i) & 0x1F
+    )
+  b.message(3, START + 14, START + 10, 4000, 4000, 1200, 12, 3000, 3400, 152, 154, 1, 0)
+
+  b.define(0, 18, [(253, 0x86), (2, 0x86), (5, 0), (7, 0x86), (8, 0x86), (9, 0x86), (11, 0x84), (16, 2), (17, 2)])
+  b.message(0, START + 14, START, 1, 14000, 8000, 2400, 22, 147, 154)
+  return b.getvalue()
+
+
+class TestFit(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    cls.data = build_activity()
+
+  def setUp(self):
+    self.fit = fit.Fit.from_file(self.data)
+
+  def test_file_id(self):
+    self.assertEqual(self.fit.manufacturer, 'garmin')
+    self.assertEqual(self.fit.product_id, 3121)
+    self.assertEqual(self.fit.device_id, 3900000000)
+    self.assertEqual(self.fit.time_created, START_TIME)
+
+  def test_counts(self):
+    self.assertEqual(len(self.fit.sessions), 1)
+    self.assertEqual(len(self.fit.laps), 2)
+    self.assertEqual(len(self.fit.trackpoints), 10)
+    self.assertEqual(len(self.fit.laps[1].trackpoints), 5)
+    self.assertEqual(len(self.fit.sessions[0].laps), 2)
+
+  def test_trackpoint(self):
+    tp = self.fit.trackpoints[1]
+    self.assertEqual(tp.time, START_TIME + datetime.timedelta(seconds=1))
+    self.assertAlmostEqual(tp.lat, 40.0001, places=6)
+    self.assertAlmostEqual(tp.lon, -105.0, places=6)
+    self.assertAlmostEqual(tp.altitude_m, 1600.2)
+    self.assertEqual(tp.distance_m, 3.0)
+    self.assertEqual(tp.speed_ms, 3.0)
+    self.assertEqual(tp.hr, 141)
+    self.assertEqual(tp.cadence_rpm, 80)
+    self.assertEqual(tp.power_w, 201)
+
+  def test_invalid_values(self):
+    tp = self.fit.trackpoints[7]
+    self.assertIsNone(tp.lat)
+    self.assertIsNone(self.fit.trackpoints[8].hr)
+
+  def test_compressed_timestamps(self):
+    times = self.fit.columns(['time'])['time']
+    expected = np.datetime64(START_TIME.replace(tzinfo=None), 'ns') + np.array(
+      [0, 1, 2, 3, 4, 10, 11, 12, 13, 14], dtype='timedelta64[s]'
+    )
+    np.testing.assert_array_equal(times, expected)
+
+  def test_lap(self):
+    lap = self.fit.laps[0]
+    self.assertEqual(lap.start_time, START_TIME)
+    self.assertEqual(lap.total_time_s, 4.0)
+    self.assertEqual(lap.distance_m, 12.0)
+    self.assertEqual(lap.avg_speed_ms, 3.0)
+    self.assertEqual(lap.hr_max, 144)
+    self.assertEqual(lap.intensity, 'active')
+    self.assertEqual(lap.trigger_method, 'distance')
+    self.assertEqual(self.fit.laps[1].intensity, 'rest')
+
+  def test_session(self):
+    session = self.fit.sessions[0]
+    self.assertEqual(session.sport, 'running')
+    self.assertEqual(session.distance_m, 24.0)
+    self.assertEqual(session.hr_avg, 147)
+
+  def test_columns(self):
+    cols = self.fit.columns(['hr', 'lat', 'power_w'])
+    np.testing.assert_array_equal(cols['lap'], [0] * 5 + [1] * 5)
+    np.testing.assert_array_equal(cols['bout'], [0] * 5 + [1] * 5)
+    self.assertTrue(cols['hr'].mask[8])
+    self.assertTrue(np.isnan(cols['lat'][7]))
+    self.assertEqual(cols['power_w'].sum(), 5 * 200 + 10 + 5 * 210)
+
+    lap_cols = self.fit.laps[1].columns(['hr'])
+    np.testing.assert_array_equal(lap_cols['lap'], [0] * 5)
+
+  def test_pickle(self):
+    restored = pickle.loads(pickle.dumps(self.fit, protocol=5))
+    np.testing.assert_array_equal(
+      restored.columns(['distance_m'])['distance_m'],
+      self.fit.columns(['distance_m'])['distance_m']
+    )
+
+  def test_file_object(self):
+    fit_obj = fit.Fit.from_file(io.BytesIO(self.data))
+    self.assertEqual(len(fit_obj.trackpoints), 10)
+
+  def test_big_endian_and_developer_fields(self):
+    b = FitBuilder()
+    b.define(0, 20, [(253, 0x86), (3, 2), (7, 0x84)], big_endian=True, developer_sizes=(4,))
+    b.message(0, START, 150, 300)
+    b.message(0, START + 1, 151, 0xFFFF)
+    cols = fit.Fit.from_file(b.getvalue()).columns(['time', 'hr', 'power_w'])
+    np.testing.assert_array_equal(cols['hr'], [150, 151])
+    self.assertEqual(cols['power_w'][0], 300)
+    self.assertTrue(cols['power_w'].mask[1])
+    np.testing.assert_array_equal(cols['bout'], [0, 0])
+    np.testing.assert_array_equal(cols['lap'], [-1, -1])
+
+  def test_not_fit(self):
+    with self.assertRaises(ValueError):
+      fit.Fit.from_file(b'<gpx></gpx>  \n  \n')
+    with self.assertRaises(ValueError):
+      fit.Fit.from_file(self.data[:100])
+
+  def test_record_batch(self):
+    try:
+      import pyarrow  # noqa: F401
+    except ImportError:
+      self.skipTest('pyarrow is not installed')
+    from activereader import dataset
+
+    batch = dataset.to_record_batch(self.fit, activity_id='a')
+    self.assertEqual(batch.schema, dataset.get_schema())
+    self.assertEqual(batch.num_rows, 10)
+    self.assertEqual(batch.column('sport')[0].as_py(), 'running')
+    self.assertEqual(batch.column('device')[0].as_py(), 'garmin')
+    self.assertEqual(batch.column('trigger_method')[9].as_py(), 'manual')
+    self.assertEqual(batch.column('power_w')[0].as_py(), 200)
+
+  def test_exported(self):
+    self.assertIs(activereader.Fit, fit.Fit)
+
+
+if __name__ == '__main__':
+  unittest.main()
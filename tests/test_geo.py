@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+import numpy as np
+
+from activereader import geo, gpx, tcx
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+
+class TestGeo(unittest.TestCase):
+
+  def test_haversine(self):
+    # One degree of latitude is about 111.2 km.
+    self.assertAlmostEqual(geo.haversine(0, 0, 1, 0), 111195, delta=1)
+    np.testing.assert_allclose(
+      geo.haversine([0, 40], [0, -105], [0, 40], [0, -105]), [0, 0]
+    )
+
+  def test_bearing(self):
+    np.testing.assert_allclose(
+      geo.bearing([0, 0, 0], [0, 0, 0], [1, 0, -1], [0, 1, 0]),
+      [0, 90, 180]
+    )
+
+  def test_derived_columns(self):
+    # Two bouts, heading north at 1 degree per point, one point unpositioned.
+    columns = {
+      'lat': np.array([0.0, 0.001, np.nan, 0.002, 0.010, 0.011]),
+      'lon': np.zeros(6),
+      'altitude_m': np.array([100.0, 101.0, 101.0, 102.0, 120.0, 120.0]),
+      'time': np.datetime64('2021-04-16T13:37:53', 'ns') 
+        + np.array([0, 10, 15, 20, 60, 70], dtype='timedelta64[s]'),
+      'bout': np.array([0, 0, 0, 0, 1, 1]),
+    }
+    step = geo.haversine(0, 0, 0.001, 0)
+    derived = geo.derived_columns(columns)
+
+    np.testing.assert_allclose(
+      derived['distance_m'], 
+      [0, step, step, 2 * step, 2 * step, 3 * step]
+    )
+    np.testing.assert_allclose(
+      derived['speed_ms'], 
+      [np.nan, step / 10, np.nan, step / 10, np.nan, step / 10]
+    )
+    np.testing.assert_allclose(
+      derived['grade'], 
+      [np.nan, 1 / step, np.nan, 1 / step, np.nan, 0]
+    )
+    np.testing.assert_allclose(
+      derived['bearing_deg'], 
+      [np.nan, 0, np.nan, 0, np.nan, 0],
+      atol=1e-9
+    )
+
+  def test_course_distance(self):
+    course = tcx.Tcx.from_file(os.path.join(TESTDATA_DIR, 'testcourse.tcx'))
+    derived = course.derived_columns()
+    reported = course.columns(['distance_m'])['distance_m']
+    self.assertAlmostEqual(
+      derived['distance_m'][-1] / reported[-1], 1, delta=0.001
+    )
+
+  def test_gpx(self):
+    reader = gpx.Gpx.from_file(os.path.join(TESTDATA_DIR, 'testdata.gpx'))
+    derived = reader.derived_columns()
+    self.assertEqual(len(derived['distance_m']), len(reader.trackpoints))
+    self.assertTrue((np.diff(derived['distance_m']) >= 0).all())
+    self.assertTrue(np.isnan(derived['speed_ms'][0]))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+import activereader
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def modules_loaded_by(statement, names):
+  """Which of the named modules a statement imports, in a fresh interpreter."""
+  code = (
+    f'import json, sys\n{statement}\n'
+    f'print(json.dumps([name for name in {names!r} if name in sys.modules]))'
+  )
+  out = subprocess.run(
+    [sys.executable, '-c', code],
+    check=True, capture_output=True, text=True, cwd=REPO_DIR
+  ).stdout
+  return json.loads(out)
+
+
+class TestLazyImports(unittest.TestCase):
+
+  def test_package_import_is_light(self):
+    heavy = ['numpy', 'lxml.etree', 'dateutil', 'activereader.base']
+    self.assertEqual(modules_loaded_by('import activereader', heavy), [])
+
+  def test_readers_skip_unneeded_dependencies(self):
+    statement = (
+      'from activereader import Tcx\n'
+      'Tcx.from_file("tests/testdata.tcx").trackpoints[0].time'
+    )
+    self.assertEqual(
+      modules_loaded_by(statement, ['lxml.objectify', 'dateutil.parser']),
+      ['dateutil.parser']
+    )
+    self.assertEqual(
+      modules_loaded_by('from activereader import Tcx, Gpx, Fit', [
+        'lxml.objectify', 'dateutil.parser', 'dateutil.tz',
+      ]),
+      []
+    )
+
+  def test_analysis_modules_load_on_use(self):
+    analysis = [
+      'activereader.bouts', 'activereader.geo', 'activereader.polyline',
+      'activereader.query', 'activereader.resample', 'activereader.validation',
+    ]
+    self.assertEqual(modules_loaded_by('import activereader.base', analysis), [])
+    statement = (
+      'from activereader import Tcx\n'
+      'Tcx.from_file("tests/testdata.tcx").derived_columns()'
+    )
+    self.assertEqual(
+      modules_loaded_by(statement, analysis), ['activereader.geo']
+    )
+
+  def test_attributes(self):
+    from activereader import fit, tcx
+
+    self.assertIs(activereader.Tcx, tcx.Tcx)
+    self.assertIs(activereader.Fit, fit.Fit)
+    self.assertIs(activereader.splits, sys.modules['activereader.splits'])
+    self.assertIn('Gpx', dir(activereader))
+    self.assertIn('merge', dir(activereader))
+    with self.assertRaises(AttributeError):
+      activereader.Nope
+    for name in activereader.__all__:
+      self.assertTrue(hasattr(activereader, name))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+import numpy as np
+
+from activereader import gpx, merge, tcx
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+START = np.datetime64('2021-04-16T13:00:00', 'ns')
+
+
+def times(seconds):
+  return START + (np.array(seconds, dtype=np.float64) * 1e9).astype('timedelta64[ns]')
+
+
+class TestMerge(unittest.TestCase):
+
+  def setUp(self):
+    self.watch = {
+      'time': times([0, 1, 2, 3, 10]),
+      'hr': np.ma.MaskedArray([100, 101, 102, 103, 110], mask=[0, 0, 1, 0, 0]),
+      'lap': np.array([0, 0, 0, 1, 1]),
+    }
+    self.bike = {
+      'time': times([0.4, 1.4, 2.4, 5.0]),
+      'power_w': np.array([200.0, 210.0, 220.0, 250.0]),
+      'name': np.array(['a', 'b', 'c', 'd'], dtype=object),
+    }
+
+  def test_first(self):
+    merged = merge.merge({'watch': self.watch, 'bike': self.bike}, tolerance_s=0.5)
+    self.assertEqual(
+      list(merged), ['time', 'watch_hr', 'watch_lap', 'bike_power_w', 'bike_name']
+    )
+    np.testing.assert_array_equal(merged['time'], self.watch['time'])
+    np.testing.assert_array_equal(merged['watch_hr'].mask, [0, 0, 1, 0, 0])
+    np.testing.assert_array_equal(merged['bike_power_w'], [200, 210, 220, np.nan, np.nan])
+    self.assertEqual(list(merged['bike_name']), ['a', 'b', 'c', None, None])
+
+  def test_tolerance(self):
+    merged = merge.merge({'watch': self.watch, 'bike': self.bike}, tolerance_s=0.3)
+    self.assertTrue(np.isnan(merged['bike_power_w']).all())
+
+  def test_backward(self):
+    merged = merge.merge(
+      {'bike': self.bike, 'watch': self.watch}, tolerance_s=3, direction='backward'
+    )
+    np.testing.assert_array_equal(merged['watch_hr'], [100, 101, 102, 103])
+    np.testing.assert_array_equal(merged['watch_hr'].mask, [0, 0, 1, 0])
+    np.testing.assert_array_equal(merged['watch_lap'], [0, 0, 0, 1])
+
+    merged = merge.merge(
+      {'bike': self.bike, 'watch': self.watch}, tolerance_s=1, direction='backward'
+    )
+    np.testing.assert_array_equal(merged['watch_lap'], [0, 0, 0, -1])
+
+  def test_outer(self):
+    merged = merge.merge(
+      {'watch': self.watch, 'bike': self.bike}, tolerance_s=0, how='outer'
+    )
+    self.assertEqual(len(merged['time']), 9)
+    self.assertTrue(np.all(merged['time'][1:] > merged['time'][:-1]))
+    self.assertEqual(np.count_nonzero(merged['watch_lap'] >= 0), 5)
+    self.assertEqual(np.count_nonzero(~np.isnan(merged['bike_power_w'])), 4)
+
+  def test_missing_times(self):
+    self.bike['time'][1] = np.datetime64('NaT')
+    self.watch['time'][0] = np.datetime64('NaT')
+    merged = merge.merge({'watch': self.watch, 'bike': self.bike}, tolerance_s=0.5)
+    np.testing.assert_array_equal(merged['bike_power_w'], [np.nan, np.nan, 220, np.nan, np.nan])
+
+  def test_arguments(self):
+    with self.assertRaises(ValueError):
+      merge.merge({'watch': self.watch}, how='inner')
+    with self.assertRaises(ValueError):
+      merge.merge({'watch': self.watch}, direction='forward')
+
+  def test_elements(self):
+    tcx_obj = tcx.Tcx.from_file(os.path.join(TESTDATA_DIR, 'testdata.tcx'))
+    gpx_obj = gpx.Gpx.from_file(os.path.join(TESTDATA_DIR, 'testdata.gpx'))
+    merged = merge.merge(
+      {'watch': tcx_obj, 'phone': gpx_obj}, fields=['hr', 'distance_m', 'lat']
+    )
+    self.assertEqual(
+      list(merged),
+      ['time', 'watch_hr', 'watch_distance_m', 'watch_lat', 'watch_bout',
+       'watch_lap', 'phone_hr', 'phone_lat', 'phone_bout', 'phone_track']
+    )
+    self.assertEqual(len(merged['phone_lat']), len(tcx_obj.trackpoints))
+    matched = ~np.isnan(merged['phone_lat'])
+    self.assertTrue(matched.any())
+    np.testing.assert_allclose(
+      merged['phone_lat'][matched], merged['watch_lat'][matched], atol=1e-3
+    )
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import functools
+import os
+import unittest
+
+import numpy as np
+
+from activereader import gpx, polyline, simplify, tcx
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+
+class TestPolyline(unittest.TestCase):
+
+  def test_encode(self):
+    # The example from Google's documentation of the format.
+    self.assertEqual(
+      polyline.encode([38.5, 40.7, np.nan, 43.252], [-120.2, -120.95, 0, -126.453]),
+      '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+    )
+    self.assertEqual(polyline.encode([], []), '')
+
+  def test_decode(self):
+    lat, lon = polyline.decode('_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+    np.testing.assert_allclose(lat, [38.5, 40.7, 43.252])
+    np.testing.assert_allclose(lon, [-120.2, -120.95, -126.453])
+    for bad in ('_p~iF~ps|U_', '_p~iF', '_p~iF ps|U'):
+      with self.assertRaises(ValueError):
+        polyline.decode(bad)
+
+  def test_roundtrip(self):
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(-90, 90, 1000)
+    lon = rng.uniform(-180, 180, 1000)
+    for precision in (5, 6):
+      decoded = polyline.decode(polyline.encode(lat, lon, precision), precision)
+      np.testing.assert_allclose(decoded[0], np.round(lat, precision), atol=1e-9)
+      np.testing.assert_allclose(decoded[1], np.round(lon, precision), atol=1e-9)
+
+  def test_elements(self):
+    gpx_obj = gpx.Gpx.from_file(os.path.join(TESTDATA_DIR, 'testdata.gpx'))
+    tcx_obj = tcx.Tcx.from_file(os.path.join(TESTDATA_DIR, 'testdata.tcx'))
+    for element in (gpx_obj.tracks[0], gpx_obj.segments[0], tcx_obj.laps[0], tcx_obj):
+      lat, lon = polyline.decode(element.to_polyline())
+      expected = [(tp.lat, tp.lon) for tp in element.trackpoints if tp.lat is not None]
+      np.testing.assert_allclose(np.column_stack([lat, lon]), expected, atol=1e-5)
+
+    mask = functools.partial(simplify.douglas_peucker, tolerance_m=5)
+    track = gpx_obj.tracks[0]
+    lat, _ = polyline.decode(track.to_polyline(simplify=mask))
+    self.assertEqual(len(lat), mask(track.columns(['lat', 'lon'])).sum())
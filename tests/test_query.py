@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import datetime
+import os
+import unittest
+
+import numpy as np
+from dateutil import tz
+
+from activereader import gpx, query, tcx
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+
+class TestMask(unittest.TestCase):
+
+  def setUp(self):
+    self.columns = {
+      'hr': np.ma.MaskedArray([150, 161, 170, 0], mask=[False, False, False, True]),
+      'speed_ms': np.array([3.0, np.nan, 4.5, 5.0]),
+      'time': np.array(
+        ['2021-04-16T13:00:00', 'NaT', '2021-04-16T13:00:02', '2021-04-16T13:00:03'],
+        dtype='datetime64[ns]'
+      ),
+    }
+
+  def check(self, expected, **conditions):
+    parsed = query.parse_conditions(conditions, self.columns)
+    np.testing.assert_array_equal(query.mask(self.columns, parsed), expected)
+
+  def test_comparisons(self):
+    self.check([False, True, True, False], hr__gt=160)
+    self.check([True, False, False, False], hr=150)
+    self.check([False, True, True, False], hr__ne=150)
+    self.check([True, False, True, False], speed_ms__lt=5)
+    self.check([True, False, True, False], hr__in=[150, 170])
+
+  def test_missing(self):
+    self.check([False, False, False, True], hr__isnull=True)
+    self.check([True, False, True, True], speed_ms__isnull=False)
+    self.check([True, False, True, False], time__isnull=False, hr__isnull=False)
+
+  def test_times(self):
+    self.check(
+      [False, False, True, True],
+      time__between=('2021-04-16T13:00:01Z', datetime.datetime(2021, 4, 16, 13, 0, 3, tzinfo=tz.UTC))
+    )
+    self.check([True, False, False, False], time__lt=np.datetime64('2021-04-16T13:00:01'))
+
+  def test_combined(self):
+    self.check([False, False, True, False], hr__gt=160, speed_ms__gt=4)
+
+  def test_errors(self):
+    with self.assertRaises(KeyError):
+      query.parse_conditions({'watts__gt': 1}, self.columns)
+    with self.assertRaises(ValueError):
+      query.parse_conditions({'hr__above': 1}, self.columns)
+
+
+class TestWhere(unittest.TestCase):
+
+  def setUp(self):
+    self.tcx = tcx.Tcx.from_file(os.path.join(TESTDATA_DIR, 'testdata.tcx'))
+
+  def test_offsets_match_wrappers(self):
+    expected = [
+      i for i, tp in enumerate(self.tcx.trackpoints)
+      if tp.hr is not None and tp.hr > 90 and tp.cadence_rpm
+    ]
+    offsets = self.tcx.where(offsets=True, hr__gt=90, cadence_rpm__gt=0)
+    np.testing.assert_array_equal(offsets, expected)
+
+  def test_columns(self):
+    cols = self.tcx.where(['time', 'hr', 'distance_m'], hr__ge=90)
+    self.assertEqual(list(cols), ['time', 'hr', 'distance_m', 'bout', 'lap'])
+    self.assertTrue(np.all(cols['hr'] >= 90))
+
+    all_cols = self.tcx.columns(['time', 'distance_m'])
+    keep = np.ma.filled(self.tcx.columns(['hr'])['hr'] >= 90, False)
+    np.testing.assert_array_equal(cols['distance_m'], all_cols['distance_m'][keep])
+    np.testing.assert_array_equal(cols['time'], all_cols['time'][keep])
+    np.testing.assert_array_equal(cols['lap'], self.tcx.columns([])['lap'][keep])
+
+  def test_time_range_on_lap(self):
+    lap = self.tcx.laps[0]
+    times = lap.columns(['time'])['time']
+    offsets = lap.where(offsets=True, time__between=(times[2], times[5]))
+    np.testing.assert_array_equal(offsets, [2, 3, 4, 5])
+
+  def test_containers(self):
+    offsets = self.tcx.where(offsets=True, lap=2)
+    self.assertEqual(len(offsets), len(self.tcx.laps[2].trackpoints))
+
+  def test_compact(self):
+    expected = self.tcx.where(['hr', 'lat'], hr__lt=80)
+    self.tcx.compact()
+    actual = self.tcx.where(['hr', 'lat'], hr__lt=80)
+    for name in expected:
+      np.testing.assert_array_equal(actual[name], expected[name])
+
+  def test_gpx_segment(self):
+    gpx_obj = gpx.Gpx.from_file(os.path.join(TESTDATA_DIR, 'testdata.gpx'))
+    segment = gpx_obj.tracks[0].segments[0]
+    cols = segment.where(['lat', 'lon'], lat__gt=40.0)
+    self.assertTrue(np.all(cols['lat'] > 40.0))
+
+  def test_unknown_field(self):
+    with self.assertRaises(KeyError):
+      self.tcx.where(['watts'], hr__gt=1)
+
+
+if __name__ == '__main__':
+  unittest.main()
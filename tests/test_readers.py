@@ -4,7 +4,9 @@ import unittest
 import datetime
 import io
 import os
+import pickle
 
+import numpy as np
 from lxml import etree
 
 from activereader import tcx, gpx
@@ -38,6 +40,92 @@ class ActivityElementTestMixin(object):
     
     # print(etree.tostring(r1, encoding=str, pretty_print=False))
 
+  def check_same_data(self, elem, other, max_descendents=20):
+    """Check that two elements' properties match, recursing into descendents."""
+    for name in dir(type(elem)):
+      if name.startswith('_') or name == 'is_compact':
+        continue
+      if not isinstance(getattr(type(elem), name), property):
+        continue
+      try:
+        value = getattr(elem, name)
+      except (TypeError, IndexError):
+        # eg. Tcx.calories of a course file, whose laps have no calories.
+        continue
+      other_value = getattr(other, name)
+      if isinstance(value, list):
+        self.assertEqual(len(value), len(other_value), name)
+        for e, o in list(zip(value, other_value))[:max_descendents]:
+          self.check_same_data(e, o, max_descendents=max_descendents)
+      else:
+        self.assertEqual(value, other_value, name)
+
+  def test_compact(self):
+    reader = self.reader.from_file(self.TESTDATA_FILENAME)
+    compacted = self.reader.from_file(self.TESTDATA_FILENAME, keep_tree=False)
+
+    self.assertIsNone(compacted.elem)
+    self.assertTrue(compacted.is_compact)
+    self.assertFalse(reader.is_compact)
+    self.check_same_data(reader, compacted)
+
+    cols = reader.columns()
+    compact_cols = compacted.columns()
+    self.assertEqual(list(cols), list(compact_cols))
+    for name in cols:
+      self.assertEqual(
+        np.ma.getmask(cols[name]).tolist(), 
+        np.ma.getmask(compact_cols[name]).tolist()
+      )
+      np.testing.assert_array_equal(
+        np.ma.getdata(cols[name]), np.ma.getdata(compact_cols[name]), name
+      )
+
+    with self.assertRaises(ValueError):
+      compacted.leaf_paths()
+    with self.assertRaises(KeyError):
+      compacted.column('Extensions/not_a_field')
+
+  def test_pickle(self):
+    reader = self.reader.from_file(self.TESTDATA_FILENAME)
+
+    buffers = []
+    data = pickle.dumps(reader, protocol=5, buffer_callback=buffers.append)
+    self.assertGreater(len(buffers), 0)
+    unpickled = pickle.loads(data, buffers=buffers)
+
+    self.assertIsNotNone(reader.elem)
+    self.assertTrue(unpickled.is_compact)
+    self.check_same_data(reader, unpickled)
+
+    # Compact elements and sub-elements pickle too, with any protocol.
+    compacted = pickle.loads(pickle.dumps(reader.compact()))
+    self.check_same_data(unpickled, compacted)
+    for lap_or_track in (reader.tracks or [])[:2]:
+      self.check_same_data(lap_or_track, pickle.loads(pickle.dumps(lap_or_track)))
+
+    # A single trackpoint from a tree keeps its own data.
+    reader = self.reader.from_file(self.TESTDATA_FILENAME)
+    for trackpoint in reader.trackpoints[:10:3]:
+      unpickled = pickle.loads(pickle.dumps(trackpoint))
+      for name, prop in type(trackpoint)._fields().items():
+        path = getattr(prop, 'path', None)
+        if path is not None:
+          self.assertEqual(
+            unpickled.get_data(path, prop.conv_type),
+            trackpoint.get_data(path, prop.conv_type), name
+          )
+        self.assertEqual(getattr(unpickled, name), getattr(trackpoint, name), name)
+
+  def test_analysis_methods_on_containers_only(self):
+    reader = self.reader.from_file(self.TESTDATA_FILENAME)
+    containers = [reader] + list(reader.tracks or [])[:1]
+    point = (reader.trackpoints or reader.routepoints)[0]
+    for name in ('resample', 'derived_columns', 'splits', 'where', 'to_polyline'):
+      for element in containers:
+        self.assertTrue(hasattr(element, name), name)
+      self.assertFalse(hasattr(point, name), name)
+
   def check_attr_types(self, activity_elem, expected_attr_types):
     """Check that each attribute exists and is of the correct type.
 
@@ -196,6 +284,51 @@ class TestTcxFileReader(ActivityElementTestMixin, unittest.TestCase):
       )
     )
 
+  def test_columns(self):
+    reader = self.reader.from_file(self.TESTDATA_FILENAME)
+    cols = reader.columns()
+    trackpoints = reader.trackpoints
+
+    for name in ['time', 'lat', 'lon', 'distance_m', 'altitude_m', 'hr',
+                 'speed_ms', 'cadence_rpm', 'bout', 'lap']:
+      self.assertIn(name, cols)
+      self.assertEqual(len(cols[name]), len(trackpoints))
+
+    self.assertEqual(cols['hr'].tolist(), [tp.hr for tp in trackpoints])
+    self.assertEqual(
+      cols['distance_m'].tolist(), 
+      [tp.distance_m for tp in trackpoints]
+    )
+    self.assertEqual(
+      cols['time'][0].astype('datetime64[ms]').item(),
+      trackpoints[0].time.replace(tzinfo=None)
+    )
+    self.assertEqual(np.unique(cols['lap']).tolist(), list(range(reader.num_laps)))
+    self.assertEqual(np.unique(cols['bout']).tolist(), list(range(reader.num_bouts)))
+
+    lap_cols = reader.laps[1].columns(['hr'])
+    self.assertEqual(lap_cols['hr'].tolist(), [tp.hr for tp in reader.laps[1].trackpoints])
+    self.assertTrue((lap_cols['lap'] == 0).all())
+
+    with self.assertRaises(KeyError):
+      reader.columns(['not_a_field'])
+
+  def test_column(self):
+    reader = self.reader.from_file(self.TESTDATA_FILENAME)
+
+    self.assertEqual(
+      reader.column('Extensions/TPX/Speed').tolist(),
+      [tp.speed_ms for tp in reader.trackpoints]
+    )
+    self.assertTrue(np.isnan(reader.laps[0].column('Extensions/TPX/Watts')).all())
+    self.assertEqual(
+      dict(reader.leaf_paths('Extensions')),
+      {
+        'Extensions/TPX/Speed': reader.num_records,
+        'Extensions/TPX/RunCadence': reader.num_records,
+      }
+    )
+
 
 class TestGpxFileReader(ActivityElementTestMixin, unittest.TestCase):
 
@@ -269,6 +402,32 @@ class TestGpxFileReader(ActivityElementTestMixin, unittest.TestCase):
       )
     )
 
+  def test_columns(self):
+    reader = self.reader.from_file(self.TESTDATA_FILENAME)
+    cols = reader.columns()
+    trackpoints = reader.trackpoints
+
+    self.assertEqual(cols['lat'].tolist(), [tp.lat for tp in trackpoints])
+    self.assertEqual(cols['hr'].tolist(), [tp.hr for tp in trackpoints])
+    self.assertTrue((cols['bout'] == 0).all())
+    self.assertTrue((cols['track'] == 0).all())
+
+  def test_column(self):
+    segment = self.reader.from_file(self.TESTDATA_FILENAME).segments[0]
+
+    self.assertEqual(
+      segment.column('extensions/TrackPointExtension/hr', int).tolist(),
+      [tp.hr for tp in segment.trackpoints]
+    )
+    self.assertEqual(
+      segment.column('@lon').tolist(),
+      [tp.lon for tp in segment.trackpoints]
+    )
+    self.assertEqual(
+      list(segment.leaf_paths('extensions')),
+      ['extensions/TrackPointExtension/hr', 'extensions/TrackPointExtension/cad']
+    )
+
 
 class TestGpxFileReaderCourse(ActivityElementTestMixin, unittest.TestCase):
   TESTDATA_FILENAME = os.path.join(os.path.dirname(__file__), 'testcourse.gpx')
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+import numpy as np
+
+from activereader import tcx
+from activereader.resample import resample_columns
+
+
+def make_columns(seconds, bouts, hr):
+  return {
+    'time': np.datetime64('2021-04-16T13:37:53', 'ns') 
+      + (np.array(seconds) * 1e9).astype('timedelta64[ns]'),
+    'hr': np.ma.MaskedArray(
+      [0 if v is None else v for v in hr], 
+      mask=[v is None for v in hr]
+    ),
+    'bout': np.array(bouts),
+  }
+
+
+class TestResample(unittest.TestCase):
+
+  def test_interpolate(self):
+    cols = make_columns([0, 2, 3, 6], [0, 0, 0, 0], [100, 110, None, 130])
+    result = resample_columns(cols, freq_s=1)
+    self.assertEqual(len(result['time']), 7)
+    np.testing.assert_allclose(
+      result['hr'], 
+      [100, 105, 110, 115, 120, 125, 130]
+    )
+    self.assertEqual(result['bout'].tolist(), [0] * 7)
+
+  def test_bouts(self):
+    cols = make_columns([0, 2, 5, 7], [0, 0, 1, 1], [100, 110, 150, 160])
+
+    dropped = resample_columns(cols, freq_s=1)
+    self.assertEqual(
+      (dropped['time'] - cols['time'][0]).astype('timedelta64[s]').astype(int).tolist(),
+      [0, 1, 2, 5, 6, 7]
+    )
+    np.testing.assert_allclose(dropped['hr'], [100, 105, 110, 150, 155, 160])
+    self.assertEqual(dropped['bout'].tolist(), [0, 0, 0, 1, 1, 1])
+
+    kept = resample_columns(cols, freq_s=1, gap='nan')
+    self.assertEqual(len(kept['time']), 8)
+    self.assertTrue(np.isnan(kept['hr'][3:5]).all())
+    self.assertEqual(kept['bout'].tolist(), [0, 0, 0, -1, -1, 1, 1, 1])
+
+  def test_max_gap(self):
+    cols = make_columns([0, 1, 10, 11], [0, 0, 0, 0], [100, 100, 120, 120])
+    self.assertEqual(len(resample_columns(cols)['time']), 12)
+    self.assertEqual(len(resample_columns(cols, max_gap_s=5)['time']), 4)
+
+  def test_grid_alignment(self):
+    cols = make_columns([0.5, 3.5], [0, 0], [100, 130])
+    result = resample_columns(cols, freq_s=1)
+    self.assertEqual(len(result['time']), 3)
+    np.testing.assert_allclose(result['hr'], [105, 115, 125])
+
+  def test_raises(self):
+    cols = make_columns([0, 1], [0, 0], [100, 100])
+    with self.assertRaises(ValueError):
+      resample_columns(cols, gap='bridge')
+    with self.assertRaises(ValueError):
+      resample_columns(cols, freq_s=0)
+
+  def test_element(self):
+    reader = tcx.Tcx.from_file(
+      os.path.join(os.path.dirname(__file__), 'testdata.tcx')
+    )
+    lap = reader.laps[1]
+    result = lap.resample(1, fields=['hr'])
+    self.assertEqual(set(result), {'time', 'hr', 'bout', 'lap'})
+    steps = np.diff(result['time']).astype('timedelta64[s]').astype(int)
+    self.assertTrue((steps == 1).all())
+    self.assertEqual(result['hr'][0], lap.trackpoints[0].hr)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+import unittest
+
+from activereader import tcx
+from activereader.shared import SharedElement
+
+
+TESTDATA_FILENAME = os.path.join(os.path.dirname(__file__), 'testdata.tcx')
+
+
+class TestSharedElement(unittest.TestCase):
+
+  def test_roundtrip(self):
+    reader = tcx.Tcx.from_file(TESTDATA_FILENAME)
+
+    with SharedElement(reader) as handle:
+      self.assertGreater(handle.nbytes, 0)
+
+      # What a worker process would receive.
+      attached = pickle.loads(pickle.dumps(handle))
+      self.assertEqual(attached.name, handle.name)
+
+      shared = attached.load()
+      self.assertTrue(shared.is_compact)
+      self.assertEqual(shared.num_records, reader.num_records)
+      self.assertEqual(
+        [tp.hr for tp in shared.trackpoints],
+        [tp.hr for tp in reader.trackpoints]
+      )
+      hr = shared.columns(['hr'])['hr']
+      self.assertEqual(hr.tolist(), [tp.hr for tp in reader.trackpoints])
+
+      del shared, hr
+      attached.close()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import functools
+import os
+import unittest
+
+import numpy as np
+from lxml import etree
+
+from activereader import gpx, simplify, tcx
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+
+def make_columns(lat, lon, seconds=None, bout_ids=None):
+  columns = {
+    'lat': np.array(lat, dtype=np.float64),
+    'lon': np.array(lon, dtype=np.float64),
+  }
+  if seconds is not None:
+    columns['time'] = np.datetime64('2021-04-16T13:37:50', 'ns') \
+      + np.array(seconds, dtype='timedelta64[s]')
+  if bout_ids is not None:
+    columns['bout'] = np.array(bout_ids)
+  return columns
+
+
+class TestSimplify(unittest.TestCase):
+
+  def test_douglas_peucker(self):
+    # About 1.1 m of wiggle along a straight line, then a corner.
+    columns = make_columns(
+      [0, 0.00001, 0, np.nan, 0, 0.001],
+      [0, 0.001, 0.002, 0.0025, 0.003, 0.003]
+    )
+    self.assertEqual(
+      simplify.douglas_peucker(columns, 5).tolist(),
+      [True, False, False, False, True, True]
+    )
+    self.assertEqual(
+      simplify.douglas_peucker(columns, 0.5).tolist(),
+      [True, True, True, False, True, True]
+    )
+
+  def test_bouts(self):
+    columns = make_columns([0, 0, 0, 0], [0, 0.001, 0.002, 0.003], bout_ids=[0, 0, 1, 1])
+    self.assertTrue(simplify.douglas_peucker(columns, 5).all())
+
+  def test_decimate(self):
+    columns = make_columns(
+      [0] * 7, np.arange(7) * 0.0001, seconds=[0, 5, 9, 10, 12, 21, 22]
+    )
+    self.assertEqual(
+      simplify.decimate(columns, interval_s=10).tolist(),
+      [True, False, False, True, False, True, True]
+    )
+    # Each step is about 11 m.
+    self.assertEqual(
+      simplify.decimate(columns, distance_m=25).tolist(),
+      [True, False, False, True, False, True, True]
+    )
+    with self.assertRaises(ValueError):
+      simplify.decimate(columns)
+
+  def test_stream_chunks(self):
+    gpx_obj = gpx.Gpx.from_file(os.path.join(TESTDATA_DIR, 'testdata.gpx'))
+    mask = functools.partial(simplify.decimate, interval_s=10)
+    expected = mask(gpx_obj.columns())
+
+    root = etree.parse(os.path.join(TESTDATA_DIR, 'testdata.gpx')).getroot()
+    stream = simplify.StreamSimplifier(mask, gpx.Trackpoint, chunk_size=8)
+    for elem in root.iter('{*}trkpt'):
+      stream.add(elem)
+    stream.flush()
+    kept = root.findall('.//{*}trkpt')
+
+    # Chunk ends are kept as well, so the stream keeps a few extra.
+    self.assertGreaterEqual(len(kept), expected.sum())
+    self.assertLess(len(kept), len(expected))
+    kept_times = {elem.findtext('{*}time') for elem in kept}
+    for trackpoint in np.array(gpx_obj.trackpoints)[expected]:
+      self.assertIn(trackpoint.get_data('time'), kept_times)
+
+  def test_from_file(self):
+    for reader, filename in ((tcx.Tcx, 'testdata.tcx'), (gpx.Gpx, 'testdata.gpx')):
+      path = os.path.join(TESTDATA_DIR, filename)
+      mask = functools.partial(simplify.douglas_peucker, tolerance_m=5)
+      full = reader.from_file(path)
+      expected = [tp.time for tp, kept in zip(full.trackpoints, mask(full.columns())) if kept]
+
+      simplified = reader.from_file(path, simplify=mask)
+      self.assertEqual([tp.time for tp in simplified.trackpoints], expected)
+      self.assertLess(len(expected), len(full.trackpoints))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import unittest
+
+import numpy as np
+
+from activereader import gpx
+from activereader.spatial import GridIndex, Hit
+
+
+class TestGridIndex(unittest.TestCase):
+
+  def setUp(self):
+    self.index = GridIndex(cell_deg=0.01)
+    # Heads east along 40N, leaves the index's view, then comes back.
+    self.index.add('east', [40.001] * 4 + [np.nan, 40.001], [-105.005, -104.995, -104.985, -104.975, np.nan, -104.975])
+    self.index.add('south', [-33.005, -33.015], [151.005, 151.005])
+
+  def test_within(self):
+    self.assertEqual(
+      self.index.within(40.0, -105.0, 40.01, -104.98),
+      [Hit('east', 1, 3)]
+    )
+    self.assertEqual(
+      self.index.within(-34, 150, -33, 152),
+      [Hit('south', 0, 2)]
+    )
+    self.assertEqual(self.index.within(0, 0, 1, 1), [])
+
+  def test_antimeridian(self):
+    self.index.add('dateline', [0.005, 0.005], [179.995, -179.995])
+    self.assertEqual(
+      self.index.within(-1, 179, 1, -179),
+      [Hit('dateline', 0, 2)]
+    )
+    self.assertEqual(
+      self.index.near(0.005, 179.999, 1000),
+      [Hit('dateline', 0, 2)]
+    )
+
+  def test_near(self):
+    self.assertEqual(
+      self.index.near(40.005, -104.975, 100),
+      [Hit('east', 3, 4), Hit('east', 5, 6)]
+    )
+    self.assertEqual(
+      self.index.near(40.005, -104.975, 1000),
+      [Hit('east', 2, 4), Hit('east', 5, 6)]
+    )
+
+  def test_incremental(self):
+    self.index.within(0, 0, 1, 1)
+    self.index.add('later', [40.005], [-104.975])
+    self.assertIn('later', self.index)
+    self.assertEqual(len(self.index), 3)
+    self.assertEqual(
+      self.index.near(40.005, -104.975, 100)[-1],
+      Hit('later', 0, 1)
+    )
+    with self.assertRaises(ValueError):
+      self.index.add('later', [], [])
+
+  def test_save_load(self):
+    buffer = io.BytesIO()
+    self.index.save(buffer)
+    buffer.seek(0)
+    loaded = GridIndex.load(buffer)
+    self.assertEqual(loaded.cell_deg, self.index.cell_deg)
+    self.assertEqual(
+      loaded.within(-90, -180, 90, 180),
+      self.index.within(-90, -180, 90, 180)
+    )
+    loaded.add('later', [40.005], [-104.975])
+    self.assertEqual(len(loaded), 3)
+
+  def test_activity(self):
+    gpx_obj = gpx.Gpx.from_file(os.path.join(os.path.dirname(__file__), 'testdata.gpx'))
+    index = GridIndex(cell_deg=0.001)
+    index.add_activity('testdata.gpx', gpx_obj)
+    trackpoint = gpx_obj.trackpoints[20]
+    hits = index.near(trackpoint.lat, trackpoint.lon, 10)
+    self.assertTrue(any(hit.start <= 20 < hit.stop for hit in hits))
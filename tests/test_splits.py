@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+import numpy as np
+
+from activereader import gpx, splits, tcx
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+START = np.datetime64('2021-04-16T13:00:00', 'ns')
+
+
+def make_columns(seconds, distance, **others):
+  columns = {
+    'time': START + (np.array(seconds, dtype=np.float64) * 1e9).astype('timedelta64[ns]'),
+    'distance_m': np.array(distance, dtype=np.float64),
+  }
+  columns.update({name: np.array(values, dtype=np.float64) for name, values in others.items()})
+  return columns
+
+
+class TestSplits(unittest.TestCase):
+
+  def test_distance_boundaries_interpolated(self):
+    # 4 m/s for 10 s, then 2 m/s.
+    columns = make_columns(
+      [0, 10, 20, 30], [0, 40, 60, 80], hr=[100, 110, 120, 130]
+    )
+    table = splits.splits(columns, distance_m=50)
+    np.testing.assert_allclose(table['distance_m'], [50, 30])
+    np.testing.assert_allclose(table['time_s'], [15, 15])
+    np.testing.assert_allclose(table['speed_ms'], [50 / 15, 2])
+    np.testing.assert_allclose(table['pace_s_per_km'], [300, 500])
+    np.testing.assert_array_equal(table['start_time'], START + np.array([0, 15], dtype='timedelta64[s]'))
+    np.testing.assert_allclose(table['hr_avg'], [105, 125])
+    np.testing.assert_allclose(table['hr_max'], [110, 130])
+
+  def test_time_splits(self):
+    columns = make_columns(
+      [0, 5, 10, 15, 20], [0, 10, 30, 40, 50], altitude_m=[10, 12, 11, 15, 14]
+    )
+    table = splits.splits(columns, time_s=10)
+    np.testing.assert_allclose(table['time_s'], [10, 10])
+    np.testing.assert_allclose(table['distance_m'], [30, 20])
+    np.testing.assert_allclose(table['elevation_gain_m'], [2, 4])
+    np.testing.assert_allclose(table['elevation_loss_m'], [1, 1])
+    self.assertTrue(np.isnan(table['hr_avg']).all())
+
+  def test_exact_multiple(self):
+    table = splits.splits(make_columns([0, 1, 2, 3], [0, 1, 2, 3]), distance_m=1)
+    np.testing.assert_allclose(table['distance_m'], [1, 1, 1])
+
+  def test_missing_data(self):
+    columns = make_columns([0, 1, 2, 3], [0, np.nan, 2, 3])
+    columns['time'][3] = np.datetime64('NaT')
+    table = splits.splits(columns, distance_m=1)
+    np.testing.assert_allclose(table['distance_m'], [1, 1])
+    np.testing.assert_allclose(table['time_s'], [1, 1])
+
+    empty = splits.splits(make_columns([0], [0]), distance_m=1)
+    self.assertEqual(len(empty['time_s']), 0)
+
+  def test_arguments(self):
+    columns = make_columns([0, 1], [0, 1])
+    with self.assertRaises(ValueError):
+      splits.splits(columns)
+    with self.assertRaises(ValueError):
+      splits.splits(columns, distance_m=1, time_s=1)
+    with self.assertRaises(ValueError):
+      splits.splits(columns, distance_m=0)
+
+  def test_tcx(self):
+    tcx_obj = tcx.Tcx.from_file(os.path.join(TESTDATA_DIR, 'testcourse.tcx'))
+    table = tcx_obj.splits(distance_m=splits.KM_M)
+    total = tcx_obj.columns(['distance_m'])['distance_m']
+    self.assertEqual(len(table['distance_m']), int(np.ceil(total[-1] / 1000)))
+    np.testing.assert_allclose(table['distance_m'][:-1], 1000)
+    self.assertAlmostEqual(table['distance_m'].sum(), total[-1] - total[0])
+
+  def test_gpx_uses_positions(self):
+    gpx_obj = gpx.Gpx.from_file(os.path.join(TESTDATA_DIR, 'testdata.gpx'))
+    table = gpx_obj.splits(distance_m=100)
+    derived = gpx_obj.derived_columns()['distance_m']
+    self.assertAlmostEqual(table['distance_m'].sum(), np.nanmax(derived))
+    self.assertFalse(np.isnan(table['hr_avg']).any())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import datetime
+import os
+import unittest
+
+import numpy as np
+from dateutil import tz
+
+from activereader import tcx
+from activereader.timeindex import TimeIndex
+
+
+START = np.datetime64('2021-04-16T13:37:53', 'ns')
+
+
+def make_index(seconds):
+  times = START + (np.array(seconds, dtype=np.float64) * 1e9).astype('timedelta64[ns]')
+  return TimeIndex({'time': times, 'hr': np.arange(len(times))})
+
+
+class TestTimeIndex(unittest.TestCase):
+
+  def test_between(self):
+    index = make_index([0, 1, 2, 3, 4])
+    self.assertTrue(index.is_monotonic)
+    self.assertEqual(
+      index.between('2021-04-16T13:37:54Z', '2021-04-16T13:37:56Z'),
+      slice(1, 4)
+    )
+    self.assertEqual(
+      index.between(START + np.timedelta64(1, 's'), None, inclusive=False),
+      slice(1, 5)
+    )
+    self.assertEqual(index.between(None, START, inclusive=False), slice(0, 0))
+    self.assertEqual(
+      index.window(START, START + np.timedelta64(1, 's'))['hr'].tolist(),
+      [0, 1]
+    )
+
+  def test_asof_nearest(self):
+    index = make_index([0, 10, 20])
+    local = datetime.datetime(2021, 4, 16, 9, 38, 5, tzinfo=tz.gettz('America/New_York'))
+    self.assertEqual(index.asof(local), 1)
+    self.assertEqual(index.nearest(local), 1)
+    self.assertEqual(index.asof(START - np.timedelta64(1, 's')), -1)
+    self.assertEqual(
+      index.nearest(START + np.array([-5, 4, 5, 6, 99], dtype='timedelta64[s]')).tolist(),
+      [0, 0, 0, 1, 2]
+    )
+
+  def test_non_monotonic(self):
+    times = START + np.array([0, 20, 10, -1, 30], dtype='timedelta64[s]')
+    times[3] = np.datetime64('NaT')
+    index = TimeIndex({'time': times})
+    self.assertFalse(index.is_monotonic)
+    self.assertEqual(len(index), 4)
+    self.assertEqual(
+      index.between(START + np.timedelta64(5, 's'), START + np.timedelta64(25, 's')).tolist(),
+      [1, 2]
+    )
+    self.assertEqual(index.asof(START + np.timedelta64(15, 's')), 2)
+    self.assertEqual(index.nearest(START + np.timedelta64(17, 's')), 1)
+
+  def test_empty(self):
+    index = make_index([])
+    self.assertEqual(index.asof(START), -1)
+    self.assertEqual(index.nearest(START), -1)
+    self.assertEqual(index.between(None, None), slice(0, 0))
+
+  def test_activity(self):
+    tcx_obj = tcx.Tcx.from_file(os.path.join(os.path.dirname(__file__), 'testdata.tcx'))
+    index = tcx_obj.time_index(['hr'])
+    trackpoints = tcx_obj.trackpoints
+    middle = trackpoints[len(trackpoints) // 2]
+    self.assertEqual(trackpoints[index.nearest(middle.time)].time, middle.time)
+    self.assertEqual(index.asof(middle.time), len(trackpoints) // 2)
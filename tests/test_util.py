@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import datetime
+import unittest
+
+import numpy as np
+
+from activereader import util
+
+
+class TestConverters(unittest.TestCase):
+
+  def test_float_array(self):
+    result = util.to_float_array(['1.5', None, '', '-2e3'])
+    self.assertEqual(result.dtype, np.float64)
+    np.testing.assert_array_equal(result, [1.5, np.nan, np.nan, -2000.0])
+    self.assertEqual(len(util.to_float_array([])), 0)
+
+  def test_int_array(self):
+    result = util.to_int_array(['71', None, '', '-3'])
+    self.assertIsInstance(result, np.ma.MaskedArray)
+    self.assertEqual(result.dtype, np.int64)
+    self.assertEqual(result.tolist(), [71, None, None, -3])
+    self.assertEqual((~result.mask).tolist(), [True, False, False, True])
+
+    with self.assertRaises(ValueError):
+      util.to_int_array(['71.5'])
+
+  def test_datetime64(self):
+    result = util.to_datetime64([
+      '2021-04-16T13:37:53.000Z',
+      None,
+      '2021-04-16T15:37:53+02:00',
+      '2021-04-16T13:37:53',
+    ])
+    self.assertEqual(result.dtype, np.dtype('datetime64[ns]'))
+    self.assertTrue(np.isnat(result[1]))
+    self.assertEqual(result[0], result[2])
+    self.assertEqual(result[0], result[3])
+
+  def test_to_seconds(self):
+    times = util.to_datetime64(['1970-01-01T00:01:30.5Z', None])
+    np.testing.assert_array_equal(util.to_seconds(times), [90.5, np.nan])
+
+  def test_group_means(self):
+    means = util.group_means(
+      np.array([1.0, 3.0, np.nan, 4.0]), np.array([0, 0, 1, 2]), 4
+    )
+    np.testing.assert_array_equal(means, [2.0, np.nan, 4.0, np.nan])
+
+  def test_to_array(self):
+    self.assertEqual(util.to_array(['1.0'], float).dtype, np.float64)
+    self.assertEqual(util.to_array(['1'], int).dtype, np.int64)
+    self.assertEqual(
+      util.to_array(['2021-04-16T13:37:53Z'], datetime.datetime).dtype,
+      np.dtype('datetime64[ns]')
+    )
+    self.assertEqual(util.to_array(['Running', None], str).tolist(), ['Running', None])
+
+  def test_to_texts(self):
+    self.assertEqual(
+      util.to_texts(util.to_float_array(['40.03811557777226', None])),
+      ['40.03811557777226', None]
+    )
+    self.assertEqual(util.to_texts(util.to_int_array(['71', ''])), ['71', None])
+    self.assertEqual(
+      util.to_texts(util.to_datetime64(['2021-04-16T15:37:53.5+02:00', None])),
+      ['2021-04-16T13:37:53.500Z', None]
+    )
+    self.assertEqual(
+      util.to_texts(util.to_array(['Running', None], str)),
+      ['Running', None]
+    )
+
+
+if __name__ == '__main__':
+  unittest.main()
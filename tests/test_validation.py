@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+from lxml import etree
+
+from activereader import base, gpx, tcx, validation
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+
+def read_bytes(filename):
+  with open(os.path.join(TESTDATA_DIR, filename), 'rb') as f:
+    return f.read()
+
+
+class TestSchemas(unittest.TestCase):
+
+  def test_cached(self):
+    self.assertIs(validation.get_schema('tcx'), validation.get_schema('TCX'))
+    self.assertIsNot(validation.get_schema('tcx'), validation.get_schema('gpx'))
+
+  def test_unknown_format(self):
+    with self.assertRaises(ValueError):
+      validation.get_schema('fit')
+
+  def test_testdata_valid(self):
+    for filename in ('testdata.tcx', 'testcourse.tcx', 'testdata.gpx', 'testcourse.gpx'):
+      tree = etree.parse(os.path.join(TESTDATA_DIR, filename))
+      validation.validate(tree, filename[-3:])
+
+  def test_validate_tree(self):
+    tree = etree.fromstring(
+      read_bytes('testdata.gpx').replace(b'lat="', b'lat="9', 1)
+    )
+    with self.assertRaises(validation.ValidationError) as cm:
+      validation.validate(tree, 'gpx')
+    self.assertEqual(len(cm.exception.errors), 1)
+
+
+class TestReadValidated(unittest.TestCase):
+
+  def test_valid(self):
+    path = os.path.join(TESTDATA_DIR, 'testdata.tcx')
+    tcx_obj = tcx.Tcx.from_file(path, validate=True)
+    self.assertEqual(
+      len(tcx_obj.trackpoints), len(tcx.Tcx.from_file(path).trackpoints)
+    )
+    gpx_obj = gpx.Gpx.from_file(
+      os.path.join(TESTDATA_DIR, 'testdata.gpx'), validate=True
+    )
+    self.assertGreater(len(gpx_obj.trackpoints), 0)
+
+  def test_invalid(self):
+    data = read_bytes('testdata.tcx').replace(
+      b'<Intensity>Active', b'<Intensity>Easy'
+    )
+    # Without validation, the file reads as before.
+    self.assertEqual(len(tcx.Tcx.from_file(data).laps), 4)
+
+    with self.assertRaises(validation.ValidationError) as cm:
+      tcx.Tcx.from_file(data, validate=True)
+    errors = cm.exception.errors
+    # Every error is listed, with its line.
+    self.assertEqual(len(errors), 4)
+    self.assertTrue(all(line > 0 for line, _ in errors))
+    self.assertIn("'Easy'", errors[0][1])
+    self.assertIn(f'line {errors[0][0]}:', str(cm.exception))
+    self.assertIsInstance(cm.exception, ValueError)
+
+  def test_invalid_file_named(self):
+    data = read_bytes('testcourse.gpx').replace(b'<rtept lat="', b'<rtept lat="9', 1)
+    with tempfile.TemporaryDirectory() as tmpdir:
+      path = os.path.join(tmpdir, 'upload.gpx')
+      with open(path, 'wb') as f:
+        f.write(data)
+      with self.assertRaises(validation.ValidationError) as cm:
+        gpx.Gpx.from_file(path, validate=True)
+    self.assertTrue(str(cm.exception).startswith(
+      'upload.gpx does not match the gpx schema (1 error):'
+    ))
+
+  def test_other_format(self):
+    # A file is checked against its reader's schema: a GPX is not a TCX.
+    with self.assertRaises(validation.ValidationError):
+      tcx.Tcx.from_file(read_bytes('testcourse.gpx'), validate=True)
+
+  def test_not_well_formed(self):
+    with self.assertRaises(validation.ValidationError) as cm:
+      tcx.Tcx.from_file(b'<TrainingCenterDatabase><Activities>', validate=True)
+    self.assertEqual(cm.exception.errors[0][0], 1)
+
+  def test_summary_truncated(self):
+    errors = [(i, 'bad') for i in range(1, 16)]
+    message = str(validation.ValidationError(errors, 'gpx', source='a.gpx'))
+    self.assertTrue(message.startswith('a.gpx does not match the gpx schema (15 errors)'))
+    self.assertIn('...and 5 more', message)
+
+  def test_while_simplifying(self):
+    keep_all = lambda columns: np.ones(len(columns['time']), dtype=bool)
+    data = read_bytes('testdata.tcx')
+    tcx_obj = tcx.Tcx.from_file(data, simplify=keep_all, validate=True)
+    self.assertEqual(len(tcx_obj.trackpoints), len(tcx.Tcx.from_file(data).trackpoints))
+    with self.assertRaises(validation.ValidationError):
+      tcx.Tcx.from_file(
+        data.replace(b'<Intensity>Active', b'<Intensity>Easy'),
+        simplify=keep_all, validate=True
+      )
+
+  def test_validating_parser_kept_apart(self):
+    parser = base.XmlReader.get_parser('tcx')
+    validating = base.XmlReader.get_parser('tcx', validate=True)
+    self.assertIsNot(parser, validating)
+    self.assertIs(base.XmlReader.get_parser('tcx', validate=True), validating)
+
+  def test_threads(self):
+    data = read_bytes('testdata.tcx')
+    bad = data.replace(b'<Intensity>Active', b'<Intensity>Easy')
+    results = []
+
+    def read(source):
+      try:
+        tcx.Tcx.from_file(source, validate=True)
+        results.append(0)
+      except validation.ValidationError as e:
+        results.append(len(e.errors))
+
+    threads = [
+      threading.Thread(target=read, args=(data if i % 2 else bad,))
+      for i in range(8)
+    ]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(sorted(results), [0] * 4 + [4] * 4)
+
+
+if __name__ == '__main__':
+  unittest.main()
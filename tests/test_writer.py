@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import os
+import unittest
+
+import numpy as np
+from lxml import etree
+
+from activereader import geo, gpx, tcx, validation, writer
+
+
+TESTDATA_DIR = os.path.dirname(__file__)
+
+
+def assert_same_columns(test, expected, actual, names):
+  for name in names:
+    if expected[name].dtype.kind == 'M':
+      np.testing.assert_array_equal(actual[name], expected[name])
+    else:
+      np.testing.assert_array_equal(
+        np.ma.filled(actual[name].astype(np.float64), np.nan),
+        np.ma.filled(expected[name].astype(np.float64), np.nan),
+        err_msg=name
+      )
+
+
+class TestWriter(unittest.TestCase):
+
+  def setUp(self):
+    self.tcx_columns = tcx.Tcx.from_file(os.path.join(TESTDATA_DIR, 'testdata.tcx')).columns()
+    self.gpx_columns = gpx.Gpx.from_file(os.path.join(TESTDATA_DIR, 'testdata.gpx')).columns()
+
+  def test_tcx_roundtrip(self):
+    buffer = io.BytesIO()
+    writer.write_tcx(buffer, self.tcx_columns, sport='Running')
+    tcx_obj = tcx.Tcx.from_file(buffer.getvalue(), validate=True)
+
+    self.assertEqual(tcx_obj.activities[0].sport, 'Running')
+    self.assertEqual(len(tcx_obj.laps), len(np.unique(self.tcx_columns['lap'])))
+    columns = tcx_obj.columns()
+    assert_same_columns(
+      self, self.tcx_columns, columns, tcx.Trackpoint._fields()
+    )
+    np.testing.assert_array_equal(columns['bout'], self.tcx_columns['bout'])
+
+  def test_gpx_roundtrip(self):
+    buffer = io.BytesIO()
+    writer.write_gpx(buffer, self.gpx_columns, name='Boulder Running', activity_type='running')
+    gpx_obj = gpx.Gpx.from_file(buffer.getvalue(), validate=True)
+
+    self.assertEqual(gpx_obj.name, 'Boulder Running')
+    self.assertEqual(gpx_obj.tracks[0].activity_type, 'running')
+    assert_same_columns(
+      self, self.gpx_columns, gpx_obj.columns(), gpx.Trackpoint._fields()
+    )
+
+  def test_across_formats(self):
+    buffer = io.BytesIO()
+    writer.write_gpx(buffer, self.tcx_columns)
+    columns = gpx.Gpx.from_file(buffer.getvalue(), validate=True).columns()
+    assert_same_columns(
+      self, self.tcx_columns, columns,
+      ['time', 'lat', 'lon', 'altitude_m', 'hr', 'cadence_rpm']
+    )
+    # Each TCX track becomes a GPX segment.
+    np.testing.assert_array_equal(columns['bout'], self.tcx_columns['bout'])
+
+    buffer = io.BytesIO()
+    writer.write_tcx(buffer, self.gpx_columns)
+    tcx_obj = tcx.Tcx.from_file(buffer.getvalue())
+    self.assertAlmostEqual(
+      tcx_obj.laps[0].distance_m,
+      geo.derived_columns(self.gpx_columns)['distance_m'][-1]
+    )
+    assert_same_columns(self, self.gpx_columns, tcx_obj.columns(), ['time', 'lat', 'lon', 'hr'])
+
+  def test_gzip(self):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+      writer.write_gpx(f, self.gpx_columns)
+    gpx_obj = gpx.Gpx.from_file(gzip.decompress(buffer.getvalue()), validate=True)
+    self.assertEqual(len(gpx_obj.trackpoints), len(self.gpx_columns['time']))
+
+  def test_missing_values(self):
+    columns = {
+      'time': np.array(['2021-04-16T13:37:53', 'NaT', '2021-04-16T13:37:55'], dtype='datetime64[ns]'),
+      'lat': np.array([40.0, 40.001, np.nan]),
+      'lon': np.array([-105.0, -105.0, np.nan]),
+      'hr': np.ma.MaskedArray([0, 140, 150], mask=[True, False, False]),
+    }
+    # GPX requires a position but not a time, so only the trackpoint
+    # without a position is left out.
+    buffer = io.BytesIO()
+    writer.write_gpx(buffer, columns)
+    trackpoints = gpx.Gpx.from_file(buffer.getvalue(), validate=True).trackpoints
+    self.assertEqual(len(trackpoints), 2)
+    self.assertIsNone(trackpoints[1].time)
+    self.assertEqual(trackpoints[1].hr, 140)
+
+    # TCX requires a time, so the trackpoint without one is left out.
+    buffer = io.BytesIO()
+    writer.write_tcx(buffer, columns)
+    validation.validate(etree.fromstring(buffer.getvalue()), 'tcx')
+    trackpoints = tcx.Tcx.from_file(buffer.getvalue()).trackpoints
+    self.assertEqual(len(trackpoints), 2)
+    self.assertIsNone(trackpoints[0].hr)
+    self.assertIsNone(trackpoints[1].lat)
+    self.assertEqual(trackpoints[1].hr, 150)
+
+    buffer = io.BytesIO()
+    with self.assertRaises(ValueError):
+      writer.write_tcx(buffer, {'time': columns['time'][1:2]})
+
+    # The NaT row is in the columns read from a real file, too.
+    tcx_columns = dict(self.tcx_columns)
+    tcx_columns['time'] = tcx_columns['time'].copy()
+    tcx_columns['time'][10] = np.datetime64('NaT')
+    buffer = io.BytesIO()
+    writer.write_tcx(buffer, tcx_columns)
+    tcx_obj = tcx.Tcx.from_file(buffer.getvalue(), validate=True)
+    self.assertEqual(len(tcx_obj.trackpoints), len(tcx_columns['time']) - 1)
+
+    # Likewise for a trackpoint without a position.
+    tcx_columns['lat'] = tcx_columns['lat'].copy()
+    tcx_columns['lat'][20] = np.nan
+    buffer = io.BytesIO()
+    writer.write_gpx(buffer, tcx_columns)
+    gpx_obj = gpx.Gpx.from_file(buffer.getvalue(), validate=True)
+    self.assertEqual(len(gpx_obj.trackpoints), len(tcx_columns['time']) - 1)
+
+    with self.assertRaises(ValueError):
+      writer.TcxWriter(buffer, sport='Swimming')